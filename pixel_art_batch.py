@@ -0,0 +1,321 @@
+"""
+批量转换（增量）
+按目录批量执行像素画转换/画质增强，并用清单文件（manifest）记录每个输入的
+大小、修改时间、内容哈希、参数和输出路径，重新运行时只处理新增或变化的文件
+
+- 大小和修改时间都没变：直接跳过（不读文件内容）
+- 大小或修改时间变了但内容哈希相同：只更新清单中的记录
+- 源文件已删除：删除对应的输出和记录
+- 每完成一个文件就在清单旁的日志（JSON Lines）中追加一行记录，结束时合并回清单并删除日志；
+  崩溃后重跑时先合并日志，从中断处继续（清单只在开始和结束时整体写入，文件再多也不会反复重写）
+- 参数中的调色板文件按内容哈希记录：文件内容变了，所有输出都会重新生成
+- 输出目录位于输入目录之内时，扫描输入时跳过输出目录
+- Ctrl-C 时取消排队中的文件，正在处理的文件完成后写回清单再退出
+- 每个文件在解码前按图片头估算内存（见 pixel_art_governor）：并行的文件共享内存预算，
+  超出时排队或改为分块执行，单个文件超出预算则记为失败，不影响其他文件
+"""
+
+import contextlib
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from pixel_art_converter import Image, apply_pixel_art, apply_quality_enhance, save_image
+from pixel_art_governor import run_governed
+
+
+# 清单默认文件名（放在输出目录下）
+MANIFEST_NAME = '.pixel_art_manifest.json'
+MANIFEST_VERSION = 1
+
+# 运行期间追加记录的日志文件（清单路径 + 此后缀）
+JOURNAL_SUFFIX = '.journal'
+
+# 参与批量处理的图片扩展名
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.gif', '.webp', '.tif', '.tiff')
+
+BATCH_OPS = {
+    'pixelate': apply_pixel_art,
+    'enhance': apply_quality_enhance,
+}
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    """分块计算文件内容的 SHA-256"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_manifest(path):
+    """读取清单并合并上次中断时留下的日志；不存在或版本不符时返回空清单"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        manifest = {'version': MANIFEST_VERSION, 'entries': {}}
+    if manifest.get('version') != MANIFEST_VERSION:
+        print(f"提示: 清单版本不符，将全部重新处理 ({path})")
+        return {'version': MANIFEST_VERSION, 'entries': {}}
+    replay_journal(manifest, path + JOURNAL_SUFFIX)
+    return manifest
+
+
+def replay_journal(manifest, journal_path):
+    """把日志中的记录按顺序合并进清单（崩溃时最后一行可能只写了一半，跳过无法解析的行）"""
+    try:
+        with open(journal_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                manifest['entries'][record['input']] = record['entry']
+    except FileNotFoundError:
+        pass
+
+
+def save_manifest(manifest, path):
+    """
+    原子地写回清单（先写临时文件再替换，避免崩溃时留下半截文件）
+
+    写回后删除日志：其中的记录都已包含在清单中。
+    """
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+    try:
+        os.remove(path + JOURNAL_SUFFIX)
+    except FileNotFoundError:
+        pass
+
+
+def manifest_params(params):
+    """
+    清单中记录的参数：JSON 往返后的形式（保证与清单中的记录可比较）
+
+    palette 为文件路径时同时记录文件内容的 SHA-256，调色板文件被修改后视为参数变化。
+    """
+    params = json.loads(json.dumps(params))
+    palette = params.get('palette')
+    if isinstance(palette, str):
+        try:
+            params['palette_sha256'] = file_sha256(palette)
+        except OSError as e:
+            raise ValueError(f"无法读取调色板文件 '{palette}': {e}")
+    return params
+
+
+def scan_inputs(input_dir, exclude=None):
+    """
+    递归列出输入目录中的图片（相对路径，统一使用 / 分隔）
+
+    exclude 为要跳过的目录（例如位于输入目录之内的输出目录）。
+    """
+    skip = os.path.realpath(exclude) if exclude else None
+    found = []
+    for root, dirs, files in os.walk(input_dir):
+        dirs[:] = [d for d in dirs if os.path.realpath(os.path.join(root, d)) != skip]
+        dirs.sort()
+        for name in sorted(files):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                rel = os.path.relpath(os.path.join(root, name), input_dir)
+                found.append(rel.replace(os.sep, '/'))
+    return found
+
+
+def output_relpath(rel, output_ext='.png'):
+    """输入相对路径 -> 输出相对路径（保留子目录结构，替换扩展名）"""
+    return os.path.splitext(rel)[0] + output_ext
+
+
+def plan_batch(input_dir, output_dir, op, params, manifest, output_ext='.png'):
+    """
+    对比清单与当前输入，决定哪些文件需要处理
+
+    返回:
+        dict: todo（需处理，含 new/changed）、unchanged、touched（仅更新记录）、removed
+    """
+    params = manifest_params(params)
+    entries = manifest['entries']
+    plan = {'new': [], 'changed': [], 'unchanged': [], 'touched': [], 'removed': []}
+
+    current = scan_inputs(input_dir, exclude=output_dir)
+    outputs = {}
+    for rel in current:
+        outputs.setdefault(output_relpath(rel, output_ext), []).append(rel)
+    clashes = [names for names in outputs.values() if len(names) > 1]
+    if clashes:
+        raise ValueError(
+            "以下输入会写到同一个输出文件，请重命名: "
+            + "; ".join(", ".join(names) for names in clashes)
+        )
+
+    for rel in current:
+        src = os.path.join(input_dir, rel)
+        st = os.stat(src)
+        out_rel = output_relpath(rel, output_ext)
+        info = {'size': st.st_size, 'mtime_ns': st.st_mtime_ns, 'output': out_rel}
+        entry = entries.get(rel)
+
+        if entry is None:
+            plan['new'].append((rel, info))
+            continue
+        same_job = (
+            entry.get('op') == op
+            and entry.get('params') == params
+            and entry.get('output') == out_rel
+            and os.path.exists(os.path.join(output_dir, out_rel))
+        )
+        if not same_job:
+            plan['changed'].append((rel, info))
+        elif entry['size'] == st.st_size and entry['mtime_ns'] == st.st_mtime_ns:
+            plan['unchanged'].append((rel, info))
+        else:
+            # 时间戳变了，以内容哈希为准
+            info['sha256'] = file_sha256(src)
+            if info['sha256'] == entry.get('sha256'):
+                plan['touched'].append((rel, info))
+            else:
+                plan['changed'].append((rel, info))
+
+    current_set = set(current)
+    plan['removed'] = [rel for rel in entries if rel not in current_set]
+    plan['todo'] = plan['new'] + plan['changed']
+    return plan
+
+
+def format_plan(plan):
+    """把处理计划整理成一行摘要"""
+    total = len(plan['todo']) + len(plan['unchanged']) + len(plan['touched'])
+    skipped = len(plan['unchanged']) + len(plan['touched'])
+    ratio = (skipped / total * 100) if total else 100.0
+    return (
+        f"共 {total} 个输入：新增 {len(plan['new'])}，变化 {len(plan['changed'])}，"
+        f"未变化 {len(plan['unchanged'])}，仅时间戳变化 {len(plan['touched'])}，"
+        f"源已删除 {len(plan['removed'])}；跳过 {skipped} 个（{ratio:.1f}%）"
+    )
+
+
+def _process_one(src, dst, op, params):
+    img = Image.open(src)
+    out = run_governed(op, img, BATCH_OPS[op], params)
+    os.makedirs(os.path.dirname(dst) or '.', exist_ok=True)
+    # 先写临时文件再改名：崩溃时不会留下看似完成的半截输出
+    root, ext = os.path.splitext(dst)
+    tmp = f"{root}.partial{ext}"
+    try:
+        save_image(out, tmp)
+        os.replace(tmp, dst)
+    finally:
+        # 写出失败时删掉半截的临时文件（成功时已被改名，不存在）
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(tmp)
+
+
+def run_batch(input_dir, output_dir, op='pixelate', params=None, manifest_path=None,
+              output_ext='.png', dry_run=False, max_workers=None):
+    """
+    增量批量处理目录中的图片
+
+    参数:
+        input_dir / output_dir: 输入、输出目录（输出保留子目录结构）
+        op: 'pixelate'（像素画转换）或 'enhance'（画质增强）
+        params: 传给对应处理函数的参数
+        manifest_path: 清单路径（默认为输出目录下的 .pixel_art_manifest.json）
+        output_ext: 输出扩展名
+        dry_run: 只报告将要处理/跳过的数量，不做任何改动
+        max_workers: 并行线程数
+
+    返回:
+        处理计划（见 plan_batch）
+    """
+    if op not in BATCH_OPS:
+        raise ValueError(f"未知的批量操作 '{op}'，可选: {', '.join(BATCH_OPS)}")
+    params = dict(params or {})
+    manifest_path = manifest_path or os.path.join(output_dir, MANIFEST_NAME)
+    manifest = load_manifest(manifest_path)
+
+    plan = plan_batch(input_dir, output_dir, op, params, manifest, output_ext)
+    print(format_plan(plan))
+    if dry_run:
+        for rel, _ in plan['todo']:
+            print(f"  将处理: {rel}")
+        for rel in plan['removed']:
+            print(f"  将删除输出: {manifest['entries'][rel]['output']}")
+        return plan
+
+    os.makedirs(output_dir, exist_ok=True)
+    entries = manifest['entries']
+    lock = threading.Lock()
+    stored_params = manifest_params(params)
+
+    def commit(rel, info):
+        with lock:
+            # 输出路径变了（例如换了扩展名），清理旧输出
+            old = entries.get(rel)
+            if old and old['output'] != info['output']:
+                old_out = os.path.join(output_dir, old['output'])
+                if os.path.exists(old_out):
+                    os.remove(old_out)
+            entries[rel] = dict(info, op=op, params=stored_params)
+            # 只追加一行日志（清单在结束时整体写回一次）
+            journal.write(json.dumps({'input': rel, 'entry': entries[rel]}, ensure_ascii=False) + '\n')
+            journal.flush()
+
+    # 源已删除：清理输出和记录
+    for rel in plan['removed']:
+        out = os.path.join(output_dir, entries[rel]['output'])
+        if os.path.exists(out):
+            os.remove(out)
+        del entries[rel]
+        print(f"已删除过期输出: {out}")
+
+    # 仅时间戳变化：更新记录即可
+    for rel, info in plan['touched']:
+        entries[rel] = dict(entries[rel], size=info['size'], mtime_ns=info['mtime_ns'])
+    save_manifest(manifest, manifest_path)
+
+    def work(rel, info):
+        src = os.path.join(input_dir, rel)
+        if 'sha256' not in info:
+            info['sha256'] = file_sha256(src)
+        _process_one(src, os.path.join(output_dir, info['output']), op, params)
+        commit(rel, info)
+        return rel
+
+    failures = []
+    journal = open(manifest_path + JOURNAL_SUFFIX, 'a', encoding='utf-8')
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(work, rel, info): rel for rel, info in plan['todo']}
+            try:
+                for done, future in enumerate(as_completed(futures), 1):
+                    rel = futures[future]
+                    try:
+                        future.result()
+                        print(f"[{done}/{len(futures)}] ✓ {rel}")
+                    except Exception as e:
+                        failures.append(rel)
+                        print(f"[{done}/{len(futures)}] ✗ {rel}: {type(e).__name__}: {e}")
+            except KeyboardInterrupt:
+                # 不再等待排队中的文件；正在处理的文件完成后仍会写入日志
+                print("\n中断：取消尚未开始的文件，等待正在处理的文件完成...")
+                executor.shutdown(cancel_futures=True)
+                raise
+    finally:
+        # 合并日志：写回完整清单并删除日志（中途被打断时也把已完成的记录写回）
+        journal.close()
+        save_manifest(manifest, manifest_path)
+
+    if failures:
+        print(f"完成，但有 {len(failures)} 个文件失败（未写入清单，下次运行会重试）")
+    else:
+        print(f"✓ 批量处理完成，清单: {manifest_path}")
+    plan['failed'] = failures
+    return plan
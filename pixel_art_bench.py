@@ -0,0 +1,492 @@
+"""
+性能基准
+用确定性的合成图片对比各处理路径的耗时，结果可保存到 benchmark_data/ 下便于追踪
+
+用法:
+    python pixel_art_bench.py downsample --size 3000x2000 --repeat 3 --save
+    python pixel_art_bench.py startup      # 入口模块冷启动导入耗时，超出预算时退出码为 1
+    python pixel_art_bench.py engine       # 各缩放/滤波后端的耗时与等价性，选用的后端不一致时退出码为 1
+    python pixel_art_bench.py viewer --size 7680x4320   # 查看器在 8K 图像上的渲染耗时
+    python pixel_art_bench.py denoise --size 4000x3000  # 各去噪方式在 12 MP 上的耗时与画质
+    python pixel_art_bench.py sharpen --size 4000x3000  # 锐化通道 rgb / luma 的耗时与画质
+    python pixel_art_bench.py golden       # 画质回归（pixel_art_golden），输出有变化时退出码为 1
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+from PIL import Image, ImageFilter
+
+
+# 基准结果保存目录
+BENCH_DIR = Path(__file__).resolve().parent / "benchmark_data"
+
+# 入口模块的冷启动导入预算：(毫秒, 导入时不应加载的模块)
+# 命令行不需要 tkinter；GUI 启动时不需要图像库和处理模块（第一次处理时才导入）
+STARTUP_BUDGETS = {
+    'pixel_art_converter': (150, ('tkinter', 'numpy')),
+    'pixel_art_gui': (100, ('PIL', 'numpy', 'pixel_art_converter')),
+}
+
+
+def make_test_photo(size=(1920, 1080), seed=0):
+    """生成确定性的 “照片类” 测试图：平滑渐变 + 色块 + 高频纹理 + 噪声"""
+    width, height = size
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+    u, v = x / width, y / height
+    r = 128 + 100 * np.sin(6.0 * u + 2.0 * v)
+    g = 128 + 90 * np.cos(4.0 * v - 3.0 * u)
+    b = 128 + 80 * np.sin(9.0 * u * v + 1.0)
+    img = np.stack([r, g, b], axis=-1)
+    # 若干实心圆，提供清晰边缘
+    for _ in range(12):
+        cx, cy = rng.random(2) * (width, height)
+        radius = rng.uniform(0.04, 0.15) * min(width, height)
+        mask = (x - cx) ** 2 + (y - cy) ** 2 < radius ** 2
+        img[mask] = rng.uniform(20, 235, 3)
+    # 细条纹纹理 + 传感器噪声
+    img += 12 * np.sin(x * 0.9)[..., None] * (u > 0.5)[..., None]
+    img += rng.normal(0, 6, img.shape)
+    return Image.fromarray(np.clip(img, 0, 255).astype(np.uint8))
+
+
+def time_call(func, repeat=3):
+    """多次运行取最小耗时（秒），屏蔽被测函数的打印输出"""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            result = func()
+            elapsed = time.perf_counter() - start
+        best = min(best, elapsed)
+    return best, result
+
+
+def bench_downsample(size=(1920, 1080), repeat=3, pixel_size=96, color_reduction=32):
+    """插值缩小 vs 块归约缩小：整条 apply_pixel_art 的耗时"""
+    from pixel_art_converter import apply_pixel_art
+
+    img = make_test_photo(size)
+    rows = []
+    for method in ('resize', 'mean', 'median', 'mode'):
+        seconds, out = time_call(
+            lambda: apply_pixel_art(
+                img, pixel_size=pixel_size, color_reduction=color_reduction,
+                fast_path=False, downsample=method,
+            ),
+            repeat,
+        )
+        rows.append({
+            'method': method,
+            'ms': round(seconds * 1000, 2),
+            'output_colors': len(out.getcolors(1 << 24)),
+        })
+    baseline = rows[0]['ms']
+    for row in rows:
+        row['speedup'] = round(baseline / row['ms'], 2)
+    return rows
+
+
+def bench_dither(size=(1920, 1080), repeat=3, pixel_size=256, color_reduction=16):
+    """各抖动方式相对 “只做量化” 的额外开销（在像素化后的网格上量化）"""
+    from pixel_art_converter import compute_target_size, quantize_colors
+
+    img = make_test_photo(size)
+    grid = img.resize(compute_target_size(size, pixel_size), Image.BOX)
+    rows = []
+    for method in ('none', 'bayer4', 'bayer8', 'blue-noise', 'floyd-steinberg',
+                   'atkinson', 'sierra-lite', 'jarvis'):
+        seconds, _ = time_call(
+            lambda: quantize_colors(grid, color_reduction, enhance_mode=False, dither=method),
+            repeat,
+        )
+        rows.append({'dither': method, 'ms': round(seconds * 1000, 2)})
+    baseline = rows[0]['ms']
+    for row in rows:
+        row['vs_quantize'] = round(row['ms'] / baseline, 2)
+    return rows
+
+
+def bench_palette(size=(1920, 1080), repeat=3, sizes=(16, 64, 256)):
+    """固定调色板映射整图：查找表 vs 逐像素精确搜索 vs Pillow quantize(palette=...)"""
+    from pixel_art_palette import Palette
+
+    img = make_test_photo(size)
+    a = np.asarray(img)
+    flat = a.reshape(-1, 3).astype(np.float32)
+    rng = np.random.default_rng(1)
+    rows = []
+    for k in sizes:
+        palette = Palette(rng.integers(0, 256, (k, 3)))
+        palette.lut()  # 查找表的计算/加载不计入映射耗时
+        lut_s, index = time_call(lambda: palette.map_array(a), repeat)
+        colors = palette.colors.astype(np.float32)
+
+        def brute():
+            return np.concatenate([
+                np.argmin(((flat[i:i + 65536, None, :] - colors[None]) ** 2).sum(-1), axis=1)
+                for i in range(0, len(flat), 65536)
+            ])
+
+        brute_s, exact = time_call(brute, 1)
+        pal_img = palette.to_image()
+        pillow_s, quantized = time_call(
+            lambda: img.quantize(palette=pal_img, dither=Image.Dither.NONE), repeat)
+        rows.append({
+            'colors': k,
+            'lut_ms': round(lut_s * 1000, 2),
+            'brute_ms': round(brute_s * 1000, 2),
+            'pillow_ms': round(pillow_s * 1000, 2),
+            'lut_exact': bool((index.reshape(-1) == exact).all()),
+            'pillow_exact_pct': round(float((np.asarray(quantized).reshape(-1) == exact).mean()) * 100, 2),
+        })
+    return rows
+
+
+def bench_quantize(size=(1920, 1080), repeat=3, pixel_sizes=(64, 128, 256), color_reduction=16):
+    """
+    RGB 中值切割 vs OKLab / CIELAB 聚类
+
+    耗时按默认参数（增强模式、不指定抖动）计；色差（平均 ΔE）在不抖动、不做对比度后处理的结果上计算。
+    """
+    from pixel_art_colorspace import rgb_to_lab, rgb_to_oklab
+    from pixel_art_converter import compute_target_size, quantize_colors
+
+    img = make_test_photo(size)
+    rows = []
+    for pixel_size in pixel_sizes:
+        grid = img.resize(compute_target_size(size, pixel_size), Image.BOX)
+        ref = np.asarray(grid)
+        baseline = None
+        for space in ('rgb', 'oklab', 'lab'):
+            seconds, _ = time_call(
+                lambda: quantize_colors(grid, color_reduction, space=space), repeat)
+            _, out = time_call(
+                lambda: quantize_colors(grid, color_reduction, enhance_mode=False, dither='none',
+                                        space=space),
+                1,
+            )
+            out = np.asarray(out)
+            baseline = baseline or seconds
+            rows.append({
+                'pixel_size': pixel_size,
+                'space': space,
+                'ms': round(seconds * 1000, 2),
+                'vs_rgb': round(seconds / baseline, 2),
+                'dE_oklab': round(float(np.sqrt(((rgb_to_oklab(out) - rgb_to_oklab(ref)) ** 2).sum(-1)).mean()) * 100, 2),
+                'dE76': round(float(np.sqrt(((rgb_to_lab(out) - rgb_to_lab(ref)) ** 2).sum(-1)).mean()), 2),
+            })
+    return rows
+
+
+def bench_engine(size=(1920, 1080), repeat=3):
+    """
+    缩放 / 滤波引擎：各后端在每个操作上的耗时与相对 Pillow 的最大逐像素差
+
+    chosen 标出当前选用的后端；被选用的后端若在这张图上与 Pillow 的差超过容差则 ok 为 False。
+    """
+    import pixel_art_engine as engine
+
+    choices = engine.calibrate(verbose=True)
+    rows = []
+    for row in engine.measure(make_test_photo(size), repeat):
+        pillow = next(r for r in rows + [row] if r['op'] == row['op'] and r['backend'] == 'pillow')
+        chosen = choices.get(row['op']) == row['backend']
+        rows.append({
+            **row,
+            'vs_pillow': round(pillow['ms'] / row['ms'], 2) if row['ms'] else '-',
+            'chosen': '*' if chosen else '',
+            'ok': not chosen or row['max_diff'] <= engine.TOLERANCE,
+        })
+    print(f"Pillow: {engine.pillow_flavor()}  可用后端: {', '.join(engine.available_backends())}")
+    return rows
+
+
+def bench_sequence(size=(1280, 720), repeat=1, frames=24, pixel_size=160, color_reduction=32):
+    """
+    图像序列：逐帧 apply_pixel_art 与序列模式的吞吐量（帧/秒）和闪烁
+
+    测试片段为缓慢平移的测试图，每隔 4 帧静止 4 帧（重复帧）；
+    changed_px 为相邻输出帧之间变化的像素比例（越低闪烁越少）。
+    """
+    from pixel_art_converter import apply_pixel_art
+    from pixel_art_sequence import process_sequence
+
+    photo = make_test_photo((size[0] + frames * 2, size[1]))
+    clip = []
+    for i in range(frames):
+        x = 2 * ((i // 8) * 4 + min(i % 8, 4))
+        clip.append(photo.crop((x, 0, x + size[0], size[1])))
+
+    def changed(outputs):
+        return round(float(np.mean([np.any(a != b, axis=2).mean()
+                                    for a, b in zip(outputs, outputs[1:])])), 3)
+
+    params = {'pixel_size': pixel_size, 'color_reduction': color_reduction}
+    seconds, outputs = time_call(
+        lambda: [np.asarray(apply_pixel_art(frame, **params)) for frame in clip], repeat)
+    rows = [{'mode': 'per-frame', 'fps': round(frames / seconds, 1), 'reused': 0,
+             'changed_px': changed(outputs)}]
+
+    def run_sequence():
+        outputs = []
+        stats = process_sequence(
+            [(str(i), (lambda frame=frame: frame)) for i, frame in enumerate(clip)],
+            lambda name, data: outputs.append(np.frombuffer(data, np.uint8).reshape(size[1], size[0], 3)),
+            raw_output=True, **params,
+        )
+        return stats, outputs
+
+    seconds, (stats, outputs) = time_call(run_sequence, repeat)
+    rows.append({'mode': 'sequence', 'fps': round(frames / seconds, 1), 'reused': stats['reused'],
+                 'changed_px': changed(outputs)})
+    for row in rows:
+        row['vs_per_frame'] = round(row['fps'] / rows[0]['fps'], 2)
+    return rows
+
+
+def bench_viewer(size=(7680, 4320), repeat=3, canvas=(1280, 800)):
+    """
+    查看器（pixel_art_viewer）：大图在各缩放级别下填满一个画布的渲染耗时
+
+    用 --size 7680x4320 模拟 8K 超分输出；pyramid 行为生成全部金字塔层的耗时（tiles 列为层数）。
+    ms 为按金字塔 + 瓦片渲染可见区域，naive 为每次把整幅原图缩放到显示尺寸再裁剪；
+    pan 为平移一个瓦片宽度后需要新生成的一列瓦片（其余来自缓存）。
+    """
+    from pixel_art_viewer import TILE_SIZE, ImagePyramid, render_tile
+
+    img = make_test_photo((size[0] // 4, size[1] // 4)).resize(size, Image.BICUBIC)
+    seconds, pyramid = time_call(lambda: ImagePyramid(img).build(), repeat)
+    rows = [{'view': 'pyramid', 'zoom': '-', 'tiles': len(pyramid.levels), 'ms': round(seconds * 1000, 1),
+             'pan_ms': '-', 'naive_ms': '-', 'speedup': '-'}]
+    fit = min(canvas[0] / size[0], canvas[1] / size[1])
+    for view, zoom in (('fit', fit), ('50%', 0.5), ('1:1', 1.0), ('4x', 4.0)):
+        display = (round(size[0] * zoom), round(size[1] * zoom))
+        cols = range(min(-(-canvas[0] // TILE_SIZE), -(-display[0] // TILE_SIZE)))
+        rows_ = range(min(-(-canvas[1] // TILE_SIZE), -(-display[1] // TILE_SIZE)))
+        seconds, _ = time_call(lambda: [render_tile(pyramid, display, c, r, True)
+                                        for r in rows_ for c in cols], repeat)
+        pan, _ = time_call(lambda: [render_tile(pyramid, display, len(cols), r, True) for r in rows_], repeat)
+        row = {'view': view, 'zoom': round(zoom, 3), 'tiles': len(cols) * len(rows_),
+               'ms': round(seconds * 1000, 1), 'pan_ms': round(pan * 1000, 1), 'naive_ms': '-', 'speedup': '-'}
+        # 整幅缩放到显示尺寸在大倍数下需要数 GB 内存，超过 1 亿像素时跳过
+        if display[0] * display[1] <= 100_000_000:
+            naive, _ = time_call(lambda: img.resize(display, Image.BILINEAR).crop((0, 0) + canvas), 1)
+            row.update(naive_ms=round(naive * 1000, 1), speedup=round(naive / seconds, 1))
+        rows.append(row)
+    return rows
+
+
+def bench_denoise(size=(1920, 1080), repeat=3, sigma=8.0):
+    """
+    画质增强的去噪方式：测试图加高斯噪声（标准差 sigma）后去噪，与干净原图比较
+
+    psnr / ssim 为去噪结果，usm_psnr / usm_ssim 为之后再做增强默认的 USM 锐化（120%）的结果；
+    median 使用当前引擎（见 pixel_art_engine），median-pillow 为 Pillow 的 MedianFilter。
+    12 MP 照片的耗时用 --size 4000x3000 测量。
+    """
+    import pixel_art_denoise
+    from pixel_art_engine import median_filter
+    from pixel_art_golden import psnr, ssim
+
+    clean = make_test_photo(size)
+    reference = np.asarray(clean)
+    rng = np.random.default_rng(0)
+    noisy = Image.fromarray(np.clip(reference + rng.normal(0, sigma, reference.shape), 0, 255).astype(np.uint8))
+    usm = ImageFilter.UnsharpMask(radius=1.0, percent=120, threshold=3)
+    cases = [
+        ('none', 'rgb', lambda: noisy),
+        ('median', 'rgb', lambda: median_filter(noisy, 3)),
+        ('median-pillow', 'rgb', lambda: noisy.filter(ImageFilter.MedianFilter(3))),
+    ]
+    for method in pixel_art_denoise.METHODS:
+        for luma_only in (False, True):
+            cases.append((method, 'luma' if luma_only else 'rgb',
+                          lambda m=method, l=luma_only: pixel_art_denoise.denoise(noisy, m, l)))
+    rows = []
+    for method, channels, func in cases:
+        seconds, out = time_call(func, repeat)
+        sharpened = np.asarray(out.filter(usm))
+        out = np.asarray(out)
+        rows.append({
+            'method': method, 'channels': channels, 'ms': round(seconds * 1000, 1),
+            'psnr': round(psnr(reference, out), 2), 'ssim': round(ssim(reference, out), 4),
+            'usm_psnr': round(psnr(reference, sharpened), 2), 'usm_ssim': round(ssim(reference, sharpened), 4),
+        })
+    return rows
+
+
+def bench_sharpen(size=(1920, 1080), repeat=3, pixel_size=256):
+    """
+    锐化通道 rgb vs luma（sharpen_mode）：画质增强和像素画转换的耗时，以及与干净原图的画质对比
+
+    enhance: 原图缩小一半再放大回来作为模糊输入；enhance-x2: 半尺寸输入放大 2 倍。
+    两者都不去噪，输出与干净原图比较（psnr / ssim）；vs_rgb_psnr 为 luma 与 rgb 输出之间的 PSNR。
+    pixelate 的锐化作用在缩小后的网格上，两种方式耗时相近。
+    """
+    from pixel_art_converter import apply_pixel_art, apply_quality_enhance
+    from pixel_art_golden import psnr, ssim
+
+    clean = make_test_photo(size)
+    reference = np.asarray(clean)
+    half = clean.resize((size[0] // 2, size[1] // 2), Image.LANCZOS)
+    blurry = half.resize(size, Image.BICUBIC)
+    cases = [
+        ('enhance', lambda mode: apply_quality_enhance(blurry, denoise=False, sharpen_mode=mode)),
+        ('enhance-x2', lambda mode: apply_quality_enhance(half, denoise=False, upscale_factor=2.0,
+                                                          sharpen_mode=mode)),
+        ('pixelate', lambda mode: apply_pixel_art(clean, pixel_size=pixel_size, color_reduction=32,
+                                                  fast_path=False, sharpen_mode=mode)),
+    ]
+    rows = []
+    for name, func in cases:
+        results = {}
+        for mode in ('rgb', 'luma'):
+            seconds, out = time_call(lambda: func(mode), repeat)
+            results[mode] = np.asarray(out)
+            row = {'case': name, 'mode': mode, 'ms': round(seconds * 1000, 1)}
+            if name != 'pixelate':
+                row['psnr'] = round(psnr(reference, results[mode]), 2)
+                row['ssim'] = round(ssim(reference, results[mode]), 4)
+            else:
+                row['psnr'] = row['ssim'] = '-'
+            rows.append(row)
+        rows[-2]['speedup'] = 1.0
+        rows[-1]['speedup'] = round(rows[-2]['ms'] / rows[-1]['ms'], 2)
+        rows[-2]['vs_rgb_psnr'] = '-'
+        rows[-1]['vs_rgb_psnr'] = round(psnr(results['rgb'], results['luma']), 2)
+    return rows
+
+
+def bench_golden(size=None, repeat=1):
+    """画质回归（见 pixel_art_golden）：各预设与参考结果的差异和耗时，有变化时 ok 为 False"""
+    from pixel_art_golden import run_golden, summarize
+
+    return summarize(run_golden())
+
+
+def import_profile(module):
+    """
+    在新进程中用 -X importtime 导入 module
+
+    返回:
+        {模块名: (累计耗时微秒, 嵌套深度)}，深度 0 为 module 本身
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        capture_output=True, text=True, cwd=Path(__file__).resolve().parent,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"导入 {module} 失败: {result.stderr.strip().splitlines()[-1]}")
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        times[name.strip()] = (int(cumulative), depth)
+    return times
+
+
+def bench_startup(size=None, repeat=3):
+    """入口模块的冷启动导入耗时（-X importtime），并检查是否加载了不该加载的模块"""
+    rows = []
+    for module, (budget_ms, forbidden) in STARTUP_BUDGETS.items():
+        best = None
+        for _ in range(repeat):
+            times = import_profile(module)
+            if best is None or times[module][0] < best[module][0]:
+                best = times
+        ms = best[module][0] / 1000
+        loaded = [name for name in forbidden if name in best]
+        heaviest = sorted(
+            ((us, name) for name, (us, depth) in best.items() if depth == 1), reverse=True
+        )[:3]
+        rows.append({
+            'module': module,
+            'import_ms': round(ms, 1),
+            'budget_ms': budget_ms,
+            'forbidden_loaded': ','.join(loaded) or '-',
+            'heaviest': ', '.join(f"{name} {us / 1000:.0f}ms" for us, name in heaviest),
+            'ok': ms <= budget_ms and not loaded,
+        })
+    return rows
+
+
+BENCHMARKS = {
+    'downsample': bench_downsample,
+    'dither': bench_dither,
+    'palette': bench_palette,
+    'quantize': bench_quantize,
+    'engine': bench_engine,
+    'denoise': bench_denoise,
+    'sharpen': bench_sharpen,
+    'sequence': bench_sequence,
+    'viewer': bench_viewer,
+    'golden': bench_golden,
+    'startup': bench_startup,
+}
+
+
+def print_rows(rows):
+    """以对齐的表格打印结果"""
+    if not rows:
+        return
+    keys = list(rows[0])
+    widths = {k: max(len(k), *(len(str(r[k])) for r in rows)) for k in keys}
+    print("  ".join(k.ljust(widths[k]) for k in keys))
+    for row in rows:
+        print("  ".join(str(row[k]).ljust(widths[k]) for k in keys))
+
+
+def save_results(name, rows, params):
+    """把结果写入 benchmark_data/<name>.json"""
+    BENCH_DIR.mkdir(exist_ok=True)
+    path = BENCH_DIR / f"{name}.json"
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'benchmark': name, 'params': params, 'results': rows},
+                  f, ensure_ascii=False, indent=2)
+    return path
+
+
+def _size(text):
+    width, height = text.lower().split('x')
+    return int(width), int(height)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="图像处理工具性能基准")
+    parser.add_argument('name', choices=sorted(BENCHMARKS), help="基准名称")
+    parser.add_argument('--size', type=_size, default=(1920, 1080), help="测试图尺寸，例如 3000x2000")
+    parser.add_argument('--repeat', type=int, default=3, help="重复次数（取最小值）")
+    parser.add_argument('--save', action='store_true', help="把结果保存到 benchmark_data/")
+    args = parser.parse_args(argv)
+
+    params = {'size': list(args.size), 'repeat': args.repeat}
+    print(f"基准: {args.name}  尺寸: {args.size[0]}x{args.size[1]}  重复: {args.repeat}")
+    rows = BENCHMARKS[args.name](size=args.size, repeat=args.repeat)
+    print_rows(rows)
+    if args.save:
+        print(f"结果已保存: {save_results(args.name, rows, params)}")
+    if any(row.get('ok') is False for row in rows):
+        print("✗ 存在超出预算的项目")
+        sys.exit(1)
+    return rows
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except KeyboardInterrupt:
+        print("\n\n用户中断操作")
+        sys.exit(1)
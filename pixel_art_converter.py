@@ -4,13 +4,14 @@
 将普通图片转换为清晰的像素艺术风格，保留原图的基本信息
 """
 
+import math
 import os
 import sys
 
 
 # Pillow 是必需依赖，若未安装则给出通用提示
 try:
-    from PIL import Image  # type: ignore[import]
+    from PIL import Image, ImageEnhance, ImageFilter, ImageStat  # type: ignore[import]
 except ImportError as exc:
     print("错误: 未安装 Pillow 图像库。")
     print("请在当前 Python 环境中执行：")
@@ -19,6 +20,13 @@ except ImportError as exc:
     print("  conda install pillow")
     raise SystemExit(1) from exc
 
+import pixel_art_engine
+import pixel_art_governor
+from pixel_art_engine import median_filter, resize
+from pixel_art_governor import ResourceLimitError, govern
+from pixel_art_ingest import NO_METADATA, Ingest, output_metadata
+from pixel_art_progress import ConversionCancelled, as_progress
+
 # ==================== 配置区域 ====================
 # 在这里直接修改配置，然后运行脚本即可
 
@@ -58,12 +66,482 @@ INTERPOLATION_MAP = {
 # 是否保持宽高比
 PRESERVE_ASPECT = True  # True保持宽高比，False强制为正方形
 
+# 缩小方式：'resize' 为插值缩小 + 最近邻取样；
+# 'mean' / 'median' / 'mode' 为块归约（每块取平均色/中位数/最常见颜色，需要 NumPy），
+# 结果更干净，且省去锐化、中值滤波和全尺寸预处理，整体更快
+DOWNSAMPLE_METHOD = 'resize'
+
+# 快速路径：输入本身已是像素画 / 少色图 / 调色板图时，直接按原生网格重采样，
+# 跳过增强预处理、锐化和颜色量化
+FAST_PATH = True  # True/False
+
+# 抖动方式（仅在颜色量化时生效）：None 保持原有行为（增强模式不抖动，普通模式 Floyd–Steinberg）
+# 可选：'none', 'bayer2', 'bayer4', 'bayer8', 'blue-noise',
+#       'floyd-steinberg', 'atkinson', 'sierra-lite', 'jarvis'
+DITHER = None
+
+# 颜色量化所用的色彩空间：'rgb' 为 Pillow 中值切割（原有行为）；
+# 'oklab' / 'lab' 在感知色彩空间中聚类（需要 NumPy），颜色少时肤色和渐变更准确
+QUANTIZE_SPACE = 'rgb'
+
+# 缓存目录（蓝噪声阈值图、调色板查找表等预计算结果）
+CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'pixel_art')
+
+# 画质增强的滤波在需要回报进度/支持取消时按水平条带执行，每条的行数
+STRIP_HEIGHT = 256
+
+# 画质增强 denoise=True 时的去噪方式：'median' 为 3x3 中值滤波（原有行为）；
+# 'guided'（自引导滤波）/ 'nlm'（快速非局部均值）为保边去噪，需要 NumPy，见 pixel_art_denoise
+DENOISE_METHOD = 'median'
+
+# USM 锐化作用的通道：'rgb' 为 R / G / B 各自锐化（原有行为）；'luma' 转换一次为 YCbCr，
+# 只锐化亮度平面（画质增强时放大后的锐化也只处理亮度），最后合并一次，锐化耗时约为三分之一
+SHARPEN_MODE = 'rgb'
+
+# 是否把输入的 EXIF（方向重置为 1）、ICC 配置文件和 DPI 写入输出文件（见 pixel_art_ingest）
+KEEP_METADATA = False
+
 # ================================================
 
+DENOISE_METHODS = ('median', 'guided', 'nlm')
+SHARPEN_MODES = ('rgb', 'luma')
+
+
+# ==================== 像素化各阶段 ====================
+# apply_pixel_art 由以下几个阶段组成；拆开是为了让参数扫描等场景
+# 可以复用共同的前缀阶段（解码、预处理、缩小），只重算不同的尾部阶段
+
+
+def boost_tone(img):
+    """轻微增强对比度和饱和度"""
+    # 轻微增强对比度
+    enhancer = ImageEnhance.Contrast(img)
+    img = enhancer.enhance(1.1)
+    # 轻微增强饱和度
+    enhancer = ImageEnhance.Color(img)
+    return enhancer.enhance(1.05)
+
+
+def check_sharpen_mode(sharpen_mode):
+    """sharpen_mode 不是 SHARPEN_MODES 之一时抛出 ValueError"""
+    if sharpen_mode not in SHARPEN_MODES:
+        raise ValueError(f"未知的锐化方式 '{sharpen_mode}'，可选: {', '.join(SHARPEN_MODES)}")
+
+
+def sharpen(img, usm, sharpen_mode='rgb'):
+    """USM 锐化 RGB 图像；sharpen_mode 为 'luma' 时只锐化 YCbCr 的亮度平面"""
+    if sharpen_mode == 'rgb':
+        return img.filter(usm)
+    y, cb, cr = img.convert('YCbCr').split()
+    return Image.merge('YCbCr', (y.filter(usm), cb, cr)).convert('RGB')
+
+
+def blend_lut(center, factor):
+    """center + factor * (v - center) 四舍五入并截断到 0-255 的查找表（用于 Image.point）"""
+    return [min(255, max(0, int(center + factor * (v - center) + 0.5))) for v in range(256)]
+
+
+def describe_ingest(source):
+    """打印读入时要做的方向校正和色彩转换"""
+    if source.orientation != 1:
+        print(f"EXIF 方向 {source.orientation}：按校正后的方向输出")
+    if source.transform is not None:
+        print("嵌入了 ICC 配置文件：转换到 sRGB")
+
+
+def pre_enhance(img, interpolation='bicubic', source=None):
+    """
+    增强模式预处理：先缩小再放大平滑细节，并轻微增强对比度和饱和度
+
+    source（pixel_art_ingest.Ingest）给出时按校正后的方向缩放（图像仍在原始方向上）。
+    """
+    scale = source.resize if source is not None else resize
+    original_size = img.size
+    # 先稍微缩小再放大，有助于平滑细节
+    pre_interpolation = INTERPOLATION_MAP.get(interpolation.lower(), Image.BICUBIC)
+    temp_size = (original_size[0] // 2, original_size[1] // 2)
+    temp_img = scale(img, temp_size, pre_interpolation)
+    img = scale(temp_img, original_size, pre_interpolation)
+    return boost_tone(img)
+
+
+def compute_target_size(original_size, pixel_size, preserve_aspect=True):
+    """计算像素化尺寸（宽度为 pixel_size，保持宽高比时高度按比例缩放）"""
+    if preserve_aspect:
+        aspect_ratio = original_size[1] / original_size[0]
+        return pixel_size, int(pixel_size * aspect_ratio)
+    return pixel_size, pixel_size
+
+
+def compute_final_size(original_size, scale_factor=None):
+    """计算最终输出尺寸（scale_factor 为 None 时保持原尺寸）"""
+    if scale_factor:
+        return int(original_size[0] * scale_factor), int(original_size[1] * scale_factor)
+    return original_size[0], original_size[1]
+
+
+def downsample_to_grid(img, target_size, enhance_mode=True, interpolation='bicubic',
+                       sharpen_mode='rgb', source=None):
+    """
+    缩小到目标像素尺寸
+
+    增强模式下会在缩小后轻微锐化边缘（创新算法1），sharpen_mode 见 SHARPEN_MODE。
+    source（pixel_art_ingest.Ingest）给出时 img 和 target_size 为原始方向，按校正后的方向缩放，
+    锐化之前校正方向和色彩，返回校正后的网格。
+    """
+    scale = source.resize if source is not None else resize
+    pre_interpolation = INTERPOLATION_MAP.get(interpolation.lower(), Image.BICUBIC)
+    target_width, target_height = target_size
+    # 是否分步缩小按校正后的宽度判断
+    oriented_width = source.stored_size(img.size)[0] if source is not None else img.size[0]
+    oriented_target = source.stored_size(target_size)[0] if source is not None else target_width
+
+    original = img
+    if enhance_mode and oriented_target < oriented_width // 2:
+        # 分步缩小：先用高质量插值（BICUBIC/LANCZOS）预处理，再用最近邻像素化
+        intermediate_size = (target_width * 2, target_height * 2)
+        pixelated = scale(img, intermediate_size, pre_interpolation)
+        # 最后一步必须用最近邻，保持清晰的像素边缘
+        pixelated = scale(pixelated, (target_width, target_height), Image.NEAREST)
+    else:
+        # 直接缩小，使用最近邻保持像素感
+        pixelated = scale(img, (target_width, target_height), Image.NEAREST)
+    if source is not None:
+        # 锐化的两趟模糊有先后，转置前后结果不同：先校正方向
+        pixelated = source.finish(pixelated, owned=pixelated is not original)
+
+    # 创新算法1：边缘增强（在像素化前增强边缘，保留更多细节）
+    if enhance_mode:
+        # 轻微锐化边缘
+        pixelated = sharpen(pixelated, ImageFilter.UnsharpMask(radius=1, percent=50, threshold=3),
+                            sharpen_mode)
+    return pixelated
+
+
+def quantize_colors(pixelated, color_reduction, enhance_mode=True, dither=None, space='rgb'):
+    """
+    颜色量化（减少颜色数量，增强像素艺术感）
+
+    dither 为 None 时保持原有行为；否则先用中值切割求调色板，
+    再交给抖动引擎（pixel_art_dither）映射。
+    space 为 'oklab' / 'lab' 时改为在该色彩空间中聚类求调色板，并按该空间中的距离映射
+    """
+    if space != 'rgb':
+        from pixel_art_palette import Palette
+        palette = Palette.fit(pixelated, color_reduction, space)
+        if dither is None:
+            # 与 RGB 路径的默认行为一致：增强模式不抖动，否则 Floyd–Steinberg
+            dither = 'none' if enhance_mode else 'floyd-steinberg'
+        pixelated = palette.apply(pixelated, dither)
+        if enhance_mode:
+            pixelated = ImageEnhance.Contrast(pixelated).enhance(1.05)
+        return pixelated
+
+    if dither is not None:
+        from pixel_art_dither import dither_to_palette
+        palette = pixelated.quantize(
+            colors=color_reduction,
+            method=Image.Quantize.MEDIANCUT,
+            dither=Image.Dither.NONE
+        )
+        full = palette.getpalette()
+        colors = [full[i * 3 + c] for _, i in sorted(palette.getcolors(256), key=lambda x: x[1])
+                  for c in range(3)]
+        pixelated = dither_to_palette(pixelated, colors, dither).convert('RGB')
+        if enhance_mode:
+            pixelated = ImageEnhance.Contrast(pixelated).enhance(1.05)
+        return pixelated
+
+    # 创新算法2：自适应颜色量化
+    # 先分析图像，根据内容动态调整量化参数
+    if enhance_mode:
+        # 使用中值切割算法，效果更好
+        pixelated = pixelated.quantize(
+            colors=color_reduction, 
+            method=Image.Quantize.MEDIANCUT,
+            dither=Image.Dither.NONE  # 不使用抖动，保持清晰的像素块
+        )
+        # 创新算法3：颜色后处理 - 轻微调整颜色以增强对比度
+        pixelated = pixelated.convert('RGB')
+        # 对每个像素进行轻微的颜色增强
+        enhancer = ImageEnhance.Contrast(pixelated)
+        return enhancer.enhance(1.05)  # 轻微增强对比度
+    pixelated = pixelated.quantize(colors=color_reduction, method=Image.Quantize.MEDIANCUT)
+    return pixelated.convert('RGB')
+
+
+def reduce_colors(pixelated, color_reduction, enhance_mode=True, dither=None, palette=None,
+                  space='rgb'):
+    """
+    颜色量化阶段：给出固定调色板时映射到该调色板，否则按 color_reduction 自适应量化
+
+    固定调色板的颜色不做后处理（对比度调整会让颜色偏离调色板）。
+    """
+    if palette is not None:
+        print(f"颜色映射: 固定调色板 {palette.name}（{len(palette)} 种颜色）")
+        return palette.apply(pixelated, dither)
+    if color_reduction:
+        space_note = "" if space == 'rgb' else f"（{space} 空间聚类）"
+        print(f"颜色量化: 减少到 {color_reduction} 种颜色{space_note}")
+        return quantize_colors(pixelated, color_reduction, enhance_mode, dither, space)
+    return pixelated
+
+
+def upscale_smoothing(pixelated_size, final_size, enhance_mode=True):
+    """放大后是否做中值滤波（增强模式下大幅放大时）"""
+    return enhance_mode and final_size[0] > pixelated_size[0] * 2
+
+
+def upscale_pixels(pixelated, final_size, enhance_mode=True, tiled=False):
+    """
+    放大到最终尺寸（使用最近邻插值，保持像素感）
+
+    tiled 为 True 时中值滤波按条带执行，峰值内存更低（结果相同）。
+    """
+    # 创新算法4：智能放大 - 使用最近邻保持像素感
+    final_img = resize(pixelated, final_size, Image.NEAREST)
+
+    # 创新算法5：最终优化 - 轻微去噪和平滑处理（可选）
+    if upscale_smoothing(pixelated.size, final_size, enhance_mode):
+        # 对于大幅放大，进行轻微的后处理优化
+        # 使用轻微的中值滤波去除放大产生的噪点
+        final_img = filter_in_strips(final_img, lambda strip: median_filter(strip, 3), 1,
+                                     tiled=tiled)
+    return final_img
+
+
+# 网格检测先抽查的行数 / 列数
+GRID_PROBE_LINES = 16
+
+
+def _block_size(rows, cols, width, height):
+    """rows 中相邻两列、cols 中相邻两行颜色不同处即为块边界，对边界位置求最大公约数"""
+    import numpy as np
+
+    col_edges = np.flatnonzero(np.any(rows[:, 1:] != rows[:, :-1], axis=(0, 2))) + 1
+    row_edges = np.flatnonzero(np.any(cols[1:] != cols[:-1], axis=(1, 2))) + 1
+    block_w = int(np.gcd.reduce(np.append(col_edges, width)))
+    block_h = int(np.gcd.reduce(np.append(row_edges, height)))
+    if block_w <= 1 and block_h <= 1:
+        return None
+    return block_w, block_h
+
+
+def detect_block_grid(img):
+    """
+    检测图像是否由整块放大的像素组成（已有的像素画），与颜色数无关
+
+    对每一列/行之间的颜色变化位置求最大公约数，得到块的宽高。
+    先只取均匀分布的 GRID_PROBE_LINES 行和列：抽查到的边界在整图中也是边界，
+    整图的块宽高只能是抽查结果的约数，抽查已是 1x1 时（照片几乎总是如此）不再扫描整图。
+    需要 NumPy；不可用时返回 None。
+
+    返回:
+        (块宽, 块高)，不是块状网格时返回 None
+    """
+    try:
+        import numpy as np
+    except ImportError:
+        return None
+
+    width, height = img.size
+
+    def lines(boxes):
+        parts = [np.asarray(img.crop(box)) for box in boxes]
+        return np.stack([p if p.ndim == 3 else p[:, :, None] for p in parts])
+
+    ys = np.unique(np.linspace(0, height - 1, min(height, GRID_PROBE_LINES)).astype(int))
+    xs = np.unique(np.linspace(0, width - 1, min(width, GRID_PROBE_LINES)).astype(int))
+    rows = lines([(0, y, width, y + 1) for y in ys])[:, 0]
+    cols = lines([(x, 0, x + 1, height) for x in xs])[:, :, 0].transpose(1, 0, 2)
+    if _block_size(rows, cols, width, height) is None:
+        return None
+
+    a = np.asarray(img)
+    if a.ndim == 2:
+        a = a[:, :, None]
+    return _block_size(a, a, width, height)
+
+
+def analyze_content(img, color_reduction=None, max_colors=256):
+    """
+    廉价的内容分析，判断能否走快速路径
+
+    - 调色板模式（P）的输入
+    - 颜色数不超过 color_reduction（未指定时不超过 max_colors）的少色图，
+      用 getcolors 的上限参数计数，超过上限立即停止
+    - 已有的块状像素网格（不论颜色多少，例如颜色丰富的像素画整数倍放大后；
+      先抽查少量行列，照片在抽查时即被排除）
+
+    返回:
+        dict: palette / colors（超过上限时为 None）/ grid / fast_path
+    """
+    limit = max(color_reduction or 0, max_colors)
+    colors = img.getcolors(maxcolors=limit)
+    info = {
+        'palette': img.mode == 'P',
+        'colors': len(colors) if colors is not None else None,
+        'grid': None,
+    }
+    info['grid'] = detect_block_grid(img)
+    few_colors = info['colors'] is not None and (
+        color_reduction is None or info['colors'] <= color_reduction
+    )
+    info['fast_path'] = info['palette'] or few_colors or info['grid'] is not None
+    return info
+
+
+def fast_pixel_art(img, info, target_size, final_size, color_reduction=None, enhance_mode=True,
+                   dither=None, palette=None, quantize_space='rgb', source=None):
+    """
+    快速路径：按原生网格直接重采样，颜色已足够少时跳过量化
+
+    img 为 RGB 图像，info 为 analyze_content 的结果。
+    source 给出时（pixel_art_ingest.Ingest），target_size 为原始方向上的尺寸，
+    缩小到网格后再校正方向和转换色彩；final_size 总是校正方向后的尺寸。
+    """
+    pixelated = fast_pixel_grid(img, info, target_size, color_reduction, enhance_mode, dither,
+                                palette, quantize_space, source)
+    return resize(pixelated, final_size, Image.NEAREST)
+
+
+def fast_pixel_grid(img, info, target_size, color_reduction=None, enhance_mode=True,
+                    dither=None, palette=None, quantize_space='rgb', source=None):
+    """快速路径放大之前的部分：返回像素网格（参数见 fast_pixel_art）"""
+    original = img
+    scale = source.resize if source is not None else resize
+    if info['grid'] is not None:
+        block_w, block_h = info['grid']
+        native_size = (max(1, img.size[0] // block_w), max(1, img.size[1] // block_h))
+        # 最近邻缩小到原生网格时恰好取每个块中心的像素
+        img = scale(img, native_size, Image.NEAREST)
+    pixelated = img if img.size == target_size else scale(img, target_size, Image.NEAREST)
+    if source is not None:
+        pixelated = source.finish(pixelated, owned=pixelated is not original)
+    if palette is not None:
+        pixelated = palette.apply(pixelated, dither)
+    elif color_reduction and (info['colors'] is None or info['colors'] > color_reduction):
+        pixelated = quantize_colors(pixelated, color_reduction, enhance_mode, dither,
+                                    quantize_space)
+    return pixelated
+
+
+def apply_pixel_art(img, pixel_size=32, scale_factor=None, color_reduction=None,
+                    preserve_aspect=True, enhance_mode=True, interpolation='bicubic',
+                    fast_path=True, downsample='resize', dither=None, palette=None,
+                    quantize_space='rgb', progress=None, cancel_event=None, tiled=False,
+                    sharpen_mode='rgb', ingest=True):
+    """
+    对内存中的图像执行像素画转换（不读写文件）
+
+    参数与 convert_to_pixel_art 相同（去掉输入/输出路径）。
+    tiled 为 True 时放大后的滤波按条带执行以降低峰值内存（由 pixel_art_governor 在预算不足时选用）。
+    ingest 为 True 时按 EXIF 方向校正、把 ICC 色彩转换到 sRGB（见 pixel_art_ingest），
+    两者都在缩小到像素网格之后进行，方向的结果与先转置整图逐位一致。
+    不会修改传入的图像对象，因此同一张图可以安全地交给多个处理分支共用。
+
+    返回:
+        转换后的 RGB 图像
+    """
+    check_sharpen_mode(sharpen_mode)
+    task = as_progress(progress, cancel_event)
+    task(0.0, "分析图像")
+    if palette is not None:
+        from pixel_art_palette import load_palette
+        # 调色板文件按 quantize_space 中的距离映射
+        palette = load_palette(palette, quantize_space)
+        color_reduction = None
+    # 尺寸按校正方向后计算；缩小在原始方向上进行，方向和色彩在网格上校正
+    source = Ingest(img, ingest)
+    original_size = source.size
+    print(f"原始图片尺寸: {original_size[0]}x{original_size[1]}")
+    describe_ingest(source)
+
+    # 快速路径：已是像素画 / 少色图 / 调色板图时无需按照片处理
+    info = analyze_content(img, color_reduction) if fast_path else None
+
+    # 转换为RGB模式（如果不是的话）
+    img = source.to_rgb(img)
+
+    if info is not None and info['fast_path']:
+        target_size = compute_target_size(original_size, pixel_size, preserve_aspect)
+        final_size = compute_final_size(original_size, scale_factor)
+        reasons = []
+        if info['palette']:
+            reasons.append("调色板图")
+        if info['colors'] is not None:
+            reasons.append(f"{info['colors']} 种颜色")
+        if info['grid'] is not None:
+            reasons.append(f"像素块 {info['grid'][0]}x{info['grid'][1]}")
+        print(f"检测到像素画/少色图像（{'，'.join(reasons)}），使用快速路径")
+        print(f"像素化尺寸: {target_size[0]}x{target_size[1]}")
+        print(f"最终输出尺寸: {final_size[0]}x{final_size[1]}")
+        task(0.1, "快速路径")
+        result = fast_pixel_art(img, info, source.stored_size(target_size), final_size, color_reduction,
+                                enhance_mode, dither, palette, quantize_space, source)
+        task(1.0, "完成")
+        return result
+
+    if downsample != 'resize':
+        # 块归约：每块一次性取代表色，无需全尺寸预处理和事后修补滤波
+        from pixel_art_blocks import block_reduce
+        target_size = compute_target_size(original_size, pixel_size, preserve_aspect)
+        print(f"像素化尺寸: {target_size[0]}x{target_size[1]}（块归约: {downsample}）")
+        task(0.05, "块归约缩小")
+        pixelated = source.finish(block_reduce(img, source.stored_size(target_size), downsample,
+                                               mirror=source.mirror), owned=True)
+        if enhance_mode:
+            # 对比度/饱和度是逐像素的全局调整，放到小图上做结果几乎相同
+            pixelated = boost_tone(pixelated)
+        task(0.5, "颜色量化")
+        pixelated = reduce_colors(pixelated, color_reduction, enhance_mode, dither, palette,
+                                  quantize_space)
+        final_size = compute_final_size(original_size, scale_factor)
+        print(f"最终输出尺寸: {final_size[0]}x{final_size[1]}")
+        task(0.8, "放大")
+        result = resize(pixelated, final_size, Image.NEAREST)
+        task(1.0, "完成")
+        return result
+
+    # 增强模式：先进行轻微降噪和对比度增强
+    if enhance_mode:
+        print("启用增强模式：优化图像质量...")
+        task(0.05, "增强预处理")
+        img = pre_enhance(img, interpolation, source)
+
+    # 计算目标尺寸（保持宽高比）
+    target_size = compute_target_size(original_size, pixel_size, preserve_aspect)
+    print(f"像素化尺寸: {target_size[0]}x{target_size[1]}")
+
+    # 第一步：缩小到目标像素尺寸（根据选择的插值方法进行预处理）
+    if enhance_mode and target_size[0] < original_size[0] // 2:
+        print(f"使用 {interpolation.upper()} 插值进行预处理...")
+    task(0.4, "缩小")
+    pixelated = downsample_to_grid(img, source.stored_size(target_size), enhance_mode, interpolation,
+                                   sharpen_mode, source)
+    del img  # 全尺寸中间图不再需要
+
+    # 颜色量化（减少颜色数量，增强像素艺术感）
+    task(0.5, "颜色量化")
+    pixelated = reduce_colors(pixelated, color_reduction, enhance_mode, dither, palette,
+                              quantize_space)
+
+    # 第二步：放大到最终尺寸（使用最近邻插值，保持像素感）
+    final_size = compute_final_size(original_size, scale_factor)
+    print(f"最终输出尺寸: {final_size[0]}x{final_size[1]}")
+
+    # 固定调色板时不做中值滤波，避免产生调色板以外的颜色
+    task(0.8, "放大")
+    result = upscale_pixels(pixelated, final_size, enhance_mode and palette is None, tiled)
+    task(1.0, "完成")
+    return result
+
 
 def convert_to_pixel_art(input_path, output_path, pixel_size=32, scale_factor=None, 
                          color_reduction=None, preserve_aspect=True, enhance_mode=True,
-                         interpolation='bicubic'):
+                         interpolation='bicubic', fast_path=True, downsample='resize',
+                         dither=None, palette=None, quantize_space='rgb', progress=None,
+                         cancel_event=None, sharpen_mode='rgb', keep_metadata=KEEP_METADATA):
     """
     将图片转换为像素艺术风格
     
@@ -77,112 +555,56 @@ def convert_to_pixel_art(input_path, output_path, pixel_size=32, scale_factor=No
         enhance_mode: 是否启用增强模式
         interpolation: 插值方法 ('nearest', 'bicubic', 'lanczos')
                        用于预处理阶段，最终像素化仍使用最近邻
+        fast_path: 输入已是像素画/少色图/调色板图时走快速路径
+        downsample: 缩小方式（'resize' 插值缩小；'mean'/'median'/'mode' 块归约）
+        dither: 颜色量化时的抖动方式（None 保持原有行为，可选值见 pixel_art_dither）
+        palette: 固定调色板（pixel_art_palette.Palette 对象，或 .gpl/.hex/.txt/图片文件路径），
+                 给出时代替 color_reduction，把颜色映射到该调色板
+        quantize_space: 颜色量化的色彩空间（'rgb' 中值切割；'oklab' / 'lab' 感知空间聚类），
+                        同时决定 palette 为文件路径时求最近颜色所用的色彩空间
+        progress: 进度回调 progress(fraction, message)，见 pixel_art_progress
+        cancel_event: threading.Event，被 set 后抛出 ConversionCancelled，不写出文件
+        sharpen_mode: 增强模式缩小后的锐化作用的通道（'rgb' / 'luma'，见 SHARPEN_MODE）
+        keep_metadata: 把输入的 EXIF、ICC 配置文件和 DPI 写入输出（见 KEEP_METADATA）
     """
     try:
-        # 打开原始图片
+        # 打开原始图片（只读文件头），按尺寸和参数估算内存，超出预算时分块执行或拒绝
         img = Image.open(input_path)
-        original_size = img.size
-        print(f"原始图片尺寸: {original_size[0]}x{original_size[1]}")
-        
-        # 转换为RGB模式（如果不是的话）
-        if img.mode != 'RGB':
-            img = img.convert('RGB')
-        
-        # 增强模式：先进行轻微降噪和对比度增强
-        if enhance_mode:
-            print("启用增强模式：优化图像质量...")
-            from PIL import ImageEnhance
-            # 先稍微缩小再放大，有助于平滑细节
-            pre_interpolation = INTERPOLATION_MAP.get(interpolation.lower(), Image.BICUBIC)
-            temp_size = (original_size[0] // 2, original_size[1] // 2)
-            temp_img = img.resize(temp_size, pre_interpolation)
-            img = temp_img.resize(original_size, pre_interpolation)
-            # 轻微增强对比度
-            enhancer = ImageEnhance.Contrast(img)
-            img = enhancer.enhance(1.1)
-            # 轻微增强饱和度
-            enhancer = ImageEnhance.Color(img)
-            img = enhancer.enhance(1.05)
-        
-        # 计算目标尺寸（保持宽高比）
-        if preserve_aspect:
-            aspect_ratio = original_size[1] / original_size[0]
-            target_width = pixel_size
-            target_height = int(pixel_size * aspect_ratio)
-        else:
-            target_width = pixel_size
-            target_height = pixel_size
-        
-        print(f"像素化尺寸: {target_width}x{target_height}")
-        
-        # 第一步：缩小到目标像素尺寸（根据选择的插值方法进行预处理）
-        pre_interpolation = INTERPOLATION_MAP.get(interpolation.lower(), Image.BICUBIC)
-        
-        if enhance_mode and target_width < original_size[0] // 2:
-            # 分步缩小：先用高质量插值（BICUBIC/LANCZOS）预处理，再用最近邻像素化
-            print(f"使用 {interpolation.upper()} 插值进行预处理...")
-            intermediate_size = (target_width * 2, target_height * 2)
-            pixelated = img.resize(intermediate_size, pre_interpolation)
-            # 最后一步必须用最近邻，保持清晰的像素边缘
-            pixelated = pixelated.resize((target_width, target_height), Image.NEAREST)
-        else:
-            # 直接缩小，使用最近邻保持像素感
-            pixelated = img.resize((target_width, target_height), Image.NEAREST)
-        
-        # 创新算法1：边缘增强（在像素化前增强边缘，保留更多细节）
-        if enhance_mode:
-            from PIL import ImageFilter
-            # 轻微锐化边缘
-            pixelated = pixelated.filter(ImageFilter.UnsharpMask(radius=1, percent=50, threshold=3))
-        
-        # 颜色量化（减少颜色数量，增强像素艺术感）
-        if color_reduction:
-            print(f"颜色量化: 减少到 {color_reduction} 种颜色")
-            # 创新算法2：自适应颜色量化
-            # 先分析图像，根据内容动态调整量化参数
-            if enhance_mode:
-                # 使用中值切割算法，效果更好
-                pixelated = pixelated.quantize(
-                    colors=color_reduction, 
-                    method=Image.Quantize.MEDIANCUT,
-                    dither=Image.Dither.NONE  # 不使用抖动，保持清晰的像素块
-                )
-                # 创新算法3：颜色后处理 - 轻微调整颜色以增强对比度
-                pixelated = pixelated.convert('RGB')
-                # 对每个像素进行轻微的颜色增强
-                from PIL import ImageEnhance
-                enhancer = ImageEnhance.Contrast(pixelated)
-                pixelated = enhancer.enhance(1.05)  # 轻微增强对比度
-            else:
-                pixelated = pixelated.quantize(colors=color_reduction, method=Image.Quantize.MEDIANCUT)
-                pixelated = pixelated.convert('RGB')
-        
-        # 第二步：放大到最终尺寸（使用最近邻插值，保持像素感）
-        if scale_factor:
-            final_width = int(original_size[0] * scale_factor)
-            final_height = int(original_size[1] * scale_factor)
-        else:
-            final_width = original_size[0]
-            final_height = original_size[1]
-        
-        print(f"最终输出尺寸: {final_width}x{final_height}")
-        
-        # 创新算法4：智能放大 - 使用最近邻保持像素感
-        final_img = pixelated.resize((final_width, final_height), Image.NEAREST)
-        
-        # 创新算法5：最终优化 - 轻微去噪和平滑处理（可选）
-        if enhance_mode and final_width > target_width * 2:
-            # 对于大幅放大，进行轻微的后处理优化
-            from PIL import ImageFilter
-            # 使用轻微的中值滤波去除放大产生的噪点
-            final_img = final_img.filter(ImageFilter.MedianFilter(size=3))
+        metadata = output_metadata(img, keep_metadata)
+        budget_params = {'scale_factor': scale_factor, 'enhance_mode': enhance_mode,
+                         'downsample': downsample, 'palette': palette}
+        with govern('pixelate', img.size, img.mode, budget_params) as plan:
+            final_img = apply_pixel_art(
+                img,
+                pixel_size=pixel_size,
+                scale_factor=scale_factor,
+                color_reduction=color_reduction,
+                preserve_aspect=preserve_aspect,
+                enhance_mode=enhance_mode,
+                interpolation=interpolation,
+                fast_path=fast_path,
+                downsample=downsample,
+                dither=dither,
+                palette=palette,
+                quantize_space=quantize_space,
+                progress=progress,
+                cancel_event=cancel_event,
+                tiled=plan.tiled,
+                sharpen_mode=sharpen_mode,
+            )
         
         # 保存结果
-        final_img.save(output_path)
+        final_img.save(output_path, **metadata)
         print(f"✓ 转换完成！输出文件: {output_path}")
         
         return final_img
         
+    except ConversionCancelled:
+        print("已取消")
+        raise
+    except ResourceLimitError as e:
+        print(f"错误: {e}")
+        sys.exit(1)
     except FileNotFoundError:
         print(f"错误: 找不到输入文件 '{input_path}'")
         print("请检查文件路径是否正确")
@@ -203,8 +625,178 @@ def convert_to_pixel_art(input_path, output_path, pixel_size=32, scale_factor=No
         sys.exit(1)
 
 
+def blur_halo(radius):
+    """半径为 radius 的高斯模糊 / USM 在条带上下需要多取的行数"""
+    return int(math.ceil(3 * radius)) + 4
+
+
+def filter_in_strips(img, func, halo, task=None, tiled=False):
+    """
+    按水平条带执行 func（图像 -> 同尺寸图像），每条之前回报进度并检查取消
+
+    每条上下多取 halo 行一起处理再裁掉，只要 halo 不小于滤波器的作用范围，
+    结果就与 func(img) 逐像素一致；滤波器的临时缓冲也只有一条大小，峰值内存更低。
+    tiled 为 False 且没有进度回调和取消事件时直接整图处理。
+    """
+    interactive = task is not None and (task.callback is not None or task.cancel_event is not None)
+    if not (tiled or interactive) or img.size[1] <= STRIP_HEIGHT:
+        return func(img)
+    width, height = img.size
+    out = Image.new(img.mode, img.size)
+    for top in range(0, height, STRIP_HEIGHT):
+        if task is not None:
+            task(top / height)
+        bottom = min(top + STRIP_HEIGHT, height)
+        lo, hi = max(0, top - halo), min(height, bottom + halo)
+        strip = func(img.crop((0, lo, width, hi)))
+        out.paste(strip.crop((0, top - lo, width, bottom - lo)), (0, top))
+    if task is not None:
+        task(1.0)
+    return out
+
+
+def resolve_denoise(denoise):
+    """denoise 参数 -> 去噪方式：True 为 DENOISE_METHOD，False / None / 'none' 为 None（不去噪）"""
+    if denoise is True:
+        denoise = DENOISE_METHOD
+    if not denoise or denoise == 'none':
+        return None
+    if denoise not in DENOISE_METHODS:
+        raise ValueError(f"未知的去噪方式 '{denoise}'，可选: {', '.join(DENOISE_METHODS)}")
+    return denoise
+
+
+def apply_quality_enhance(img, sharpness=1.5, contrast=1.1, saturation=1.05,
+                          denoise=True, upscale_factor=None, progress=None, cancel_event=None,
+                          tiled=False, denoise_luma=False, sharpen_mode='rgb', ingest=True):
+    """
+    对内存中的图像执行画质增强（不读写文件）
+
+    参数与 enhance_image_quality 相同（去掉输入/输出路径）。
+    不会修改传入的图像对象。tiled 为 True 时各滤波步骤按条带执行以降低峰值内存
+    （保边去噪总是按条带执行）。ingest 为 True 时按 EXIF 方向校正、把 ICC 色彩转换到 sRGB
+    （见 pixel_art_ingest），在去噪之后、放大之前进行。
+
+    返回:
+        增强后的 RGB 图像
+    """
+    check_sharpen_mode(sharpen_mode)
+    task = as_progress(progress, cancel_event)
+    # 不放大时前三步占满进度；放大时最后两步占 30%
+    end = 0.7 if upscale_factor and upscale_factor > 1.0 else 1.0
+    source = Ingest(img, ingest)
+    original_size = source.size
+    print(f"原始图片尺寸: {original_size[0]}x{original_size[1]}")
+    describe_ingest(source)
+
+    # 转换为RGB模式（如果不是的话）
+    input_img = img
+    img = source.to_rgb(img)
+
+    # 步骤1：去噪（如果启用，使用温和设置，避免涂抹细节）
+    method = resolve_denoise(denoise)
+    if method == 'median':
+        print("去噪处理（温和）...")
+        task(0.0, "去噪")
+        img = filter_in_strips(img, lambda strip: median_filter(strip, 3), 1,
+                               task.span(0.0, 0.3 * end), tiled)
+    elif method:
+        from pixel_art_denoise import denoise as edge_preserving_denoise
+        print(f"保边去噪（{method}，{'仅亮度' if denoise_luma else 'RGB 各通道'}）...")
+        task(0.0, "去噪")
+        img = edge_preserving_denoise(img, method, denoise_luma, task.span(0.0, 0.3 * end))
+
+    # 校正方向、转换到 sRGB（放大之前，图像最小的时候；去噪等滤波与方向无关）
+    img = source.finish(img, owned=img is not input_img)
+    del input_img
+
+    # 亮度模式：转换一次为 YCbCr，锐化/模糊和放大后的锐化只处理亮度平面，最后合并一次
+    luma = sharpen_mode == 'luma'
+    if luma:
+        work, cb, cr = img.convert('YCbCr').split()
+    else:
+        work = img
+
+    # 步骤2：锐化/模糊控制
+    print(f"锐化/模糊处理（强度: {sharpness}{'，仅亮度' if luma else ''}）...")
+    task(0.3 * end, "锐化" if sharpness >= 1.0 else "模糊")
+    if sharpness >= 1.0:
+        # 温和锐化（避免电路板感）
+        sharpen_percent = int(min(sharpness * 80, 150))
+        usm = ImageFilter.UnsharpMask(
+            radius=1.0,
+            percent=sharpen_percent,
+            threshold=3
+        )
+        work = filter_in_strips(work, lambda strip: strip.filter(usm), blur_halo(usm.radius),
+                                task.span(0.3 * end, 0.7 * end), tiled)
+    else:
+        # 更强的模糊：数值越小越模糊，0.1 -> 半径约 4.5
+        blur_radius = max(0.0, min((1.0 - sharpness) * 5.0, 8.0))
+        if blur_radius > 0:
+            blur = ImageFilter.GaussianBlur(radius=blur_radius)
+            work = filter_in_strips(work, lambda strip: strip.filter(blur), blur_halo(blur_radius),
+                                    task.span(0.3 * end, 0.7 * end), tiled)
+
+    # 步骤3：轻微对比度增强
+    print(f"对比度增强（倍数: {contrast}）...")
+    # 与 ImageEnhance.Contrast 相同：向整图灰度均值混合（均值按整图计算，混合可按条带进行）
+    mean = int(ImageStat.Stat(work if luma else work.convert('L')).mean[0] + 0.5)
+
+    # 步骤4：轻微饱和度增强
+    print(f"饱和度增强（倍数: {saturation}）...")
+
+    def adjust_tone(strip):
+        gray = Image.new('L', strip.size, mean).convert(strip.mode)
+        strip = Image.blend(gray, strip, min(contrast, 1.3))
+        return ImageEnhance.Color(strip).enhance(min(saturation, 1.3))
+
+    task(0.7 * end, "对比度 / 饱和度")
+    if luma:
+        # YCbCr 中：对比度是亮度向均值、色度向 128 的缩放，饱和度只缩放色度（逐像素查表）
+        chroma = blend_lut(128, min(contrast, 1.3) * min(saturation, 1.3))
+        work = work.point(blend_lut(mean, min(contrast, 1.3)))
+        cb, cr = cb.point(chroma), cr.point(chroma)
+    else:
+        work = filter_in_strips(work, adjust_tone, 0, task.span(0.7 * end, end), tiled)
+    
+    # 步骤5：可选放大（使用高质量算法）
+    if upscale_factor and upscale_factor > 1.0:
+        print(f"高质量放大处理（倍数: {upscale_factor}）...")
+        new_size = (int(original_size[0] * upscale_factor), 
+                   int(original_size[1] * upscale_factor))
+        task(0.7, "放大")
+        work = resize(work, new_size, Image.LANCZOS)
+        if luma:
+            cb, cr = resize(cb, new_size, Image.LANCZOS), resize(cr, new_size, Image.LANCZOS)
+        # 放大后轻微锐化，适度恢复细节
+        usm = ImageFilter.UnsharpMask(radius=1.0, percent=60, threshold=3)
+        work = filter_in_strips(work, lambda strip: strip.filter(usm), blur_halo(usm.radius),
+                                task.span(0.8, 1.0), tiled)
+
+    img = Image.merge('YCbCr', (work, cb, cr)).convert('RGB') if luma else work
+    task(1.0, "完成")
+    return img
+
+
+def save_image(img, output_path, metadata=None):
+    """
+    按输出扩展名选择保存参数（JPEG 使用高质量 + 优化）
+
+    metadata: 额外的保存参数（pixel_art_ingest.output_metadata() 的结果：EXIF / ICC / DPI），
+              None 时不写元数据（见 pixel_art_ingest.NO_METADATA）
+    """
+    metadata = NO_METADATA if metadata is None else metadata
+    if output_path.lower().endswith('.jpg') or output_path.lower().endswith('.jpeg'):
+        img.save(output_path, quality=95, optimize=True, **metadata)
+    else:
+        img.save(output_path, quality=95, **metadata)
+
+
 def enhance_image_quality(input_path, output_path, sharpness=1.5, contrast=1.1,
-                          saturation=1.05, denoise=True, upscale_factor=None):
+                          saturation=1.05, denoise=True, upscale_factor=None, progress=None,
+                          cancel_event=None, denoise_luma=False, sharpen_mode='rgb',
+                          keep_metadata=KEEP_METADATA):
     """
     增强图像画质，让模糊的照片变清晰，特别优化细节处理
     
@@ -214,70 +806,47 @@ def enhance_image_quality(input_path, output_path, sharpness=1.5, contrast=1.1,
         sharpness: 清晰/模糊控制（<1 模糊，1 不变，>1 锐化，推荐 0.1~3）
         contrast: 对比度（0.5-1.5，1 为不变，<1 变平，>1 变强）
         saturation: 饱和度（0.5-1.3，1 为不变，<1 变灰，>1 更艳）
-        denoise: 是否去噪（True/False）
+        denoise: 去噪方式：True 使用 DENOISE_METHOD，False 不去噪，
+                 或 'median'（3x3 中值）/ 'guided'（自引导滤波）/ 'nlm'（快速非局部均值）
         upscale_factor: 放大倍数（None表示不放大，2.0表示放大2倍）
+        progress: 进度回调 progress(fraction, message)，见 pixel_art_progress
+        cancel_event: threading.Event，被 set 后抛出 ConversionCancelled，不写出文件
+        denoise_luma: 保边去噪（'guided' / 'nlm'）只处理亮度，更快但保留颜色噪声
+        sharpen_mode: 锐化/模糊与放大后锐化作用的通道：'rgb' 各通道，'luma' 只处理 YCbCr 的亮度平面
+        keep_metadata: 把输入的 EXIF、ICC 配置文件和 DPI 写入输出（见 KEEP_METADATA）
     """
     try:
-        from PIL import ImageFilter, ImageEnhance
-        
-        # 打开原始图片
+        # 打开原始图片（只读文件头），按尺寸和参数估算内存，超出预算时分块执行或拒绝
         img = Image.open(input_path)
-        original_size = img.size
-        print(f"原始图片尺寸: {original_size[0]}x{original_size[1]}")
-        
-        # 转换为RGB模式（如果不是的话）
-        if img.mode != 'RGB':
-            img = img.convert('RGB')
-        
-        # 步骤1：去噪（如果启用，使用温和设置，避免涂抹细节）
-        if denoise:
-            print("去噪处理（温和）...")
-            img = img.filter(ImageFilter.MedianFilter(size=3))
-
-        # 步骤2：锐化/模糊控制
-        print(f"锐化/模糊处理（强度: {sharpness}）...")
-        if sharpness >= 1.0:
-            # 温和锐化（避免电路板感）
-            sharpen_percent = int(min(sharpness * 80, 150))
-            img = img.filter(ImageFilter.UnsharpMask(
-                radius=1.0,
-                percent=sharpen_percent,
-                threshold=3
-            ))
-        else:
-            # 更强的模糊：数值越小越模糊，0.1 -> 半径约 4.5
-            blur_radius = max(0.0, min((1.0 - sharpness) * 5.0, 8.0))
-            if blur_radius > 0:
-                img = img.filter(ImageFilter.GaussianBlur(radius=blur_radius))
-
-        # 步骤3：轻微对比度增强
-        print(f"对比度增强（倍数: {contrast}）...")
-        enhancer = ImageEnhance.Contrast(img)
-        img = enhancer.enhance(min(contrast, 1.3))
-
-        # 步骤4：轻微饱和度增强
-        print(f"饱和度增强（倍数: {saturation}）...")
-        enhancer = ImageEnhance.Color(img)
-        img = enhancer.enhance(min(saturation, 1.3))
-        
-        # 步骤5：可选放大（使用高质量算法）
-        if upscale_factor and upscale_factor > 1.0:
-            print(f"高质量放大处理（倍数: {upscale_factor}）...")
-            new_size = (int(original_size[0] * upscale_factor), 
-                       int(original_size[1] * upscale_factor))
-            img = img.resize(new_size, Image.LANCZOS)
-            # 放大后轻微锐化，适度恢复细节
-            img = img.filter(ImageFilter.UnsharpMask(radius=1.0, percent=60, threshold=3))
+        metadata = output_metadata(img, keep_metadata)
+        budget_params = {'upscale_factor': upscale_factor, 'denoise': resolve_denoise(denoise)}
+        with govern('enhance', img.size, img.mode, budget_params) as plan:
+            img = apply_quality_enhance(
+                img,
+                sharpness=sharpness,
+                contrast=contrast,
+                saturation=saturation,
+                denoise=denoise,
+                upscale_factor=upscale_factor,
+                progress=progress,
+                cancel_event=cancel_event,
+                tiled=plan.tiled,
+                denoise_luma=denoise_luma,
+                sharpen_mode=sharpen_mode,
+            )
         
         # 保存结果（使用高质量保存）
-        if output_path.lower().endswith('.jpg') or output_path.lower().endswith('.jpeg'):
-            img.save(output_path, quality=95, optimize=True)
-        else:
-            img.save(output_path, quality=95)
+        save_image(img, output_path, metadata)
         print(f"✓ 画质增强完成！输出文件: {output_path}")
         
         return img
         
+    except ConversionCancelled:
+        print("已取消")
+        raise
+    except ResourceLimitError as e:
+        print(f"错误: {e}")
+        sys.exit(1)
     except FileNotFoundError:
         print(f"错误: 找不到输入文件 '{input_path}'")
         print("请检查文件路径是否正确")
@@ -298,32 +867,289 @@ def enhance_image_quality(input_path, output_path, sharpness=1.5, contrast=1.1,
         sys.exit(1)
 
 
-if __name__ == '__main__':
+def build_arg_parser():
+    """命令行参数（未指定的参数沿用顶部配置区域的值）"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="像素画风格转换器（命令行模式）")
+    parser.add_argument('input', nargs='?', default=INPUT_IMAGE,
+                        help="输入图片路径（默认使用配置区域的 INPUT_IMAGE）")
+    parser.add_argument('output', nargs='?', default=OUTPUT_IMAGE,
+                        help="输出图片路径（默认使用配置区域的 OUTPUT_IMAGE）")
+    parser.add_argument('--pixel-size', type=int, default=PIXEL_SIZE, help="像素化宽度")
+    parser.add_argument('--scale-factor', type=float, default=SCALE_FACTOR, help="输出缩放倍数")
+    parser.add_argument('--colors', type=int, default=COLOR_REDUCTION, help="颜色数量（0 表示不减少）")
+    parser.add_argument('--interpolation', choices=sorted(INTERPOLATION_MAP),
+                        default=INTERPOLATION_METHOD, help="预处理插值方法")
+    parser.add_argument('--enhance', dest='enhance_mode', action='store_true', help="启用增强模式")
+    parser.add_argument('--no-enhance', dest='enhance_mode', action='store_false', help="关闭增强模式")
+    parser.add_argument('--square', dest='preserve_aspect', action='store_false', help="强制为正方形")
+    parser.add_argument('--downsample', choices=('resize', 'mean', 'median', 'mode'),
+                        default=DOWNSAMPLE_METHOD, help="缩小方式：插值缩小或块归约")
+    parser.add_argument('--dither', default=DITHER,
+                        choices=('none', 'bayer2', 'bayer4', 'bayer8', 'blue-noise',
+                                 'floyd-steinberg', 'atkinson', 'sierra-lite', 'jarvis'),
+                        help="颜色量化时的抖动方式（默认沿用原有行为）")
+    parser.add_argument('--quantize-space', choices=('rgb', 'oklab', 'lab'), default=QUANTIZE_SPACE,
+                        help="颜色量化的色彩空间（oklab / lab 在感知空间中聚类，少色时更准确）")
+    parser.add_argument('--sharpen-mode', choices=SHARPEN_MODES, default=SHARPEN_MODE,
+                        help="增强模式锐化作用的通道（luma 只锐化 YCbCr 的亮度）")
+    parser.add_argument('--keep-metadata', action='store_true', default=KEEP_METADATA,
+                        help="把输入的 EXIF / ICC 配置文件 / DPI 写入输出")
+    parser.add_argument('--palette', metavar='FILE',
+                        help="固定调色板文件（.gpl/.hex/.txt/图片），代替 --colors")
+    parser.add_argument('--no-fast-path', dest='fast_path', action='store_false',
+                        help="关闭像素画/少色图快速路径，始终按照片处理")
+    parser.set_defaults(enhance_mode=ENHANCE_MODE, preserve_aspect=PRESERVE_ASPECT,
+                        fast_path=FAST_PATH)
+    parser.add_argument('--job', metavar='FILE',
+                        help="执行 JSON/TOML 任务图（多步骤流水线，见 pixel_art_pipeline.py）")
+    parser.add_argument('--workers', type=int, default=None, help="并行线程数")
+    parser.add_argument('--engine', choices=pixel_art_engine.ENGINES, default=pixel_art_engine.ENGINE,
+                        help="缩放/滤波引擎：pillow 只用 Pillow（默认）；auto 第一次使用时测试各后端，"
+                             "自动选用与 Pillow 结果一致的更快后端（结果缓存到 ~/.cache/pixel_art/）")
+    parser.add_argument('--memory-budget', type=int, metavar='MB',
+                        help="全局内存预算（默认物理内存的一半），并行任务合计超出时排队")
+    parser.add_argument('--job-memory-budget', type=int, metavar='MB',
+                        help="单个任务的内存预算，超出时改为分块执行，仍超出则拒绝")
+    parser.add_argument('--profile', metavar='DIR',
+                        help="性能分析：把统计文件、火焰图折叠栈和可重放的任务描述写入 DIR"
+                             "（单张转换或 --job，见 pixel_art_profile.py）")
+
+    # 增量批量处理：input / output 为目录，按清单只处理新增或变化的文件
+    batch = parser.add_argument_group("批量处理")
+    batch.add_argument('--batch', action='store_true',
+                       help="把 input / output 视为目录，增量批量转换（见 pixel_art_batch.py）")
+    batch.add_argument('--manifest', metavar='FILE',
+                       help="清单文件路径（默认为输出目录下的 .pixel_art_manifest.json）")
+    batch.add_argument('--dry-run', action='store_true', help="只报告将处理/跳过的数量，不做改动")
+
+    # 参数扫描：共享前缀阶段，只展开不同的尾部，输出带标注的对比图
+    sweep = parser.add_argument_group("参数扫描")
+    sweep.add_argument('--sweep', metavar='SHEET',
+                       help="执行参数扫描并把对比图保存到 SHEET（见 pixel_art_sweep.py）")
+    sweep.add_argument('--sweep-pixel-sizes', type=_int_list, metavar='LIST',
+                       help="像素大小候选，逗号分隔，例如 32,64,96")
+    sweep.add_argument('--sweep-colors', type=_int_list, metavar='LIST',
+                       help="颜色数量候选，逗号分隔（0 表示不减少）")
+    sweep.add_argument('--sweep-interpolations', type=_interp_list, metavar='LIST',
+                       help="插值方法候选，逗号分隔")
+    sweep.add_argument('--sweep-dir', metavar='DIR', help="同时把每个组合的完整尺寸结果写入该目录")
+    sweep.add_argument('--tile-width', type=int, default=256, help="对比图中缩略图的宽度")
+
+    # 图像序列 / 视频：帧目录或标准输入的原始帧
+    sequence = parser.add_argument_group("图像序列 / 视频")
+    sequence.add_argument('--sequence', action='store_true',
+                          help="input 为帧目录或 -（标准输入的原始 RGB24 帧），output 为目录或 -（标准输出）")
+    sequence.add_argument('--frame-size', type=_frame_size, metavar='WxH',
+                          help="原始帧的尺寸（从标准输入读取时必填）")
+    sequence.add_argument('--palette-smoothing', type=float, default=None, metavar='ALPHA',
+                          help="调色板跨帧平滑系数（0-1，越小越稳定，默认 0.3）")
+    sequence.add_argument('--reuse-threshold', type=float, default=None, metavar='DIFF',
+                          help="网格平均差异不超过该值时复用上一帧的输出（默认 0，只复用相同的帧）")
+    return parser
+
+
+def _frame_size(text):
+    import argparse
     try:
-        # 检查输入文件是否存在
-        if not os.path.exists(INPUT_IMAGE):
-            print(f"错误: 找不到输入文件 '{INPUT_IMAGE}'")
-            print("请在代码顶部的配置区域修改 INPUT_IMAGE 路径")
+        width, height = (int(v) for v in text.lower().split('x'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"帧尺寸格式应为 宽x高，例如 1280x720: {text}")
+    return width, height
+
+
+def _int_list(text):
+    return [int(v) for v in text.split(',') if v.strip()]
+
+
+def _interp_list(text):
+    import argparse
+    values = [v.strip().lower() for v in text.split(',') if v.strip()]
+    unknown = [v for v in values if v not in INTERPOLATION_MAP]
+    if unknown:
+        raise argparse.ArgumentTypeError(f"未知插值方法: {', '.join(unknown)}")
+    return values
+
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    pixel_art_engine.use_engine(args.engine)
+    pixel_art_governor.set_budget(
+        args.memory_budget << 20 if args.memory_budget else None,
+        args.job_memory_budget << 20 if args.job_memory_budget else None,
+    )
+
+    if args.profile and (args.batch or args.sequence or args.sweep):
+        print("错误: --profile 只用于单张转换或 --job")
+        sys.exit(1)
+
+    # 任务图模式：按任务文件串联多个步骤
+    if args.job:
+        from pixel_art_pipeline import JobError, load_job, run_job_file
+        try:
+            if args.profile:
+                from pixel_art_profile import profile_job
+                profile_job(load_job(args.job), args.profile)
+            else:
+                run_job_file(args.job, max_workers=args.workers)
+        except JobError as e:
+            print(f"错误: 任务描述无效 - {e}")
             sys.exit(1)
-        
-        # 检查输出目录是否存在
-        output_dir = os.path.dirname(OUTPUT_IMAGE)
-        if output_dir and not os.path.exists(output_dir):
-            print(f"错误: 输出目录不存在 '{output_dir}'")
-            print("请创建目录或修改 OUTPUT_IMAGE 路径")
+        except (ResourceLimitError, OSError) as e:
+            # 任务文件、输入或输出路径不可用，或超出内存预算
+            print(f"错误: {e}")
             sys.exit(1)
-        
-        # 执行转换
-        convert_to_pixel_art(
-            input_path=INPUT_IMAGE,
-            output_path=OUTPUT_IMAGE,
-            pixel_size=PIXEL_SIZE,
-            scale_factor=SCALE_FACTOR,
-            color_reduction=COLOR_REDUCTION,
-            preserve_aspect=PRESERVE_ASPECT,
-            enhance_mode=ENHANCE_MODE,
-            interpolation=INTERPOLATION_METHOD
-        )
+        return
+
+    # 序列模式：按帧目录或原始帧流处理
+    if args.sequence:
+        from pixel_art_sequence import PALETTE_SMOOTHING, REUSE_THRESHOLD, run_sequence
+        if args.input != '-' and not os.path.isdir(args.input):
+            print(f"错误: 帧目录不存在 '{args.input}'")
+            sys.exit(1)
+        try:
+            run_sequence(
+                args.input,
+                args.output,
+                frame_size=args.frame_size,
+                max_workers=args.workers,
+                pixel_size=args.pixel_size,
+                scale_factor=args.scale_factor,
+                color_reduction=args.colors or None,
+                preserve_aspect=args.preserve_aspect,
+                enhance_mode=args.enhance_mode,
+                interpolation=args.interpolation,
+                downsample=args.downsample,
+                dither=args.dither,
+                palette=args.palette,
+                quantize_space=args.quantize_space,
+                sharpen_mode=args.sharpen_mode,
+                smoothing=(PALETTE_SMOOTHING if args.palette_smoothing is None
+                           else args.palette_smoothing),
+                reuse_threshold=(REUSE_THRESHOLD if args.reuse_threshold is None
+                                 else args.reuse_threshold),
+            )
+        except (ValueError, ResourceLimitError) as e:
+            # 标准输出是帧数据时，错误信息写到标准错误
+            print(f"错误: {e}", file=sys.stderr if args.output == '-' else sys.stdout)
+            sys.exit(1)
+        return
+
+    # 检查输入文件是否存在
+    if not os.path.exists(args.input):
+        print(f"错误: 找不到输入文件 '{args.input}'")
+        print("请在命令行中指定输入图片，或在代码顶部的配置区域修改 INPUT_IMAGE 路径")
+        sys.exit(1)
+    
+    # 批量模式：按清单增量处理整个目录
+    if args.batch:
+        from pixel_art_batch import run_batch
+        if not os.path.isdir(args.input):
+            print(f"错误: 输入目录不存在 '{args.input}'")
+            sys.exit(1)
+        try:
+            plan = run_batch(
+                args.input,
+                args.output,
+                op='pixelate',
+                params={
+                    'pixel_size': args.pixel_size,
+                    'scale_factor': args.scale_factor,
+                    'color_reduction': args.colors or None,
+                    'preserve_aspect': args.preserve_aspect,
+                    'enhance_mode': args.enhance_mode,
+                    'interpolation': args.interpolation,
+                    'fast_path': args.fast_path,
+                    'downsample': args.downsample,
+                    'dither': args.dither,
+                    'palette': args.palette,
+                    'quantize_space': args.quantize_space,
+                    'sharpen_mode': args.sharpen_mode,
+                },
+                manifest_path=args.manifest,
+                dry_run=args.dry_run,
+                max_workers=args.workers,
+            )
+        except ValueError as e:
+            # 例如多个输入会写到同一个输出文件
+            print(f"错误: {e}")
+            sys.exit(1)
+        if plan.get('failed'):
+            sys.exit(1)
+        return
+
+    # 参数扫描模式：未给出的候选值沿用单次转换的参数
+    if args.sweep:
+        from pixel_art_sweep import run_sweep
+        try:
+            run_sweep(
+                args.input,
+                args.sweep,
+                pixel_sizes=args.sweep_pixel_sizes or [args.pixel_size],
+                color_reductions=[c or None for c in (args.sweep_colors or [args.colors])],
+                interpolations=args.sweep_interpolations or [args.interpolation],
+                preserve_aspect=args.preserve_aspect,
+                enhance_mode=args.enhance_mode,
+                tile_width=args.tile_width,
+                scale_factor=args.scale_factor,
+                output_dir=args.sweep_dir,
+                max_workers=args.workers,
+                fast_path=args.fast_path,
+                downsample=args.downsample,
+                dither=args.dither,
+                palette=args.palette,
+                quantize_space=args.quantize_space,
+                sharpen_mode=args.sharpen_mode,
+            )
+        except (ResourceLimitError, OSError, ValueError) as e:
+            print(f"错误: {e}")
+            sys.exit(1)
+        return
+    
+    # 检查输出目录是否存在
+    output_dir = os.path.dirname(args.output)
+    if output_dir and not os.path.exists(output_dir):
+        print(f"错误: 输出目录不存在 '{output_dir}'")
+        print("请创建目录或修改 OUTPUT_IMAGE 路径")
+        sys.exit(1)
+    
+    params = {
+        'pixel_size': args.pixel_size,
+        'scale_factor': args.scale_factor,
+        'color_reduction': args.colors or None,
+        'preserve_aspect': args.preserve_aspect,
+        'enhance_mode': args.enhance_mode,
+        'interpolation': args.interpolation,
+        'fast_path': args.fast_path,
+        'downsample': args.downsample,
+        'dither': args.dither,
+        'palette': args.palette,
+        'quantize_space': args.quantize_space,
+        'sharpen_mode': args.sharpen_mode,
+    }
+
+    # 性能分析：按单步任务图执行，保存的任务描述可离线重放（不写入元数据）
+    if args.profile:
+        from pixel_art_profile import profile_job
+        job = {'input': os.path.abspath(args.input),
+               'steps': [dict(params, op='pixelate', output=os.path.abspath(args.output),
+                              palette=args.palette and os.path.abspath(args.palette))]}
+        try:
+            profile_job(job, args.profile)
+        except (ResourceLimitError, OSError, ValueError) as e:
+            print(f"错误: {e}")
+            sys.exit(1)
+        return
+
+    # 执行转换
+    convert_to_pixel_art(input_path=args.input, output_path=args.output,
+                         keep_metadata=args.keep_metadata, **params)
+
+
+if __name__ == '__main__':
+    try:
+        main()
     except KeyboardInterrupt:
         print("\n\n用户中断操作")
         sys.exit(1)
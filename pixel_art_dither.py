@@ -0,0 +1,240 @@
+"""
+抖动引擎
+把图像映射到给定调色板时加入抖动，减轻低颜色数下的色带
+
+- 有序抖动：Bayer 矩阵（2/4/8）或蓝噪声阈值图，完全向量化，
+  只比直接映射多一次数组加法，几乎没有额外开销
+- 误差扩散：Floyd–Steinberg 直接使用 Pillow 内置的 C 实现；
+  Atkinson / Sierra Lite / Jarvis 用 “波前” 并行实现——位于同一条斜线
+  x + s*y = t 上的像素互不依赖，可以一次向量化处理，循环次数只有 w + s*h
+- 调色板在 OKLab / CIELAB 中求最近颜色时（见 pixel_art_palette），误差扩散也在该空间中
+  累积误差、求最近颜色（包括 Floyd–Steinberg，此时不能交给 Pillow 的 RGB 实现）
+"""
+
+import os
+from functools import lru_cache
+
+import numpy as np
+
+from PIL import Image
+
+from pixel_art_colorspace import to_space
+
+
+DITHER_METHODS = (
+    'none',
+    'bayer2', 'bayer4', 'bayer8',
+    'blue-noise',
+    'floyd-steinberg', 'atkinson', 'sierra-lite', 'jarvis',
+)
+
+# 误差扩散核：(dy, dx, 权重)，dy=0 时 dx>0
+DIFFUSION_KERNELS = {
+    'atkinson': [
+        (0, 1, 1 / 8), (0, 2, 1 / 8),
+        (1, -1, 1 / 8), (1, 0, 1 / 8), (1, 1, 1 / 8),
+        (2, 0, 1 / 8),
+    ],
+    'sierra-lite': [
+        (0, 1, 2 / 4),
+        (1, -1, 1 / 4), (1, 0, 1 / 4),
+    ],
+    'jarvis': [
+        (0, 1, 7 / 48), (0, 2, 5 / 48),
+        (1, -2, 3 / 48), (1, -1, 5 / 48), (1, 0, 7 / 48), (1, 1, 5 / 48), (1, 2, 3 / 48),
+        (2, -2, 1 / 48), (2, -1, 3 / 48), (2, 0, 5 / 48), (2, 1, 3 / 48), (2, 2, 1 / 48),
+    ],
+}
+
+# Floyd–Steinberg 核：RGB 空间交给 Pillow，其他色彩空间用波前实现
+FLOYD_STEINBERG_KERNEL = [(0, 1, 7 / 16), (1, -1, 3 / 16), (1, 0, 5 / 16), (1, 1, 1 / 16)]
+
+# 蓝噪声阈值图尺寸（生成一次后缓存到磁盘）
+BLUE_NOISE_SIZE = 64
+
+
+@lru_cache(maxsize=None)
+def bayer_matrix(n):
+    """n x n 的 Bayer 阈值矩阵（n 为 2 的幂），取值归一化到 (0, 1)"""
+    m = np.zeros((1, 1), dtype=np.int64)
+    while m.shape[0] < n:
+        m = np.block([[4 * m, 4 * m + 2], [4 * m + 3, 4 * m + 1]])
+    return (m + 0.5) / m.size
+
+
+def _generate_blue_noise(size, sigma=1.5, seed=0):
+    """
+    void-and-cluster 算法生成蓝噪声阈值图
+
+    能量场 = 当前点集与环绕高斯核的卷积，增删一个点只需加减一个平移后的高斯核。
+    """
+    rng = np.random.default_rng(seed)
+    d = np.minimum(np.arange(size), size - np.arange(size)).astype(np.float64)
+    kernel = np.exp(-(d[:, None] ** 2 + d[None, :] ** 2) / (2 * sigma ** 2))
+
+    def splat(y, x):
+        return np.roll(np.roll(kernel, y, axis=0), x, axis=1)
+
+    # 初始点集：约 10% 的随机点，再反复把最密集的点移到最空旷处直到稳定
+    pattern = rng.random((size, size)) < 0.1
+    energy = np.real(np.fft.ifft2(np.fft.fft2(pattern) * np.fft.fft2(kernel)))
+    while True:
+        cluster = np.unravel_index(np.argmax(np.where(pattern, energy, -np.inf)), pattern.shape)
+        pattern[cluster] = False
+        energy -= splat(*cluster)
+        void = np.unravel_index(np.argmin(np.where(pattern, np.inf, energy)), pattern.shape)
+        if void == cluster:
+            pattern[cluster] = True
+            energy += splat(*cluster)
+            break
+        pattern[void] = True
+        energy += splat(*void)
+
+    ranks = np.zeros((size, size), dtype=np.int64)
+    ones = int(pattern.sum())
+
+    # 阶段一：依次移除最密集的点，排名从 ones-1 递减
+    work, work_energy = pattern.copy(), energy.copy()
+    for rank in range(ones - 1, -1, -1):
+        cluster = np.unravel_index(np.argmax(np.where(work, work_energy, -np.inf)), work.shape)
+        work[cluster] = False
+        work_energy -= splat(*cluster)
+        ranks[cluster] = rank
+
+    # 阶段二：依次填入最空旷处，直到填满
+    work, work_energy = pattern.copy(), energy.copy()
+    for rank in range(ones, size * size):
+        void = np.unravel_index(np.argmin(np.where(work, np.inf, work_energy)), work.shape)
+        work[void] = True
+        work_energy += splat(*void)
+        ranks[void] = rank
+
+    return (ranks + 0.5) / ranks.size
+
+
+@lru_cache(maxsize=None)
+def blue_noise_matrix(size=BLUE_NOISE_SIZE):
+    """蓝噪声阈值图，取值归一化到 (0, 1)；首次生成后缓存到磁盘"""
+    from pixel_art_converter import CACHE_DIR
+
+    path = os.path.join(CACHE_DIR, f"blue_noise_{size}.npy")
+    try:
+        return np.load(path)
+    except (OSError, ValueError):
+        pass
+    matrix = _generate_blue_noise(size)
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        np.save(path, matrix)
+    except OSError:
+        pass  # 缓存写不进去不影响结果
+    return matrix
+
+
+def threshold_map(method):
+    """有序抖动方法对应的阈值矩阵"""
+    if method == 'blue-noise':
+        return blue_noise_matrix()
+    return bayer_matrix(int(method[len('bayer'):]))
+
+
+def palette_image(colors):
+    """调色板颜色数组 (k, 3) -> Pillow 的 P 模式调色板图"""
+    colors = np.asarray(colors, dtype=np.uint8).reshape(-1, 3)
+    flat = colors.reshape(-1).tolist()
+    # 用最后一个颜色补齐 256 项，避免补零的黑色被选中
+    flat += flat[-3:] * (256 - len(colors))
+    pal = Image.new('P', (1, 1))
+    pal.putpalette(flat)
+    return pal
+
+
+def palette_spread(colors):
+    """调色板颜色间的平均最近距离，决定有序抖动的扰动幅度"""
+    colors = np.asarray(colors, dtype=np.float32).reshape(-1, 3)
+    if len(colors) < 2:
+        return 0.0
+    d = np.sqrt(((colors[:, None, :] - colors[None, :, :]) ** 2).sum(-1))
+    np.fill_diagonal(d, np.inf)
+    return float(d.min(axis=1).mean())
+
+
+def _nearest(values, colors):
+    """values (m, 3) 中每个颜色在调色板中最近项的下标"""
+    d = ((values[:, None, :] - colors[None, :, :]) ** 2).sum(-1)
+    return np.argmin(d, axis=1)
+
+
+def _diffuse(a, colors, kernel):
+    """
+    波前并行误差扩散
+
+    像素 (y, x) 只依赖 x' + s*y' < x + s*y 的像素，s 取能覆盖核中最远左下偏移的值，
+    因此同一斜线上的像素可以一起量化、一起扩散误差。
+    """
+    height, width = a.shape[:2]
+    reach = max(-dx for dy, dx, _ in kernel if dy > 0)
+    slope = max(1, reach + 1)
+    pad_x = max(abs(dx) for _, dx, _ in kernel)
+    pad_y = max(dy for dy, _, _ in kernel)
+    buf = np.zeros((height + pad_y, width + 2 * pad_x, 3), dtype=np.float32)
+    buf[:height, pad_x:pad_x + width] = a
+    index = np.zeros((height, width), dtype=np.int64)
+
+    for t in range(width + slope * (height - 1)):
+        y0 = max(0, -(-(t - width + 1) // slope))
+        y1 = min(height - 1, t // slope)
+        if y0 > y1:
+            continue
+        ys = np.arange(y0, y1 + 1)
+        xs = t - slope * ys
+        values = buf[ys, xs + pad_x]
+        idx = _nearest(values, colors)
+        index[ys, xs] = idx
+        err = values - colors[idx]
+        for dy, dx, weight in kernel:
+            buf[ys + dy, xs + dx + pad_x] += err * weight
+    return index
+
+
+def dither_to_palette(img, colors, method='bayer4', strength=1.0, palette=None):
+    """
+    把 RGB 图像映射到调色板 colors (k, 3)，并按 method 抖动
+
+    palette 为 pixel_art_palette.Palette 时，直接映射和有序抖动改用它的查找表，
+    误差扩散在它的色彩空间（palette.space）中进行。
+
+    返回:
+        P 模式图像（调色板为 colors）
+    """
+    if method not in DITHER_METHODS:
+        raise ValueError(f"未知的抖动方法 '{method}'，可选: {', '.join(DITHER_METHODS)}")
+    colors = np.asarray(colors, dtype=np.uint8).reshape(-1, 3)
+    pal = palette_image(colors)
+
+    if method == 'none' and palette is not None:
+        return palette.map(img)
+    space = palette.space if palette is not None else 'rgb'
+    if method == 'none' or (method == 'floyd-steinberg' and space == 'rgb'):
+        dither = Image.Dither.NONE if method == 'none' else Image.Dither.FLOYDSTEINBERG
+        return img.quantize(palette=pal, dither=dither)
+
+    if method in DIFFUSION_KERNELS or method == 'floyd-steinberg':
+        kernel = DIFFUSION_KERNELS.get(method, FLOYD_STEINBERG_KERNEL)
+        points = palette.points if palette is not None else colors.astype(np.float32)
+        index = _diffuse(to_space(np.asarray(img.convert('RGB')), space), points, kernel)
+        out = Image.frombytes('P', img.size, index.astype(np.uint8).tobytes())
+        out.putpalette(pal.getpalette())
+        return out
+
+    # 有序抖动：按阈值图对每个像素加一个固定扰动，再做最近色映射
+    a = np.asarray(img, dtype=np.float32)
+    height, width = a.shape[:2]
+    t = threshold_map(method)
+    n = t.shape[0]
+    offsets = t[np.arange(height)[:, None] % n, np.arange(width)[None, :] % n] - 0.5
+    a = a + (offsets * palette_spread(colors) * strength)[..., None]
+    shifted = Image.fromarray(np.clip(a + 0.5, 0, 255).astype(np.uint8))
+    if palette is not None:
+        return palette.map(shifted)
+    return shifted.quantize(palette=pal, dither=Image.Dither.NONE)
@@ -0,0 +1,397 @@
+"""
+缩放 / 滤波引擎
+在运行时检测可用的加速后端，按操作选择最快且结果与 Pillow 一致的实现：
+
+- pillow：始终可用的兜底实现（若安装的是 pillow-simd，Pillow 本身即为加速版本）
+- cv2：OpenCV 的 cv2.resize / cv2.medianBlur（可选依赖）
+- numpy：最近邻缩放（与 Pillow 的取样坐标逐位一致）和 3x3 中值滤波（排序网络）
+- scipy：scipy.ndimage.median_filter（可选依赖）
+
+默认只用 Pillow。启用 'auto'（ENGINE 配置、use_engine('auto') 或命令行 --engine auto）后，
+第一次使用时在一张小的合成图上对各后端做微基准，并与 Pillow 的输出逐像素比较，
+只有差异不超过 TOLERANCE 的后端才参与挑选；结果按各库的安装位置缓存到 ~/.cache/pixel_art/，
+之后的进程直接读取，不再重复测试。微基准不输出任何内容（python pixel_art_bench.py engine 查看结果）。
+后端出错时自动退回 Pillow。
+
+用法:
+    from pixel_art_engine import resize, median_filter
+    img = resize(img, (640, 360), Image.LANCZOS)
+    img = median_filter(img, 3)
+"""
+
+import hashlib
+import importlib.util
+import json
+import os
+import threading
+import time
+
+from PIL import Image, ImageFilter
+import PIL
+
+
+# ==================== 配置 ====================
+# 'pillow' 只用 Pillow（默认）；'auto' 按微基准选择后端（第一次使用时测试，并把结果缓存到 ~/.cache/pixel_art/）
+ENGINE = 'pillow'
+ENGINES = ('auto', 'pillow')
+
+# 允许与 Pillow 结果的最大逐像素差；0 表示只采用与 Pillow 逐位一致的后端
+TOLERANCE = 0
+
+# 替代后端至少要比 Pillow 快这么多倍才会被选用（避免计时抖动导致来回切换）
+SPEEDUP_MARGIN = 1.1
+
+# 微基准 / 等价性测试的缩放比例：(缩小, 放大)，刻意包含非整数比例
+CALIBRATION_SCALES = {'down': (0.37, 0.25), 'up': (2.3, 3.0)}
+CALIBRATION_SIZE = (320, 240)
+# ================================================
+
+RESAMPLE_NAMES = {
+    Image.NEAREST: 'nearest',
+    Image.BILINEAR: 'bilinear',
+    Image.BICUBIC: 'bicubic',
+    Image.LANCZOS: 'lanczos',
+    Image.BOX: 'box',
+}
+OPERATIONS = tuple(
+    f"resize:{name}:{direction}"
+    for name in RESAMPLE_NAMES.values() for direction in ('down', 'up')
+) + ('median:3',)
+
+# 替代后端只处理这些模式，其余模式直接交给 Pillow
+_ARRAY_MODES = ('RGB', 'L')
+
+_backends = {}
+_choices = {}
+_calibrate_lock = threading.Lock()
+
+
+# ==================== 各后端实现 ====================
+# 每个 _load_xxx 返回 {'resize': f(img, size, resample), 'median': f(img, size), 'supports': f(op)}，
+# 后端不可用时抛出 ImportError
+
+
+def _load_pillow():
+    def resize(img, size, resample):
+        return img.resize(size, resample)
+
+    def median(img, size):
+        return img.filter(ImageFilter.MedianFilter(size=size))
+
+    return {'resize': resize, 'median': median, 'supports': lambda op: True}
+
+
+def _load_cv2():
+    import cv2
+    import numpy as np
+
+    flags = {
+        Image.BILINEAR: cv2.INTER_LINEAR,
+        Image.BICUBIC: cv2.INTER_CUBIC,
+        Image.LANCZOS: cv2.INTER_LANCZOS4,
+        Image.BOX: cv2.INTER_AREA,
+    }
+    # INTER_NEAREST_EXACT（OpenCV 4.5.1+）与 Pillow 的最近邻取样一致，旧版的 INTER_NEAREST 不一致
+    if hasattr(cv2, 'INTER_NEAREST_EXACT'):
+        flags[Image.NEAREST] = cv2.INTER_NEAREST_EXACT
+    names = {RESAMPLE_NAMES[r] for r in flags}
+
+    def resize(img, size, resample):
+        return Image.fromarray(cv2.resize(np.asarray(img), size, interpolation=flags[resample]))
+
+    def median(img, size):
+        return Image.fromarray(cv2.medianBlur(np.asarray(img), size))
+
+    def supports(op):
+        kind, arg = op.split(':')[:2]
+        return arg in names if kind == 'resize' else True
+
+    return {'resize': resize, 'median': median, 'supports': supports}
+
+
+def nearest_index(n_in, n_out):
+    """
+    Pillow 最近邻缩放的取样下标
+
+    Pillow 从 0.5 * scale 开始逐个累加 scale 再截断取整，
+    这里用同样顺序的浮点累加（np.add.accumulate 逐项累加）得到逐位相同的下标。
+    """
+    import numpy as np
+
+    scale = n_in / n_out
+    steps = np.full(n_out, scale)
+    steps[0] = scale * 0.5
+    return np.minimum(np.add.accumulate(steps).astype(np.intp), n_in - 1)
+
+
+def _median9(a):
+    """3x3 中值：对边缘复制填充后的 9 个平移视图跑 19 次比较交换的排序网络"""
+    import numpy as np
+
+    h, w = a.shape[:2]
+    pad = ((1, 1), (1, 1)) + ((0, 0),) * (a.ndim - 2)
+    p = np.pad(a, pad, mode='edge')
+    v = [p[dy:dy + h, dx:dx + w] for dy in range(3) for dx in range(3)]
+
+    def sort2(i, j):
+        v[i], v[j] = np.minimum(v[i], v[j]), np.maximum(v[i], v[j])
+
+    for i, j in ((1, 2), (4, 5), (7, 8), (0, 1), (3, 4), (6, 7), (1, 2), (4, 5), (7, 8),
+                 (0, 3), (5, 8), (4, 7), (3, 6), (1, 4), (2, 5), (4, 7), (4, 2), (6, 4), (4, 2)):
+        sort2(i, j)
+    return v[4]
+
+
+def _load_numpy():
+    import numpy as np
+
+    def resize(img, size, resample):
+        a = np.asarray(img)
+        ys = nearest_index(a.shape[0], size[1])
+        xs = nearest_index(a.shape[1], size[0])
+        return Image.fromarray(a.take(ys, axis=0).take(xs, axis=1))
+
+    def median(img, size):
+        return Image.fromarray(_median9(np.asarray(img)))
+
+    def supports(op):
+        return op.startswith('resize:nearest:') or op == 'median:3'
+
+    return {'resize': resize, 'median': median, 'supports': supports}
+
+
+def _load_scipy():
+    import numpy as np
+    from scipy import ndimage
+
+    def median(img, size):
+        a = np.asarray(img)
+        window = (size, size, 1) if a.ndim == 3 else (size, size)
+        return Image.fromarray(ndimage.median_filter(a, size=window, mode='nearest'))
+
+    return {'resize': None, 'median': median, 'supports': lambda op: op.startswith('median:')}
+
+
+BACKENDS = {
+    'pillow': _load_pillow,
+    'cv2': _load_cv2,
+    'numpy': _load_numpy,
+    'scipy': _load_scipy,
+}
+
+
+def backend(name):
+    """加载后端（结果缓存），不可用时返回 None"""
+    if name not in _backends:
+        try:
+            _backends[name] = BACKENDS[name]()
+        except ImportError:
+            _backends[name] = None
+    return _backends[name]
+
+
+def pillow_flavor():
+    """'pillow-simd' 或 'pillow'（pillow-simd 的版本号带 .postN 后缀）"""
+    return 'pillow-simd' if '.post' in PIL.__version__ else 'pillow'
+
+
+def available_backends():
+    """当前环境可用的后端名称列表（会导入对应的库）"""
+    return [name for name in BACKENDS if backend(name) is not None]
+
+
+# ==================== 微基准与等价性测试 ====================
+
+
+def _calibration_image(size=CALIBRATION_SIZE, seed=0):
+    """确定性的合成测试图：渐变 + 色块 + 噪声"""
+    import numpy as np
+
+    width, height = size
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+    img = np.stack([255 * x / width, 255 * y / height, 128 + 100 * np.sin(x / 7 + y / 11)], axis=-1)
+    for _ in range(8):
+        x0, y0 = rng.integers(0, width - 40), rng.integers(0, height - 40)
+        img[y0:y0 + rng.integers(8, 40), x0:x0 + rng.integers(8, 40)] = rng.uniform(0, 255, 3)
+    img += rng.normal(0, 12, img.shape)
+    return Image.fromarray(np.clip(img, 0, 255).astype(np.uint8))
+
+
+def _run(impl, op, img, size):
+    kind, arg = op.split(':')[:2]
+    if kind == 'resize':
+        resample = next(r for r, name in RESAMPLE_NAMES.items() if name == arg)
+        return impl['resize'](img, size, resample)
+    return impl['median'](img, int(arg))
+
+
+def _cases(op, img):
+    """op 的测试输入：[(图像, 目标尺寸)]，第一项用于计时"""
+    kind = op.split(':')[0]
+    if kind == 'median':
+        return [(img, None), (img.convert('L'), None)]
+    cases = []
+    for scale in CALIBRATION_SCALES[op.split(':')[2]]:
+        size = (max(1, int(img.width * scale)), max(1, int(img.height * scale)))
+        cases += [(img, size), (img.convert('L'), size)]
+    return cases
+
+
+def _max_diff(a, b):
+    import numpy as np
+
+    a, b = np.asarray(a), np.asarray(b)
+    if a.shape != b.shape:
+        return 255
+    return int(np.abs(a.astype(np.int16) - b).max()) if a.size else 0
+
+
+def measure(img=None, repeat=3, operations=OPERATIONS):
+    """
+    对每个操作、每个可用后端计时并与 Pillow 比较
+
+    返回:
+        [{'op', 'backend', 'ms', 'max_diff'}]，后端出错时 ms 为 None、max_diff 为 255
+    """
+    if img is None:
+        img = _calibration_image()
+    rows = []
+    for op in operations:
+        cases = _cases(op, img)
+        references = [_run(backend('pillow'), op, src, size) for src, size in cases]
+        for name in available_backends():
+            impl = backend(name)
+            if not impl['supports'](op):
+                continue
+            try:
+                diff = max(_max_diff(_run(impl, op, src, size), ref)
+                           for (src, size), ref in zip(cases, references))
+                best = float('inf')
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    _run(impl, op, *cases[0])
+                    best = min(best, time.perf_counter() - start)
+                ms = round(best * 1000, 3)
+            except Exception:
+                diff, ms = 255, None
+            rows.append({'op': op, 'backend': name, 'ms': ms, 'max_diff': diff})
+    return rows
+
+
+def choose(rows, tolerance=None):
+    """从 measure 的结果中为每个操作选出最快的合格后端 -> {op: 后端名}"""
+    tolerance = TOLERANCE if tolerance is None else tolerance
+    choices = {}
+    for op in dict.fromkeys(row['op'] for row in rows):
+        candidates = [r for r in rows if r['op'] == op and r['ms'] is not None]
+        pillow_ms = next(r['ms'] for r in candidates if r['backend'] == 'pillow')
+        eligible = [r for r in candidates if r['backend'] != 'pillow'
+                    and r['max_diff'] <= tolerance and r['ms'] * SPEEDUP_MARGIN < pillow_ms]
+        choices[op] = min(eligible, key=lambda r: r['ms'])['backend'] if eligible else 'pillow'
+    return choices
+
+
+def _fingerprint():
+    """各后端库的安装位置与修改时间、后端列表和 CPU 核数，任何一个变化都要重新测试"""
+    parts = [PIL.__version__, str(TOLERANCE), str(CALIBRATION_SCALES), ','.join(BACKENDS),
+             str(os.cpu_count())]
+    for module in ('PIL', 'numpy', 'cv2', 'scipy'):
+        spec = importlib.util.find_spec(module)
+        origin = spec.origin if spec and spec.origin else '-'
+        mtime = os.path.getmtime(origin) if os.path.exists(origin) else 0
+        parts.append(f"{module}={origin}@{mtime}")
+    return hashlib.sha1('|'.join(parts).encode('utf-8')).hexdigest()[:16]
+
+
+def calibrate(force=False, verbose=False):
+    """
+    取得（必要时测试）各操作的后端选择
+
+    参数:
+        force: 忽略缓存重新测试
+        verbose: 测试时打印进度与选择结果（默认静默）
+
+    返回:
+        {op: 后端名}
+    """
+    from pixel_art_converter import CACHE_DIR
+
+    path = os.path.join(CACHE_DIR, f"engine_{_fingerprint()}.json")
+    if not force:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                choices = json.load(f)
+            if set(choices) >= set(OPERATIONS):
+                _choices.update(choices)
+                return dict(_choices)
+        except (OSError, ValueError):
+            pass
+
+    if verbose:
+        print("测试可用的加速后端...")
+    choices = choose(measure(repeat=2))
+    if verbose:
+        faster = {op: name for op, name in choices.items() if name != 'pillow'}
+        print(f"  加速后端: {', '.join(f'{op}={name}' for op, name in faster.items()) or '无（使用 Pillow）'}")
+    _choices.update(choices)
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(choices, f, indent=2)
+    except OSError:
+        pass  # 缓存写不进去只是下次重新测试
+    return dict(_choices)
+
+
+def use_engine(name):
+    """切换引擎：'pillow'（只用 Pillow）或 'auto'（按微基准选择）"""
+    global ENGINE
+    if name not in ENGINES:
+        raise ValueError(f"未知的引擎 '{name}'，可选: {', '.join(ENGINES)}")
+    ENGINE = name
+
+
+def backend_for(op, mode='RGB'):
+    """op 在 mode 图像上实际使用的后端名"""
+    if ENGINE == 'pillow' or mode not in _ARRAY_MODES:
+        return 'pillow'
+    if op not in _choices:
+        with _calibrate_lock:  # 流水线 / 批量的多个线程同时第一次使用时只测试一次
+            if op not in _choices:
+                calibrate()
+    return _choices.get(op, 'pillow')
+
+
+def _dispatch(op, img, call):
+    name = backend_for(op, img.mode)
+    if name != 'pillow':
+        impl = backend(name)
+        try:
+            return call(impl)
+        except Exception as exc:
+            print(f"警告: {name} 后端执行 {op} 失败（{exc}），改用 Pillow")
+            _choices[op] = 'pillow'
+    return call(backend('pillow'))
+
+
+# ==================== 对外接口 ====================
+
+
+def resize(img, size, resample=Image.NEAREST):
+    """与 img.resize(size, resample) 等价，按引擎选择的后端执行"""
+    size = tuple(size)
+    name = RESAMPLE_NAMES.get(resample)
+    if name is None or size == img.size or 0 in size:
+        return img.resize(size, resample)
+    direction = 'up' if size[0] * size[1] > img.width * img.height else 'down'
+    return _dispatch(f"resize:{name}:{direction}", img,
+                     lambda impl: impl['resize'](img, size, resample))
+
+
+def median_filter(img, size=3):
+    """与 img.filter(ImageFilter.MedianFilter(size)) 等价，按引擎选择的后端执行"""
+    op = f"median:{size}"
+    if op not in OPERATIONS:
+        return img.filter(ImageFilter.MedianFilter(size=size))
+    return _dispatch(op, img, lambda impl: impl['median'](img, size))
@@ -0,0 +1,578 @@
+"""
+画质回归（golden 图）
+把固定的测试图集逐一按各预设参数处理，与保存的参考结果比较，证明性能改动没有改变输出：
+
+- 指标全部向量化计算：PSNR、SSIM（亮度，7x7 窗口，积分图求局部均值/方差）、
+  最大逐像素差、变化像素比例，以及少色结果的调色板差异（多出/缺少的颜色数、多出颜色到参考调色板的 OKLab 距离）
+- 各 (预设, 图片) 组合在线程池中并行处理
+- 有变化的组合输出对比图（参考 | 当前 | 放大的差异），汇总写入 report.json
+- 数据放在 benchmark_data/golden/ 下，与性能基准结果放在一起；报告中同时记录耗时和参考生成时的耗时
+
+目录结构:
+    benchmark_data/golden/
+        corpus/       测试图（缺失时按固定种子生成；也可以放入自己的图片）
+        reference/    参考结果（<预设>/<图片>.png）与 manifest.json（参数、耗时、库版本）
+        current/      最近一次运行的结果
+        diff/         有变化的组合的对比图
+        report.json   最近一次运行的报告
+
+用法:
+    python pixel_art_golden.py --update        # 用当前代码生成 / 更新参考结果
+    python pixel_art_golden.py                 # 与参考比较，有变化或缺少参考时退出码为 1
+    python pixel_art_golden.py --allow-missing # 缺少参考的组合（例如新加的预设）不算失败
+    python pixel_art_golden.py --presets pixel-default,enhance-x2 --images photo
+
+    # 用某个提交的 pixel_art_converter.py 生成参考结果（git show 取出源码，不切换工作区）；
+    # 该提交不能重现的组合（例如最初版本没有的 dither / palette、快速路径）记为 skipped，不写参考
+    python pixel_art_golden.py --update --baseline $(git rev-list --max-parents=0 HEAD)
+
+仓库中提交的 corpus/ 为 build_corpus 按固定种子生成的测试图，reference/ 为全部预设用当前代码生成的参考结果；
+manifest.json 的 source 记录生成每个参考的提交号（处理代码有未提交的改动时带 -dirty 后缀），
+corpus 记录生成时各测试图的 SHA-256（测试图被替换后比较结果为 stale）。
+"""
+
+import argparse
+import contextlib
+import hashlib
+import io
+import inspect
+import json
+import subprocess
+import sys
+import tempfile
+import time
+import types
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+import numpy as np
+
+from PIL import Image
+
+from pixel_art_bench import BENCH_DIR, make_test_photo, print_rows
+
+
+# golden 数据目录
+GOLDEN_DIR = BENCH_DIR / "golden"
+
+# 预设：名称 -> (操作, 参数)。pixelate / enhance 的参数与 convert_to_pixel_art /
+# enhance_image_quality 相同，super_res 为 super_resolve_image 的目标倍数
+PRESETS = {
+    'pixel-default': ('pixelate', {'pixel_size': 64, 'color_reduction': 32}),
+    'pixel-plain': ('pixelate', {'pixel_size': 48, 'color_reduction': 16, 'enhance_mode': False}),
+    'pixel-full-color': ('pixelate', {'pixel_size': 96, 'interpolation': 'lanczos',
+                                      'scale_factor': 2.0}),
+    'pixel-square': ('pixelate', {'pixel_size': 40, 'color_reduction': 24,
+                                  'preserve_aspect': False, 'interpolation': 'nearest'}),
+    'pixel-no-fast-path': ('pixelate', {'pixel_size': 64, 'color_reduction': 32, 'fast_path': False}),
+    'pixel-mean': ('pixelate', {'pixel_size': 64, 'color_reduction': 32, 'downsample': 'mean'}),
+    'pixel-mode': ('pixelate', {'pixel_size': 64, 'color_reduction': 16, 'downsample': 'mode'}),
+    'pixel-bayer': ('pixelate', {'pixel_size': 96, 'color_reduction': 8, 'dither': 'bayer4'}),
+    'pixel-floyd': ('pixelate', {'pixel_size': 96, 'color_reduction': 8, 'enhance_mode': False,
+                                 'dither': 'floyd-steinberg'}),
+    'pixel-oklab': ('pixelate', {'pixel_size': 64, 'color_reduction': 16, 'quantize_space': 'oklab'}),
+    'pixel-palette': ('pixelate', {'pixel_size': 64, 'palette': 'pico8.hex'}),
+    'pixel-luma-sharpen': ('pixelate', {'pixel_size': 64, 'color_reduction': 32, 'sharpen_mode': 'luma'}),
+    'enhance-default': ('enhance', {}),
+    'enhance-soft': ('enhance', {'sharpness': 0.5, 'contrast': 0.9, 'saturation': 0.9,
+                                 'denoise': False}),
+    'enhance-x2': ('enhance', {'upscale_factor': 2.0}),
+    'enhance-guided': ('enhance', {'denoise': 'guided'}),
+    'enhance-nlm-luma': ('enhance', {'denoise': 'nlm', 'denoise_luma': True}),
+    'enhance-luma-x2': ('enhance', {'upscale_factor': 2.0, 'sharpen_mode': 'luma'}),
+    'super-res-x2': ('super_res', {'scale': 2}),
+}
+
+# 各操作允许的差异：PSNR 不低于该值（dB）且 SSIM 不低于该值即视为通过。
+# 像素画与画质增强是确定性的，要求逐像素一致；AI 超分在不同设备上有细微浮点差异
+MIN_PSNR = {'pixelate': float('inf'), 'enhance': float('inf'), 'super_res': 40.0}
+MIN_SSIM = {'pixelate': 1.0, 'enhance': 1.0, 'super_res': 0.98}
+
+# 颜色数不超过该值时才计算调色板差异（照片类结果颜色太多，没有意义）
+PALETTE_LIMIT = 4096
+
+# 视为失败的状态（missing 另外由 allow_missing 决定）
+FAILED = ('changed', 'error', 'stale')
+
+# 对比图中每一栏的最大宽度
+DIFF_PANEL_WIDTH = 512
+
+# PICO-8 调色板（pixel-palette 预设使用，写入 corpus 目录）
+PICO8 = ('000000', '1D2B53', '7E2553', '008751', 'AB5236', '5F574F', 'C2C3C7', 'FFF1E8',
+         'FF004D', 'FFA300', 'FFEC27', '00E436', '29ADFF', '83769C', 'FF77A8', 'FFCCAA')
+
+
+# ==================== 测试图集 ====================
+
+def _sprite(seed=2):
+    """少色像素画：12 色的 32x24 网格放大 10 倍（走快速路径）"""
+    rng = np.random.default_rng(seed)
+    colors = rng.integers(0, 256, (12, 3), dtype=np.uint8)
+    grid = colors[rng.integers(0, 12, (24, 32))]
+    return Image.fromarray(grid).resize((320, 240), Image.NEAREST)
+
+
+def build_corpus(golden_dir=GOLDEN_DIR):
+    """生成缺失的测试图（已存在的文件不覆盖，参考结果始终对应磁盘上的这份图集）"""
+    corpus = Path(golden_dir) / "corpus"
+    corpus.mkdir(parents=True, exist_ok=True)
+    # 尺寸保持较小：图集和参考结果都提交在仓库中
+    photo = make_test_photo((256, 192), seed=0)
+    makers = {
+        'photo.png': lambda: photo,
+        'photo_wide.png': lambda: make_test_photo((320, 180), seed=1),
+        'sprite.png': _sprite,
+        'gray.png': lambda: photo.convert('L'),
+        'indexed.png': lambda: photo.quantize(64),
+    }
+    for name, make in makers.items():
+        if not (corpus / name).exists():
+            make().save(corpus / name)
+    palette = corpus / "pico8.hex"
+    if not palette.exists():
+        palette.write_text("\n".join(PICO8) + "\n", encoding='utf-8')
+    return corpus
+
+
+def corpus_images(corpus):
+    """图集中的图片：{名称（不含扩展名）: 路径}"""
+    return {path.stem: path for path in sorted(Path(corpus).iterdir())
+            if path.suffix.lower() in ('.png', '.jpg', '.jpeg', '.bmp', '.webp', '.tif', '.tiff')}
+
+
+# ==================== 指标 ====================
+
+def _luma(a):
+    """(h, w, 3) 或 (h, w) -> BT.601 亮度（float64）"""
+    a = a.astype(np.float64)
+    return a if a.ndim == 2 else a @ np.array([0.299, 0.587, 0.114])
+
+
+def _box_mean(a, win):
+    """win x win 窗口的局部均值（只取完整窗口，用积分图一次求出）"""
+    c = np.zeros((a.shape[0] + 1, a.shape[1] + 1))
+    c[1:, 1:] = a.cumsum(0).cumsum(1)
+    return (c[win:, win:] - c[:-win, win:] - c[win:, :-win] + c[:-win, :-win]) / (win * win)
+
+
+def psnr(a, b):
+    """峰值信噪比（dB），完全相同时为 inf"""
+    mse = np.mean((a.astype(np.float64) - b) ** 2)
+    return float('inf') if mse == 0 else float(10 * np.log10(255.0 ** 2 / mse))
+
+
+def ssim(a, b, win=7):
+    """亮度上的结构相似度（均匀窗口，与 scikit-image 的默认设置相同）"""
+    x, y = _luma(a), _luma(b)
+    if min(x.shape) < win:
+        return 1.0 if np.array_equal(x, y) else float(1 - np.mean(np.abs(x - y)) / 255)
+    ux, uy = _box_mean(x, win), _box_mean(y, win)
+    # 样本方差 / 协方差（无偏）
+    norm = win * win / (win * win - 1)
+    vx = norm * (_box_mean(x * x, win) - ux * ux)
+    vy = norm * (_box_mean(y * y, win) - uy * uy)
+    vxy = norm * (_box_mean(x * y, win) - ux * uy)
+    c1, c2 = (0.01 * 255) ** 2, (0.03 * 255) ** 2
+    s = ((2 * ux * uy + c1) * (2 * vxy + c2)) / ((ux * ux + uy * uy + c1) * (vx + vy + c2))
+    return float(s.mean())
+
+
+def _colors(a):
+    """图中出现的颜色（打包为 uint32）；超过 PALETTE_LIMIT 种时返回 None"""
+    packed = (a[..., 0].astype(np.uint32) << 16) | (a[..., 1].astype(np.uint32) << 8) | a[..., 2]
+    colors = np.unique(packed)
+    return colors if len(colors) <= PALETTE_LIMIT else None
+
+
+def _unpack(colors):
+    return np.stack([(colors >> 16) & 255, (colors >> 8) & 255, colors & 255], axis=-1).astype(np.uint8)
+
+
+def palette_diff(ref, out):
+    """
+    调色板差异
+
+    返回:
+        (多出的颜色数, 缺少的颜色数, 多出颜色到参考调色板最近颜色的最大 OKLab 距离 x100)；
+        颜色太多时三项均为 None
+    """
+    from pixel_art_colorspace import rgb_to_oklab
+
+    ref_colors, out_colors = _colors(ref), _colors(out)
+    if ref_colors is None or out_colors is None:
+        return None, None, None
+    added = np.setdiff1d(out_colors, ref_colors)
+    removed = np.setdiff1d(ref_colors, out_colors)
+    if not len(added):
+        return 0, len(removed), 0.0
+    d = rgb_to_oklab(_unpack(added))[:, None, :] - rgb_to_oklab(_unpack(ref_colors))[None]
+    distance = np.sqrt((d ** 2).sum(-1)).min(axis=1).max()
+    return len(added), len(removed), round(float(distance) * 100, 2)
+
+
+def compare(ref, out):
+    """比较两张图（PIL），返回指标 dict；尺寸不同时只给出尺寸"""
+    if ref.size != out.size:
+        return {'size': f"{out.size[0]}x{out.size[1]} != {ref.size[0]}x{ref.size[1]}"}
+    a, b = np.asarray(ref.convert('RGB')), np.asarray(out.convert('RGB'))
+    diff = np.abs(a.astype(np.int16) - b).max(axis=-1)
+    added, removed, palette_de = palette_diff(a, b)
+    return {
+        'psnr': psnr(a, b),
+        'ssim': ssim(a, b),
+        'max_diff': int(diff.max()),
+        'changed_px': float((diff > 0).mean()),
+        'palette_added': added,
+        'palette_removed': removed,
+        'palette_de': palette_de,
+    }
+
+
+def diff_image(ref, out):
+    """对比图：参考 | 当前 | 差异（放大 8 倍，红色越亮差异越大）"""
+    a, b = np.asarray(ref.convert('RGB')), np.asarray(out.convert('RGB'))
+    heat = np.clip(np.abs(a.astype(np.int16) - b).max(axis=-1) * 8, 0, 255).astype(np.uint8)
+    heat_img = Image.merge('RGB', (Image.fromarray(heat), *[Image.new('L', ref.size)] * 2))
+    panels = [ref.convert('RGB'), out.convert('RGB'), heat_img]
+    scale = min(1.0, DIFF_PANEL_WIDTH / ref.size[0])
+    size = (max(1, int(ref.size[0] * scale)), max(1, int(ref.size[1] * scale)))
+    sheet = Image.new('RGB', (size[0] * 3 + 8, size[1]), (32, 32, 32))
+    for i, panel in enumerate(panels):
+        sheet.paste(panel.resize(size, Image.NEAREST), (i * (size[0] + 4), 0))
+    return sheet
+
+
+# ==================== 运行 ====================
+
+def run_preset(name, image_path, corpus):
+    """按预设处理一张图，返回 (结果图像, 耗时毫秒)；AI 超分不可用时抛出 SuperResError"""
+    from pixel_art_converter import apply_pixel_art, apply_quality_enhance
+    from pixel_art_governor import run_governed
+
+    op, params = PRESETS[name]
+    if params.get('palette'):
+        params = dict(params, palette=str(Path(corpus) / params['palette']))
+    start = time.perf_counter()
+    with Image.open(image_path) as img:
+        if op == 'pixelate':
+            out = run_governed('pixelate', img, apply_pixel_art, params)
+        elif op == 'enhance':
+            out = run_governed('enhance', img, apply_quality_enhance, params)
+        else:
+            from pixel_art_superres import super_resolve_image
+            out = super_resolve_image(img.convert('RGB'), target_scale=float(params['scale']))
+    return out, (time.perf_counter() - start) * 1000
+
+
+# 基线提交中各操作对应的（读写文件的）函数
+BASELINE_FUNCTIONS = {'pixelate': 'convert_to_pixel_art', 'enhance': 'enhance_image_quality'}
+
+# 后来新增的参数：取这些值时与最初版本的行为相同
+BASELINE_EQUIVALENT = {'fast_path': False, 'downsample': 'resize', 'dither': None, 'palette': None,
+                       'quantize_space': 'rgb', 'sharpen_mode': 'rgb', 'denoise_luma': False}
+
+
+def load_baseline(rev):
+    """
+    导入提交 rev 中的 pixel_art_converter.py（git show 取出源码，模块名带提交号，不影响当前模块）
+
+    它导入的其他模块（PIL 等）取自当前环境。
+
+    返回:
+        (模块, 完整提交号)
+    """
+    repo = Path(__file__).resolve().parent
+    try:
+        sha = subprocess.run(['git', 'rev-parse', '--verify', f'{rev}^{{commit}}'], cwd=repo,
+                             capture_output=True, text=True, check=True).stdout.strip()
+        source = subprocess.run(['git', 'show', f'{sha}:pixel_art_converter.py'], cwd=repo,
+                                capture_output=True, check=True).stdout
+    except (OSError, subprocess.CalledProcessError) as e:
+        detail = getattr(e, 'stderr', None) or e
+        raise ValueError(f"无法读取提交 {rev} 的 pixel_art_converter.py: {str(detail).strip()}")
+    module = types.ModuleType(f"pixel_art_converter_{sha[:12]}")
+    module.__file__ = f"{sha[:12]}:pixel_art_converter.py"
+    exec(compile(source, module.__file__, 'exec'), module.__dict__)
+    return module, sha
+
+
+def baseline_params(baseline, name, image_path):
+    """
+    基线能否重现该预设在这张图上的结果
+
+    后来新增的参数取 BASELINE_EQUIVALENT 中的值时与基线行为相同，直接去掉；
+    走快速路径的组合（少色图、调色板图、块状像素画）基线没有对应行为。
+
+    返回:
+        (传给基线函数的参数, None)，或 (None, 不能重现的原因)
+    """
+    op, params = PRESETS[name]
+    func = getattr(baseline, BASELINE_FUNCTIONS.get(op, ''), None)
+    if func is None:
+        return None, f"基线版本没有 {op} 操作"
+    accepted = inspect.signature(func).parameters
+    params = {key: value for key, value in params.items()
+              if key in accepted or BASELINE_EQUIVALENT.get(key, value) != value}
+    missing = [key for key in params if key not in accepted]
+    if missing:
+        return None, f"基线版本不支持参数 {', '.join(missing)}"
+    # 参数名相同但取值是后来才有的（例如 denoise 原先只接受布尔值，后来可以是 'guided'）
+    for key, value in params.items():
+        default = accepted[key].default
+        if default is None or default is inspect.Parameter.empty:
+            continue
+        numbers = isinstance(value, (int, float)) and not isinstance(value, bool)
+        if type(value) is not type(default) and not (numbers and type(default) in (int, float)):
+            return None, f"基线版本的参数 {key} 不接受 {value!r}"
+    if op == 'pixelate' and PRESETS[name][1].get('fast_path', True):
+        from pixel_art_converter import analyze_content
+        with Image.open(image_path) as img:
+            if analyze_content(img, params.get('color_reduction'))['fast_path']:
+                return None, "走快速路径（基线版本没有）"
+    return params, None
+
+
+def run_baseline_preset(baseline, op, params, image_path):
+    """用基线模块处理一张图（基线只有读写文件的接口，经临时文件中转），返回 (结果图像, 耗时毫秒)"""
+    func = getattr(baseline, BASELINE_FUNCTIONS[op])
+    with tempfile.TemporaryDirectory() as tmp:
+        output = str(Path(tmp) / "out.png")
+        start = time.perf_counter()
+        func(str(image_path), output, **params)
+        ms = (time.perf_counter() - start) * 1000
+        with Image.open(output) as out:
+            out.load()
+    return out, ms
+
+
+def _versions():
+    import PIL
+    return {'pillow': PIL.__version__, 'numpy': np.__version__, 'python': sys.version.split()[0]}
+
+
+def working_tree_source():
+    """
+    当前代码对应的提交号；处理代码（pixel_art_*.py，本模块除外）有未提交的改动时加 -dirty 后缀
+
+    不在 git 仓库中时返回 'working-tree'。
+    """
+    repo = Path(__file__).resolve().parent
+    try:
+        sha = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=repo, capture_output=True, text=True,
+                             check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--', 'pixel_art_*.py',
+                                f':(exclude){Path(__file__).name}'],
+                               cwd=repo, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'working-tree'
+    return f"{sha}-dirty" if dirty else sha
+
+
+def _sha256(path):
+    return hashlib.sha256(Path(path).read_bytes()).hexdigest()
+
+
+def _load_manifest(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {'presets': {}, 'timings': {}}
+
+
+def run_golden(presets=None, images=None, update=False, max_workers=None, golden_dir=GOLDEN_DIR,
+               baseline=None):
+    """
+    运行画质回归
+
+    参数:
+        presets / images: 只运行这些预设 / 图片（名称列表，None 为全部）
+        update: 把结果写为新的参考（同时记录参数和耗时）
+        baseline: 与 update 一起使用，用该提交的 pixel_art_converter.py 生成参考（见 load_baseline）
+        max_workers: 并行线程数
+        golden_dir: golden 数据目录
+
+    返回:
+        结果行列表；status 为 identical / ok（在容差内）/ changed / stale（参考的参数已变）/
+        missing（没有参考）/ skipped / error / updated；测试图与生成参考时不同（SHA-256 不符）也为 stale
+    """
+    from pixel_art_superres import SuperResError
+
+    if baseline is not None and not update:
+        raise ValueError("--baseline 只能与 --update 一起使用")
+    baseline, baseline_sha = load_baseline(baseline) if baseline is not None else (None, None)
+    golden_dir = Path(golden_dir)
+    corpus = build_corpus(golden_dir)
+    all_images = corpus_images(corpus)
+    names = list(presets or PRESETS)
+    unknown = [n for n in names if n not in PRESETS] + [n for n in images or () if n not in all_images]
+    if unknown:
+        raise ValueError(f"未知的预设或图片: {', '.join(unknown)}")
+    image_names = list(images or all_images)
+    reference_dir, current_dir, diff_dir = (golden_dir / d for d in ("reference", "current", "diff"))
+    manifest_path = reference_dir / "manifest.json"
+    manifest = _load_manifest(manifest_path)
+    hashes = {image: _sha256(all_images[image]) for image in image_names}
+
+    def check(name, image):
+        op, params = PRESETS[name]
+        key = f"{name}/{image}"
+        row = {'preset': name, 'image': image, 'op': op}
+        try:
+            if baseline is None:
+                out, ms = run_preset(name, all_images[image], corpus)
+            else:
+                base_params, reason = baseline_params(baseline, name, all_images[image])
+                if reason:
+                    return dict(row, status='skipped', note=reason)
+                out, ms = run_baseline_preset(baseline, op, base_params, all_images[image])
+        except SuperResError as e:
+            return dict(row, status='skipped', note=str(e).splitlines()[0])
+        except (Exception, SystemExit) as e:
+            return dict(row, status='error', note=f"{type(e).__name__}: {e}")
+        row['ms'] = round(ms, 1)
+        for base in (current_dir, reference_dir) if update else (current_dir,):
+            (base / name).mkdir(parents=True, exist_ok=True)
+            out.save(base / name / f"{image}.png")
+        if update:
+            return dict(row, status='updated')
+
+        ref_path = reference_dir / name / f"{image}.png"
+        if not ref_path.exists():
+            return dict(row, status='missing')
+        row['ref_ms'] = manifest['timings'].get(key)
+        with Image.open(ref_path) as ref:
+            ref.load()
+        metrics = compare(ref, out)
+        row.update(metrics)
+        (diff_dir / name / f"{image}.png").unlink(missing_ok=True)
+        if 'size' in metrics:
+            status = 'changed'
+        elif metrics['max_diff'] == 0:
+            status = 'identical'
+        elif metrics['psnr'] >= MIN_PSNR[op] and metrics['ssim'] >= MIN_SSIM[op]:
+            status = 'ok'
+        else:
+            status = 'changed'
+        if status != 'identical':
+            (diff_dir / name).mkdir(parents=True, exist_ok=True)
+            if 'size' not in metrics:
+                diff_image(ref, out).save(diff_dir / name / f"{image}.png")
+        if manifest['presets'].get(name) != [op, params]:
+            status = 'stale'
+        elif manifest.get('corpus', {}).get(image, hashes[image]) != hashes[image]:
+            return dict(row, status='stale', note="测试图与生成参考时不同")
+        return dict(row, status=status)
+
+    jobs = [(name, image) for name in names for image in image_names]
+    rows = []
+    console = sys.stdout
+    # 处理函数会打印各阶段信息，并行时混在一起没有意义，只保留每个组合一行
+    with contextlib.redirect_stdout(io.StringIO()), ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(check, name, image) for name, image in jobs]
+        for done, future in enumerate(as_completed(futures), 1):
+            row = future.result()
+            rows.append(row)
+            mark = '✗' if row['status'] in FAILED + ('missing',) else '✓'
+            print(f"[{done}/{len(jobs)}] {mark} {row['preset']}/{row['image']}: {row['status']}",
+                  file=console)
+    rows.sort(key=lambda r: (names.index(r['preset']), image_names.index(r['image'])))
+
+    if update:
+        source = baseline_sha or working_tree_source()
+        for row in rows:
+            if row['status'] == 'updated':
+                manifest['presets'][row['preset']] = list(PRESETS[row['preset']])
+                manifest['timings'][f"{row['preset']}/{row['image']}"] = row['ms']
+                # 参考由哪个版本生成（提交号），以及生成时的测试图
+                manifest.setdefault('source', {})[f"{row['preset']}/{row['image']}"] = source
+                manifest.setdefault('corpus', {})[row['image']] = hashes[row['image']]
+        manifest['versions'] = _versions()
+        reference_dir.mkdir(parents=True, exist_ok=True)
+        with open(manifest_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+    report = {
+        'created': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'update': update,
+        'versions': _versions(),
+        'reference_versions': manifest.get('versions'),
+        'results': [{k: (None if v == float('inf') else v) for k, v in row.items()} for row in rows],
+    }
+    with open(golden_dir / "report.json", 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    return rows
+
+
+def failed(rows, allow_missing=False):
+    """不一致的组合；缺少参考（missing）也算，除非 allow_missing"""
+    statuses = FAILED if allow_missing else FAILED + ('missing',)
+    return [row for row in rows if row['status'] in statuses]
+
+
+def summarize(rows, allow_missing=False):
+    """按预设汇总：各状态计数、最低 PSNR / SSIM、总耗时及相对参考的比值（allow_missing 同 failed）"""
+    summary = []
+    for name in dict.fromkeys(row['preset'] for row in rows):
+        group = [row for row in rows if row['preset'] == name]
+        compared = [row for row in group if 'psnr' in row]
+        ms = sum(row.get('ms') or 0 for row in group)
+        ref_ms = sum(row.get('ref_ms') or 0 for row in group)
+        counts = {}
+        for row in group:
+            counts[row['status']] = counts.get(row['status'], 0) + 1
+        summary.append({
+            'preset': name,
+            'status': ' '.join(f"{k}:{v}" for k, v in counts.items()),
+            'min_psnr': round(min(r['psnr'] for r in compared), 2) if compared else '-',
+            'min_ssim': round(min(r['ssim'] for r in compared), 5) if compared else '-',
+            'ms': round(ms, 1),
+            'vs_ref': round(ms / ref_ms, 2) if ref_ms else '-',
+            'ok': not failed(group, allow_missing),
+        })
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="画质回归：与 golden 参考结果比较")
+    parser.add_argument('--update', action='store_true', help="生成 / 更新参考结果")
+    parser.add_argument('--presets', type=lambda t: [v for v in t.split(',') if v], help="只运行这些预设（逗号分隔）")
+    parser.add_argument('--images', type=lambda t: [v for v in t.split(',') if v], help="只运行这些图片（不含扩展名）")
+    parser.add_argument('--workers', type=int, default=None, help="并行线程数")
+    parser.add_argument('--allow-missing', action='store_true',
+                        help="缺少参考结果的组合不算失败（默认退出码为 1）")
+    parser.add_argument('--list', action='store_true', help="列出全部预设")
+    parser.add_argument('--baseline', metavar='REV',
+                        help="与 --update 一起使用：用该提交的 pixel_art_converter.py 生成参考")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for name, (op, params) in PRESETS.items():
+            print(f"{name:20} {op:10} {json.dumps(params, ensure_ascii=False)}")
+        return []
+    try:
+        rows = run_golden(args.presets, args.images, args.update, args.workers, baseline=args.baseline)
+    except ValueError as e:
+        print(f"错误: {e}")
+        sys.exit(1)
+    summary = summarize(rows, args.allow_missing)
+    print_rows(summary)
+    changed = failed(rows, args.allow_missing)
+    print(f"报告: {GOLDEN_DIR / 'report.json'}")
+    if changed:
+        missing = sum(row['status'] == 'missing' for row in changed)
+        print(f"✗ {len(changed)} 个组合与参考不一致（对比图见 {GOLDEN_DIR / 'diff'}）")
+        if missing:
+            print(f"  其中 {missing} 个缺少参考结果：用 --update --presets ... 生成，或加 --allow-missing")
+        sys.exit(1)
+    if args.update:
+        print(f"✓ 参考结果已更新: {GOLDEN_DIR / 'reference'}")
+    return summary
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except KeyboardInterrupt:
+        print("\n\n用户中断操作")
+        sys.exit(1)
@@ -0,0 +1,306 @@
+"""
+资源管控：像素上限、内存预算与准入控制
+在解码之前只读图片头（尺寸、模式），按参数估算峰值内存和工作量：
+
+- 超出单任务预算时先尝试分块（条带）执行，仍然超出则拒绝并说明原因
+- 同一进程中并行的任务（批量、流水线分支）共享全局预算，
+  余量不足时排队等待其他任务结束（可设超时，超时则拒绝）
+
+估算系数来自实测（4000x3000 JPEG 的峰值 RSS），并留有余量；
+Pillow 的 RGB 图像每像素占 4 字节，L / P 模式占 1 字节。
+
+用法:
+    from pixel_art_governor import run_governed
+    out = run_governed('pixelate', img, apply_pixel_art, params)
+"""
+
+import os
+import sys
+import threading
+from collections import namedtuple
+from contextlib import contextmanager
+
+
+# ==================== 配置 ====================
+# 输入 / 输出图像的最大像素数（输入在解码前检查，防止解压炸弹）
+MAX_INPUT_PIXELS = 300_000_000
+MAX_OUTPUT_PIXELS = 600_000_000
+
+# 全局内存预算（字节，同一进程中同时运行的任务合计）：None 为物理内存的一半，无法获取时 4 GB
+MEMORY_BUDGET = None
+
+# 单个任务的内存预算（字节）：None 与全局预算相同
+JOB_MEMORY_BUDGET = None
+
+# 全局余量不足时最多等待的秒数：None 一直排队，0 立即拒绝
+ADMISSION_TIMEOUT = None
+
+# 估算值的安全系数
+SAFETY_FACTOR = 1.15
+# ================================================
+
+# 各阶段每像素的额外峰值字节数（不含解码后的输入本身）
+_PIXELATE_INPUT = {'enhance': 18, 'plain': 2, 'block': 6}
+_PIXELATE_OUTPUT = {'median': 11, 'median_tiled': 8.5, 'plain': 4}
+_ENHANCE_INPUT = {'full': 21, 'tiled': 10}
+_ENHANCE_OUTPUT = {'full': 12, 'tiled': 8.5}
+# 保边去噪（pixel_art_denoise，总是按条带执行）：数组副本、结果数组与结果图像
+_ENHANCE_DENOISE = 11
+
+# 支持分块执行的操作（处理函数接受 tiled 参数）
+TILED_OPS = ('pixelate', 'enhance')
+
+Estimate = namedtuple('Estimate', 'op input_size output_size peak_bytes work_mpx tiled')
+Estimate.__doc__ = """
+资源估算结果
+
+    input_size / output_size: (宽, 高)
+    peak_bytes: 估算的峰值内存（字节，已乘安全系数）
+    work_mpx: 工作量（各阶段处理的像素总数，百万像素）
+    tiled: 是否按条带执行
+"""
+
+
+class ResourceLimitError(RuntimeError):
+    """任务超出像素上限或内存预算"""
+
+
+def physical_memory():
+    """物理内存字节数，无法获取时返回 None"""
+    try:
+        if sys.platform == 'win32':
+            import ctypes
+
+            class MemoryStatus(ctypes.Structure):
+                _fields_ = [('length', ctypes.c_ulong), ('load', ctypes.c_ulong),
+                            ('total', ctypes.c_ulonglong), ('avail', ctypes.c_ulonglong),
+                            ('total_page', ctypes.c_ulonglong), ('avail_page', ctypes.c_ulonglong),
+                            ('total_virtual', ctypes.c_ulonglong), ('avail_virtual', ctypes.c_ulonglong),
+                            ('avail_extended', ctypes.c_ulonglong)]
+
+            status = MemoryStatus()
+            status.length = ctypes.sizeof(MemoryStatus)
+            ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status))
+            return int(status.total)
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def memory_budget():
+    """当前生效的全局内存预算（字节）"""
+    if MEMORY_BUDGET is not None:
+        return MEMORY_BUDGET
+    total = physical_memory()
+    return total // 2 if total else 4 << 30
+
+
+def job_budget():
+    """当前生效的单任务内存预算（字节）"""
+    budget = memory_budget()
+    return min(JOB_MEMORY_BUDGET, budget) if JOB_MEMORY_BUDGET is not None else budget
+
+
+def set_budget(memory=None, job=None):
+    """设置全局 / 单任务内存预算（字节，None 表示自动）"""
+    global MEMORY_BUDGET, JOB_MEMORY_BUDGET
+    MEMORY_BUDGET = memory
+    JOB_MEMORY_BUDGET = job
+
+
+def format_bytes(n):
+    return f"{n / (1 << 30):.2f} GB" if n >= 1 << 30 else f"{n / (1 << 20):.0f} MB"
+
+
+def _bytes_per_pixel(mode):
+    """Pillow 中 mode 图像每像素占用的字节数"""
+    return 1 if mode in ('1', 'L', 'P') else 4
+
+
+def output_size(op, size, params):
+    """按参数计算 op 的输出尺寸（不解码图像）"""
+    width, height = size
+    if op == 'pixelate':
+        from pixel_art_converter import compute_final_size
+        return compute_final_size(size, params.get('scale_factor'))
+    if op == 'enhance':
+        factor = params.get('upscale_factor')
+        if factor and factor > 1.0:
+            return int(width * factor), int(height * factor)
+        return size
+    if op == 'super_res':
+        scale = float(params.get('scale', params.get('target_scale', 2)))
+        return int(width * scale), int(height * scale)
+    raise ValueError(f"未知的操作 '{op}'")
+
+
+def estimate(op, size, mode='RGB', params=None, tiled=False):
+    """
+    估算 op 在 size / mode 的输入上按 params 执行时的峰值内存和工作量
+
+    参数:
+        op: 'pixelate' / 'enhance' / 'super_res'
+        size, mode: 输入图像的尺寸和模式（来自图片头，无需解码）
+        params: 处理函数的参数
+        tiled: 按条带执行时的估算
+
+    返回:
+        Estimate
+    """
+    params = params or {}
+    in_px = size[0] * size[1]
+    out_size = output_size(op, size, params)
+    out_px = out_size[0] * out_size[1]
+    # 解码后的输入及转换为 RGB 的副本（调用方持有输入，整个过程中都在内存里）
+    held = in_px * (_bytes_per_pixel(mode) + (0 if mode == 'RGB' else 4))
+
+    if op == 'pixelate':
+        enhance_mode = params.get('enhance_mode', True)
+        downsample = params.get('downsample', 'resize')
+        if downsample != 'resize':
+            stage = 'block'
+        else:
+            stage = 'enhance' if enhance_mode else 'plain'
+        # 放大后的中值滤波只在增强模式、插值缩小且没有固定调色板时执行
+        median = enhance_mode and downsample == 'resize' and not params.get('palette')
+        per_out = _PIXELATE_OUTPUT[('median_tiled' if tiled else 'median') if median else 'plain']
+        peak = max(held + in_px * _PIXELATE_INPUT[stage], held + out_px * per_out)
+        work = in_px * (5 if stage == 'enhance' else 1) + out_px * (2 if median else 1)
+    elif op == 'enhance':
+        peak = held + in_px * _ENHANCE_INPUT['tiled' if tiled else 'full']
+        work = in_px * 4
+        if params.get('denoise') in ('guided', 'nlm'):
+            peak = max(peak, held + in_px * _ENHANCE_DENOISE)
+            work += in_px * (8 if params['denoise'] == 'nlm' else 2)
+        if out_px != in_px:
+            peak = max(peak, held + out_px * _ENHANCE_OUTPUT['tiled' if tiled else 'full'])
+            work += out_px * 2
+    elif op == 'super_res':
+        # 输入写成临时 PNG，模型输出读回并转为 RGB，再缩放到目标倍数
+        peak = held + in_px * 4 + out_px * 8
+        work = out_px * 2
+    else:
+        raise ValueError(f"未知的操作 '{op}'")
+    return Estimate(op, tuple(size), tuple(out_size), int(peak * SAFETY_FACTOR),
+                    round(work / 1e6, 1), tiled)
+
+
+def check_input_size(size):
+    """输入像素数超过 MAX_INPUT_PIXELS 时抛出 ResourceLimitError（在解码前调用）"""
+    in_px = size[0] * size[1]
+    if in_px > MAX_INPUT_PIXELS:
+        raise ResourceLimitError(
+            f"输入图像过大：{size[0]}x{size[1]}（{in_px / 1e6:.0f} 百万像素），"
+            f"上限 {MAX_INPUT_PIXELS / 1e6:.0f} 百万像素"
+        )
+
+
+def plan(op, size, mode='RGB', params=None):
+    """
+    为任务选择执行方式：整图 -> 分块；都超出单任务预算时抛出 ResourceLimitError
+
+    返回:
+        Estimate（tiled 表示是否需要分块执行）
+    """
+    check_input_size(size)
+    result = estimate(op, size, mode, params)
+    out_px = result.output_size[0] * result.output_size[1]
+    if out_px > MAX_OUTPUT_PIXELS:
+        raise ResourceLimitError(
+            f"输出图像过大：{result.output_size[0]}x{result.output_size[1]}"
+            f"（{out_px / 1e6:.0f} 百万像素），上限 {MAX_OUTPUT_PIXELS / 1e6:.0f} 百万像素，"
+            "请减小缩放 / 放大倍数"
+        )
+    budget = job_budget()
+    if result.peak_bytes <= budget:
+        return result
+    if op in TILED_OPS:
+        tiled = estimate(op, size, mode, params, tiled=True)
+        if tiled.peak_bytes <= budget:
+            print(f"预计内存 {format_bytes(result.peak_bytes)} 超出预算 {format_bytes(budget)}，"
+                  f"改为分块执行（约 {format_bytes(tiled.peak_bytes)}）")
+            return tiled
+        result = tiled
+    raise ResourceLimitError(
+        f"预计需要 {format_bytes(result.peak_bytes)} 内存，超出单任务预算 {format_bytes(budget)}"
+        f"（输入 {size[0]}x{size[1]}，输出 {result.output_size[0]}x{result.output_size[1]}）；"
+        "请减小缩放 / 放大倍数或提高内存预算"
+    )
+
+
+def plan_file(op, path, params=None):
+    """只读图片头，为文件上的任务选择执行方式（见 plan）"""
+    from PIL import Image
+    with Image.open(path) as img:
+        return plan(op, img.size, img.mode, params)
+
+
+class Governor:
+    """
+    全局内存准入：并行任务的估算峰值之和不超过全局预算
+
+    用法:
+        with GOVERNOR.admit(estimate):
+            ...  # 执行任务
+    """
+
+    def __init__(self):
+        self.in_use = 0
+        self.running = 0
+        self._cond = threading.Condition()
+
+    @contextmanager
+    def admit(self, estimate, timeout=None):
+        """
+        占用 estimate.peak_bytes 的全局预算直到离开 with 块
+
+        余量不足时排队等待；等待超过 timeout 秒（默认 ADMISSION_TIMEOUT）则抛出 ResourceLimitError。
+        没有其他任务在运行时总是放行（单任务预算已由 plan 检查）。
+        """
+        need = estimate.peak_bytes
+        timeout = ADMISSION_TIMEOUT if timeout is None else timeout
+        with self._cond:
+            def fits():
+                return self.running == 0 or self.in_use + need <= memory_budget()
+
+            if not fits():
+                print(f"内存余量不足（已占用 {format_bytes(self.in_use)} / {format_bytes(memory_budget())}），"
+                      f"排队等待...")
+            if not self._cond.wait_for(fits, timeout):
+                raise ResourceLimitError(
+                    f"等待 {timeout} 秒后内存余量仍不足：需要 {format_bytes(need)}，"
+                    f"已占用 {format_bytes(self.in_use)} / {format_bytes(memory_budget())}"
+                )
+            self.in_use += need
+            self.running += 1
+        try:
+            yield estimate
+        finally:
+            with self._cond:
+                self.in_use -= need
+                self.running -= 1
+                self._cond.notify_all()
+
+
+GOVERNOR = Governor()
+
+
+@contextmanager
+def govern(op, size, mode='RGB', params=None):
+    """plan + 全局准入：with govern(...) as plan: 按 plan.tiled 执行任务"""
+    result = plan(op, size, mode, params)
+    with GOVERNOR.admit(result):
+        yield result
+
+
+def run_governed(op, img, func, params, **kwargs):
+    """
+    在资源管控下执行 func(img, **params, **kwargs)
+
+    img 可以是刚 Image.open 尚未解码的图像（只用到尺寸和模式）；
+    预算不足以整图执行时自动传入 tiled=True。
+    """
+    with govern(op, img.size, img.mode, params) as result:
+        if result.tiled:
+            kwargs['tiled'] = True
+        return func(img, **params, **kwargs)
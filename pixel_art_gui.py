@@ -1,38 +1,28 @@
 """
 像素画风格转换器 - 图形界面版本
 提供友好的用户界面，方便进行像素画转换、画质增强和 AI 超分
+
+为了缩短启动时间（尤其是打包后的 exe），启动时只加载 tkinter：
+处理模块（连带 PIL）在第一次执行处理时才导入，各标签页在第一次切换到时才构建。
+
+各项处理都在后台线程中执行：状态栏显示阶段和进度，可随时取消
+（AI 超分会直接结束 Real-ESRGAN 子进程），关闭窗口时也会先取消正在运行的任务。
 """
 
 import os
-import sys
-import subprocess
+import threading
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
 from pathlib import Path
-from PIL import Image
-
-
-# 项目根目录
-BASE_DIR = Path(__file__).resolve().parent
 
-# Real-ESRGAN 可执行文件相对路径（你已解压到项目目录下）
-# 这里使用包含 models 文件夹的版本目录
-REALESRGAN_EXE = BASE_DIR / "realesrgan-ncnn-vulkan-20220424-windows" / "realesrgan-ncnn-vulkan.exe"
-
-
-# 导入转换函数
-try:
-    from pixel_art_converter import convert_to_pixel_art, enhance_image_quality
-except ImportError:
-    messagebox.showerror("错误", "无法导入 pixel_art_converter 模块")
-    sys.exit(1)
+from pixel_art_progress import ConversionCancelled
 
 
 class PixelArtConverterGUI:
     def __init__(self, root):
         self.root = root
         self.root.title("图像处理工具")
-        self.root.geometry("600x750")
+        self.root.geometry("600x800")
         self.root.resizable(False, False)
         
         # 像素画转换变量
@@ -42,6 +32,8 @@ class PixelArtConverterGUI:
         self.color_reduction = tk.IntVar(value=128)
         self.scale_factor = tk.StringVar(value="")
         self.enhance_mode = tk.BooleanVar(value=True)
+        self.sharpen_luma = tk.BooleanVar(value=False)
+        self.keep_metadata = tk.BooleanVar(value=False)
         self.interpolation = tk.StringVar(value="bicubic")
         self.preserve_aspect = tk.BooleanVar(value=True)
         
@@ -51,15 +43,37 @@ class PixelArtConverterGUI:
         self.sharpness = tk.DoubleVar(value=1.5)
         self.contrast = tk.DoubleVar(value=1.1)
         self.saturation = tk.DoubleVar(value=1.05)
-        self.denoise = tk.BooleanVar(value=True)
+        # 去噪方式映射：中文显示 -> denoise 参数（保边去噪需要 NumPy）；
+        # 任务流水线的"+ 画质增强"在画质增强标签页构建前也会读取
+        self.denoise_map = {
+            "不去噪": False,
+            "中值滤波（原有效果）": "median",
+            "自引导滤波（保边，推荐）": "guided",
+            "快速非局部均值（保边，较慢）": "nlm",
+        }
+        self.denoise_display = tk.StringVar(value="中值滤波（原有效果）")
+        self.denoise_luma = tk.BooleanVar(value=False)
+        self.enhance_sharpen_luma = tk.BooleanVar(value=False)
+        self.enhance_keep_metadata = tk.BooleanVar(value=False)
         self.upscale_factor = tk.StringVar(value="")
 
         # AI 超分变量（Real-ESRGAN）
         self.sr_input_path = tk.StringVar()
         self.sr_output_path = tk.StringVar()
         self.sr_scale = tk.StringVar(value="2")  # 放大倍数，默认 2 倍
+
+        # 任务流水线变量
+        self.job_input_path = tk.StringVar()
+        self.job_output_path = tk.StringVar()
+
+        # 后台任务（同一时间只运行一个）
+        self.worker = None
+        self.cancel_event = None
+        # 调试：在性能分析下执行（见 pixel_art_profile）
+        self.profile_enabled = tk.BooleanVar(value=False)
         
         self.create_widgets()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
         
     def create_widgets(self):
         # 标题
@@ -75,31 +89,185 @@ class PixelArtConverterGUI:
         self.notebook = ttk.Notebook(self.root)
         self.notebook.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
         
-        # 像素画转换标签页
+        # 标签页先只放空框架，内容在第一次切换到该页时才构建
         self.pixel_frame = ttk.Frame(self.notebook)
-        self.notebook.add(self.pixel_frame, text="像素画转换")
-        self.create_pixel_art_tab()
-        
-        # 画质增强标签页
         self.enhance_frame = ttk.Frame(self.notebook)
-        self.notebook.add(self.enhance_frame, text="画质增强")
-        self.create_enhance_tab()
-
-        # AI 超分标签页（Real-ESRGAN）
         self.sr_frame = ttk.Frame(self.notebook)
-        self.notebook.add(self.sr_frame, text="AI 超分 (Real-ESRGAN)")
-        self.create_super_res_tab()
+        self.job_frame = ttk.Frame(self.notebook)
+        self.tab_builders = {}
+        for frame, text, builder in (
+            (self.pixel_frame, "像素画转换", self.create_pixel_art_tab),
+            (self.enhance_frame, "画质增强", self.create_enhance_tab),
+            (self.sr_frame, "AI 超分 (Real-ESRGAN)", self.create_super_res_tab),
+            (self.job_frame, "任务流水线", self.create_job_tab),  # 多步骤串联
+        ):
+            self.notebook.add(frame, text=text)
+            self.tab_builders[str(frame)] = builder
+        # 第一个标签页立即构建（任务流水线会复用其中的参数控件）
+        self.build_tab(str(self.pixel_frame))
+        self.notebook.bind("<<NotebookTabChanged>>",
+                           lambda event: self.build_tab(self.notebook.select()))
         
-        # 状态栏
+        # 状态栏：状态文字 + 进度条 + 取消按钮
+        status_frame = tk.Frame(self.root, relief=tk.SUNKEN, bd=1)
+        status_frame.pack(side=tk.BOTTOM, fill=tk.X)
+        self.cancel_button = tk.Button(
+            status_frame,
+            text="取消",
+            command=self.cancel_task,
+            state=tk.DISABLED,
+            font=("Microsoft YaHei", 8),
+            pady=0
+        )
+        self.cancel_button.pack(side=tk.RIGHT, padx=2)
+        tk.Checkbutton(
+            status_frame,
+            variable=self.profile_enabled,
+            text="性能分析",
+            font=("Microsoft YaHei", 8)
+        ).pack(side=tk.RIGHT)
+        self.progress_bar = ttk.Progressbar(status_frame, length=160, maximum=100, mode="determinate")
+        self.progress_bar.pack(side=tk.RIGHT, padx=5)
         self.status_label = tk.Label(
-            self.root,
+            status_frame,
             text="准备就绪",
-            relief=tk.SUNKEN,
             anchor=tk.W,
             font=("Microsoft YaHei", 9)
         )
-        self.status_label.pack(side=tk.BOTTOM, fill=tk.X)
+        self.status_label.pack(side=tk.LEFT, fill=tk.X, expand=True)
     
+    def build_tab(self, tab):
+        """构建尚未构建的标签页内容（每页只构建一次）"""
+        builder = self.tab_builders.pop(str(tab), None)
+        if builder is not None:
+            builder()
+
+    def start_task(self, button, busy_text, status_text, work, on_success, on_failure):
+        """
+        在后台线程中执行 work(progress, cancel_event)，期间显示进度并允许取消
+
+        on_success(结果) / on_failure(异常) 回到主线程调用；同一时间只运行一个任务。
+        work 中不要读写 tk 变量（参数应在调用前取好）。
+        """
+        if self.worker is not None and self.worker.is_alive():
+            messagebox.showwarning("提示", "已有任务正在运行，请等待完成或先取消")
+            return
+        idle_text = button.cget("text")
+        button.config(state=tk.DISABLED, text=busy_text)
+        self.status_label.config(text=status_text)
+        self.progress_bar["value"] = 0
+        self.cancel_button.config(state=tk.NORMAL)
+        cancel_event = threading.Event()
+        self.cancel_event = cancel_event
+
+        def report(fraction, message=None):
+            # 在工作线程中调用：转交主线程更新界面
+            self.root.after(0, self.show_progress, status_text, fraction, message)
+
+        def finish(state, value):
+            button.config(state=tk.NORMAL, text=idle_text)
+            self.cancel_button.config(state=tk.DISABLED)
+            self.cancel_event = None
+            if state == "cancelled":
+                self.progress_bar["value"] = 0
+                self.status_label.config(text="已取消")
+            elif state == "error":
+                self.progress_bar["value"] = 0
+                on_failure(value)
+            else:
+                self.progress_bar["value"] = 100
+                on_success(value)
+
+        def worker():
+            try:
+                outcome = ("done", work(report, cancel_event))
+            except ConversionCancelled:
+                outcome = ("cancelled", None)
+            except Exception as e:
+                outcome = ("error", e)
+            # 回到主线程更新 UI
+            self.root.after(0, finish, *outcome)
+
+        self.worker = threading.Thread(target=worker, daemon=True)
+        self.worker.start()
+
+    def profiled(self, work, on_success, job, output_path):
+        """
+        勾选"性能分析"时，把任务改为在性能分析下按等价的任务图执行
+
+        统计文件、火焰图折叠栈和可重放的任务描述写入输出文件旁的 profiles 目录
+        （保留元数据等任务图不支持的选项不生效）。未勾选时原样返回 work / on_success。
+        """
+        if not self.profile_enabled.get():
+            return work, on_success
+        out_dir = os.path.join(os.path.dirname(os.path.abspath(output_path)), "profiles")
+
+        def profiled_work(progress, cancel_event):
+            from pixel_art_profile import profile_job
+            return profile_job(job, out_dir, progress=progress, cancel_event=cancel_event)
+
+        def profiled_success(result):
+            on_success(None)
+            messagebox.showinfo(
+                "性能分析",
+                f"火焰图折叠栈：{result['folded']}\n统计文件：{result['stats']}\n"
+                f"可重放的任务描述：{result['spec']}"
+            )
+
+        return profiled_work, profiled_success
+
+    def open_preview(self, button, input_var, output_var, nearest=False):
+        """
+        在查看器中打开输出图片，并与输入图片对比
+
+        图片解码和金字塔生成在后台线程中进行；nearest 为 True 时放大使用最近邻（像素画）。
+        """
+        input_path, output_path = input_var.get(), output_var.get()
+        if not output_path or not os.path.exists(output_path):
+            messagebox.showerror("错误", "输出文件不存在，请先完成处理！")
+            return
+        if not os.path.exists(input_path):
+            input_path = None
+
+        def work(progress, cancel_event):
+            from pixel_art_viewer import load_pyramids
+            return load_pyramids(output_path, input_path)
+
+        def on_success(pyramids):
+            from pixel_art_viewer import ImageViewer
+            self.status_label.config(text="准备就绪")
+            after, before = pyramids
+            ImageViewer(self.root, after, before=before,
+                        title=f"预览 - {Path(output_path).name}", nearest=nearest)
+
+        def on_failure(e):
+            self.status_label.config(text="预览失败")
+            messagebox.showerror("错误", f"无法打开预览：\n{str(e)}")
+
+        self.start_task(button, "读取中...", "正在读取预览", work, on_success, on_failure)
+
+    def show_progress(self, status_text, fraction, message=None):
+        """更新进度条和状态文字（主线程）"""
+        if self.cancel_event is None or self.cancel_event.is_set():
+            return
+        self.progress_bar["value"] = fraction * 100
+        detail = f"（{message}）" if message else ""
+        self.status_label.config(text=f"{status_text}{detail} {fraction:.0%}")
+
+    def cancel_task(self):
+        """请求取消正在运行的任务；处理会在下一个检查点停止"""
+        if self.cancel_event is not None:
+            self.cancel_event.set()
+            self.cancel_button.config(state=tk.DISABLED)
+            self.status_label.config(text="正在取消...")
+
+    def on_close(self):
+        """关闭窗口：先取消正在运行的任务（结束 Real-ESRGAN 子进程），再退出"""
+        if self.worker is not None and self.worker.is_alive():
+            self.cancel_task()
+            self.worker.join(timeout=3)
+        self.root.destroy()
+
     def create_pixel_art_tab(self):
         # 输入文件选择
         input_frame = tk.Frame(self.pixel_frame, pady=10)
@@ -208,6 +376,47 @@ class PixelArtConverterGUI:
             width=30
         )
         interp_combo.pack(side=tk.LEFT, padx=5)
+
+        # 抖动方式（颜色量化时生效）
+        dither_frame = tk.Frame(params_frame)
+        dither_frame.pack(fill=tk.X, pady=5)
+        tk.Label(dither_frame, text="抖动方式:", width=12, anchor=tk.W).pack(side=tk.LEFT)
+        # 抖动方式映射：中文显示 -> 英文值（None 表示保持默认行为）
+        self.dither_map = {
+            "默认": None,
+            "无抖动（色块最清晰）": "none",
+            "Bayer 4x4（有序，复古感）": "bayer4",
+            "Bayer 8x8（有序，过渡更细）": "bayer8",
+            "蓝噪声（有序，颗粒均匀）": "blue-noise",
+            "Floyd–Steinberg（误差扩散）": "floyd-steinberg",
+            "Atkinson（误差扩散，高对比）": "atkinson",
+        }
+        self.dither_display = tk.StringVar(value="默认")
+        ttk.Combobox(
+            dither_frame,
+            textvariable=self.dither_display,
+            values=list(self.dither_map.keys()),
+            state="readonly",
+            width=30
+        ).pack(side=tk.LEFT, padx=5)
+
+        # 量化色彩空间（颜色量化时生效）
+        space_frame = tk.Frame(params_frame)
+        space_frame.pack(fill=tk.X, pady=5)
+        tk.Label(space_frame, text="量化色彩空间:", width=12, anchor=tk.W).pack(side=tk.LEFT)
+        self.quantize_space_map = {
+            "RGB（默认，中值切割）": "rgb",
+            "OKLab（感知均匀，推荐少色时使用）": "oklab",
+            "CIELAB（感知色差）": "lab",
+        }
+        self.quantize_space_display = tk.StringVar(value="RGB（默认，中值切割）")
+        ttk.Combobox(
+            space_frame,
+            textvariable=self.quantize_space_display,
+            values=list(self.quantize_space_map.keys()),
+            state="readonly",
+            width=30
+        ).pack(side=tk.LEFT, padx=5)
         
         # 增强模式
         enhance_frame = tk.Frame(params_frame)
@@ -218,6 +427,16 @@ class PixelArtConverterGUI:
             variable=self.enhance_mode,
             text="启用（推荐，效果更好）"
         ).pack(side=tk.LEFT, padx=5)
+        tk.Checkbutton(
+            enhance_frame,
+            variable=self.sharpen_luma,
+            text="仅锐化亮度"
+        ).pack(side=tk.LEFT, padx=5)
+        tk.Checkbutton(
+            enhance_frame,
+            variable=self.keep_metadata,
+            text="保留元数据（EXIF / ICC）"
+        ).pack(side=tk.LEFT, padx=5)
         
         # 保持宽高比
         aspect_frame = tk.Frame(params_frame)
@@ -245,6 +464,17 @@ class PixelArtConverterGUI:
             cursor="hand2"
         )
         self.convert_button.pack()
+
+        self.convert_preview_button = tk.Button(
+            button_frame,
+            text="预览 / 对比",
+            font=("Microsoft YaHei", 10),
+            width=20,
+            cursor="hand2"
+        )
+        self.convert_preview_button.config(command=lambda: self.open_preview(
+            self.convert_preview_button, self.input_path, self.output_path, nearest=True))
+        self.convert_preview_button.pack(pady=(8, 0))
     
     def create_enhance_tab(self):
         # 输入文件选择
@@ -308,6 +538,16 @@ class PixelArtConverterGUI:
         self.sharp_label = tk.Label(sharp_frame, text="1.5", width=6)
         self.sharp_label.pack(side=tk.LEFT, padx=5)
         sharp_scale.config(command=lambda v: self.sharp_label.config(text=f"{float(v):.2f}"))
+
+        # 锐化通道
+        sharp_mode_frame = tk.Frame(params_frame)
+        sharp_mode_frame.pack(fill=tk.X, pady=5)
+        tk.Label(sharp_mode_frame, text="锐化通道:", width=12, anchor=tk.W).pack(side=tk.LEFT)
+        tk.Checkbutton(
+            sharp_mode_frame,
+            variable=self.enhance_sharpen_luma,
+            text="仅亮度（YCbCr，更快，颜色边缘不额外锐化）"
+        ).pack(side=tk.LEFT, padx=5)
         
         # 对比度
         contrast_frame = tk.Frame(params_frame)
@@ -358,10 +598,27 @@ class PixelArtConverterGUI:
         denoise_frame = tk.Frame(params_frame)
         denoise_frame.pack(fill=tk.X, pady=5)
         tk.Label(denoise_frame, text="去噪处理:", width=12, anchor=tk.W).pack(side=tk.LEFT)
+        ttk.Combobox(
+            denoise_frame,
+            textvariable=self.denoise_display,
+            values=list(self.denoise_map.keys()),
+            state="readonly",
+            width=30
+        ).pack(side=tk.LEFT, padx=5)
         tk.Checkbutton(
             denoise_frame,
-            variable=self.denoise,
-            text="启用（推荐，减少噪点）"
+            variable=self.denoise_luma,
+            text="仅亮度（更快）"
+        ).pack(side=tk.LEFT, padx=5)
+
+        # 元数据
+        metadata_frame = tk.Frame(params_frame)
+        metadata_frame.pack(fill=tk.X, pady=5)
+        tk.Label(metadata_frame, text="元数据:", width=12, anchor=tk.W).pack(side=tk.LEFT)
+        tk.Checkbutton(
+            metadata_frame,
+            variable=self.enhance_keep_metadata,
+            text="保留（EXIF / ICC 配置文件 / DPI）"
         ).pack(side=tk.LEFT, padx=5)
         
         # 增强按钮
@@ -381,6 +638,17 @@ class PixelArtConverterGUI:
         )
         self.enhance_button.pack()
 
+        self.enhance_preview_button = tk.Button(
+            button_frame,
+            text="预览 / 对比",
+            font=("Microsoft YaHei", 10),
+            width=20,
+            cursor="hand2"
+        )
+        self.enhance_preview_button.config(command=lambda: self.open_preview(
+            self.enhance_preview_button, self.enhance_input_path, self.enhance_output_path, nearest=False))
+        self.enhance_preview_button.pack(pady=(8, 0))
+
     def create_super_res_tab(self):
         """AI 超分（Real-ESRGAN）标签页"""
         # 输入文件选择
@@ -440,6 +708,7 @@ class PixelArtConverterGUI:
         ).pack(side=tk.LEFT, padx=5)
 
         # 路径提示
+        from pixel_art_superres import REALESRGAN_EXE
         info_frame = tk.Frame(params_frame)
         info_frame.pack(fill=tk.X, pady=5)
         tk.Label(
@@ -465,7 +734,108 @@ class PixelArtConverterGUI:
             cursor="hand2"
         )
         self.sr_button.pack()
+
+        self.sr_preview_button = tk.Button(
+            button_frame,
+            text="预览 / 对比",
+            font=("Microsoft YaHei", 10),
+            width=20,
+            cursor="hand2"
+        )
+        self.sr_preview_button.config(command=lambda: self.open_preview(
+            self.sr_preview_button, self.sr_input_path, self.sr_output_path, nearest=False))
+        self.sr_preview_button.pack(pady=(8, 0))
         
+    def create_job_tab(self):
+        """任务流水线标签页：在内存中串联多个步骤，中间结果不落盘"""
+        # 输入文件选择
+        input_frame = tk.Frame(self.job_frame, pady=10)
+        input_frame.pack(fill=tk.X, padx=20)
+
+        tk.Label(input_frame, text="输入图片:", font=("Microsoft YaHei", 10)).pack(anchor=tk.W)
+        input_path_frame = tk.Frame(input_frame)
+        input_path_frame.pack(fill=tk.X, pady=5)
+
+        tk.Entry(input_path_frame, textvariable=self.job_input_path, width=50).pack(
+            side=tk.LEFT, fill=tk.X, expand=True
+        )
+        tk.Button(
+            input_path_frame,
+            text="浏览...",
+            command=self.select_job_input_file,
+            width=10
+        ).pack(side=tk.LEFT, padx=5)
+
+        # 输出文件选择（写入最后一个步骤）
+        output_frame = tk.Frame(self.job_frame, pady=10)
+        output_frame.pack(fill=tk.X, padx=20)
+
+        tk.Label(output_frame, text="输出图片:", font=("Microsoft YaHei", 10)).pack(anchor=tk.W)
+        output_path_frame = tk.Frame(output_frame)
+        output_path_frame.pack(fill=tk.X, pady=5)
+
+        tk.Entry(output_path_frame, textvariable=self.job_output_path, width=50).pack(
+            side=tk.LEFT, fill=tk.X, expand=True
+        )
+        tk.Button(
+            output_path_frame,
+            text="浏览...",
+            command=self.select_job_output_file,
+            width=10
+        ).pack(side=tk.LEFT, padx=5)
+
+        # 步骤列表（JSON，可直接编辑；用 "from" 指定上游即可分叉）
+        steps_frame = tk.LabelFrame(
+            self.job_frame,
+            text="处理步骤（JSON）",
+            font=("Microsoft YaHei", 10, "bold"),
+            pady=5,
+            padx=10
+        )
+        steps_frame.pack(fill=tk.BOTH, expand=True, padx=20, pady=5)
+
+        add_frame = tk.Frame(steps_frame)
+        add_frame.pack(fill=tk.X, pady=2)
+        tk.Button(add_frame, text="+ AI 超分", command=lambda: self.add_job_step('super_res')).pack(side=tk.LEFT, padx=2)
+        tk.Button(add_frame, text="+ 画质增强", command=lambda: self.add_job_step('enhance')).pack(side=tk.LEFT, padx=2)
+        tk.Button(add_frame, text="+ 像素画", command=lambda: self.add_job_step('pixelate')).pack(side=tk.LEFT, padx=2)
+        tk.Button(add_frame, text="清空", command=self.clear_job_steps).pack(side=tk.RIGHT, padx=2)
+        tk.Button(add_frame, text="保存...", command=self.save_job_file).pack(side=tk.RIGHT, padx=2)
+        tk.Button(add_frame, text="载入...", command=self.load_job_file).pack(side=tk.RIGHT, padx=2)
+
+        tk.Label(
+            steps_frame,
+            text="(添加步骤时使用其他标签页中的当前参数)",
+            font=("Microsoft YaHei", 8),
+            fg="gray"
+        ).pack(anchor=tk.W)
+
+        text_frame = tk.Frame(steps_frame)
+        text_frame.pack(fill=tk.BOTH, expand=True, pady=5)
+        scrollbar = tk.Scrollbar(text_frame)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.job_steps_text = tk.Text(text_frame, height=12, font=("Consolas", 9), yscrollcommand=scrollbar.set)
+        self.job_steps_text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.config(command=self.job_steps_text.yview)
+        self.job_steps_text.insert("1.0", "[]")
+
+        # 运行按钮
+        button_frame = tk.Frame(self.job_frame, pady=10)
+        button_frame.pack()
+
+        self.job_button = tk.Button(
+            button_frame,
+            text="运行流水线",
+            command=self.run_job,
+            font=("Microsoft YaHei", 12, "bold"),
+            bg="#FF9800",
+            fg="white",
+            width=20,
+            height=2,
+            cursor="hand2"
+        )
+        self.job_button.pack()
+
     def select_input_file(self):
         filename = filedialog.askopenfilename(
             title="选择输入图片",
@@ -576,43 +946,52 @@ class PixelArtConverterGUI:
         except ValueError:
             messagebox.showerror("错误", "缩放倍数必须是数字！")
             return
-        
-        # 禁用按钮，显示处理中
-        self.convert_button.config(state=tk.DISABLED, text="转换中...")
-        self.status_label.config(text="正在转换，请稍候...")
-        self.root.update()
-        
-        try:
+
+        input_path = self.input_path.get()
+        output_path = self.output_path.get()
+        params = dict(
+            pixel_size=pixel_size,
+            scale_factor=scale_factor,
+            color_reduction=color_reduction,
+            preserve_aspect=self.preserve_aspect.get(),
+            enhance_mode=self.enhance_mode.get(),
             # 获取插值方法的英文值
-            interpolation_value = self.interpolation_map.get(
-                self.interpolation_display.get(), 
-                "bicubic"
-            )
-            
-            # 执行转换
-            convert_to_pixel_art(
-                input_path=self.input_path.get(),
-                output_path=self.output_path.get(),
-                pixel_size=pixel_size,
-                scale_factor=scale_factor,
-                color_reduction=color_reduction,
-                preserve_aspect=self.preserve_aspect.get(),
-                enhance_mode=self.enhance_mode.get(),
-                interpolation=interpolation_value
-            )
-            
-            messagebox.showinfo("成功", f"转换完成！\n输出文件：{self.output_path.get()}")
+            interpolation=self.interpolation_map.get(self.interpolation_display.get(), "bicubic"),
+            dither=self.dither_map.get(self.dither_display.get()),
+            quantize_space=self.quantize_space_map.get(self.quantize_space_display.get(), "rgb"),
+            sharpen_mode='luma' if self.sharpen_luma.get() else 'rgb',
+        )
+
+        keep_metadata = self.keep_metadata.get()
+
+        def work(progress, cancel_event):
+            from pixel_art_converter import Image, apply_pixel_art
+            from pixel_art_governor import run_governed
+            from pixel_art_ingest import output_metadata
+            with Image.open(input_path) as img:
+                # 解码前按图片头估算内存，超出预算时分块执行或报错；
+                # EXIF 方向和 ICC 色彩在 apply_pixel_art 中缩小后校正
+                metadata = output_metadata(img, keep_metadata)
+                final_img = run_governed('pixelate', img, apply_pixel_art, params,
+                                         progress=progress, cancel_event=cancel_event)
+            final_img.save(output_path, **metadata)
+
+        def on_success(_):
             self.status_label.config(text="转换完成！")
-            
-        except Exception as e:
-            messagebox.showerror("错误", f"转换失败：\n{str(e)}")
+            messagebox.showinfo("成功", f"转换完成！\n输出文件：{output_path}")
+
+        def on_failure(e):
             self.status_label.config(text="转换失败")
-        finally:
-            # 恢复按钮
-            self.convert_button.config(state=tk.NORMAL, text="开始转换")
+            messagebox.showerror("错误", f"转换失败：\n{str(e)}")
+
+        job = {"input": input_path, "steps": [dict(params, op="pixelate", output=output_path)]}
+        work, on_success = self.profiled(work, on_success, job, output_path)
+        self.start_task(self.convert_button, "转换中...", "正在转换", work, on_success, on_failure)
 
     def run_super_res(self):
-        """调用 Real-ESRGAN 进行 AI 超分（放到子线程中，避免界面假死）"""
+        """调用 Real-ESRGAN 进行 AI 超分（在后台线程中执行，可取消）"""
+        from pixel_art_superres import REALESRGAN_EXE, SuperResError, find_model, super_resolve_file
+
         # 检查 exe 是否存在
         if not REALESRGAN_EXE.exists():
             messagebox.showerror(
@@ -642,97 +1021,33 @@ class PixelArtConverterGUI:
             messagebox.showerror("错误", "放大倍数必须是大于等于 1 的数字！")
             return
 
-        # 自动选择可用模型，并匹配模型尺度
-        models_dir = REALESRGAN_EXE.parent / "models"
-        model_defs = [
-            ("realesr-animevideov3", 2),
-            ("realesrgan-x4plus-anime", 4),
-            ("realesrgan-x4plus", 4),
-        ]
-        chosen_name, chosen_scale = None, None
-        for name, mscale in model_defs:
-            if (models_dir / f"{name}.param").exists():
-                chosen_name, chosen_scale = name, mscale
-                break
-        if chosen_name is None:
-            messagebox.showerror("错误", f"未在 models 目录找到可用模型，请检查 {models_dir}")
+        # 自动选择可用模型
+        if find_model()[0] is None:
+            messagebox.showerror("错误", f"未在 models 目录找到可用模型，请检查 {REALESRGAN_EXE.parent / 'models'}")
             return
 
-        # 运行尺度为模型本身的倍数；若与目标不同，事后再缩放
-        run_scale = chosen_scale
-        post_ratio = target_scale / run_scale if run_scale != target_scale else 1.0
-
-        # 组装命令（GPU 0 / 输出 png / tile 自动）
-        cmd = [
-            str(REALESRGAN_EXE),
-            "-i", self.sr_input_path.get(),
-            "-o", self.sr_output_path.get(),
-            "-s", str(run_scale),
-            "-n", chosen_name,
-            "-g", "0",
-            "-f", "png",
-            "-t", "0",
-        ]
-
-        # 禁用按钮，显示状态
-        self.sr_button.config(state=tk.DISABLED, text="超分处理中...")
-        self.status_label.config(text="正在进行 AI 超分，请稍候...")
-        self.root.update()
-
-        import threading
+        input_path = self.sr_input_path.get()
+        output_path = self.sr_output_path.get()
 
-        def worker():
-            try:
-                # 在 Real-ESRGAN 可执行文件所在目录下运行，保证能正确找到 models 文件夹
-                result = subprocess.run(
-                    cmd,
-                    cwd=str(REALESRGAN_EXE.parent),
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                    text=True,
-                    encoding="utf-8",
-                    errors="ignore"
-                )
-
-                def on_finish():
-                    if result.returncode != 0:
-                        message = result.stderr or result.stdout or "未知错误"
-                        messagebox.showerror(
-                            "错误",
-                            f"AI 超分执行失败。\n\n命令：\n{' '.join(cmd)}\n\n错误信息：\n{message}"
-                        )
-                        self.status_label.config(text="AI 超分失败")
-                        self.sr_button.config(state=tk.NORMAL, text="开始 AI 超分")
-                        return
-
-                    # 如模型尺度与目标尺度不同，事后再缩放到目标尺寸
-                    if post_ratio != 1.0:
-                        try:
-                            img = Image.open(self.sr_output_path.get())
-                            new_w = int(img.width * post_ratio)
-                            new_h = int(img.height * post_ratio)
-                            if new_w > 0 and new_h > 0:
-                                img = img.resize((new_w, new_h), Image.LANCZOS)
-                                img.save(self.sr_output_path.get())
-                        except Exception as e:
-                            messagebox.showwarning("提示", f"超分成功，但后处理缩放失败：{e}")
-
-                    messagebox.showinfo("成功", f"AI 超分完成！\n输出文件：{self.sr_output_path.get()}")
-                    self.status_label.config(text="AI 超分完成！")
-                    self.sr_button.config(state=tk.NORMAL, text="开始 AI 超分")
-
-                # 回到主线程更新 UI
-                self.root.after(0, on_finish)
+        def work(progress, cancel_event):
+            from pixel_art_governor import GOVERNOR, plan_file
+            # 模型尺度与目标尺度不同时，super_resolve_file 会事后缩放到目标尺寸
+            with GOVERNOR.admit(plan_file('super_res', input_path, {'scale': target_scale})):
+                super_resolve_file(input_path, output_path, target_scale,
+                                   progress=progress, cancel_event=cancel_event)
 
-            except Exception as e:
-                def on_error():
-                    messagebox.showerror("错误", f"AI 超分执行异常：\n{str(e)}")
-                    self.status_label.config(text="AI 超分失败")
-                    self.sr_button.config(state=tk.NORMAL, text="开始 AI 超分")
+        def on_success(_):
+            self.status_label.config(text="AI 超分完成！")
+            messagebox.showinfo("成功", f"AI 超分完成！\n输出文件：{output_path}")
 
-                self.root.after(0, on_error)
+        def on_failure(e):
+            self.status_label.config(text="AI 超分失败")
+            if isinstance(e, SuperResError):
+                messagebox.showerror("错误", str(e))
+            else:
+                messagebox.showerror("错误", f"AI 超分执行异常：\n{str(e)}")
 
-        threading.Thread(target=worker, daemon=True).start()
+        self.start_task(self.sr_button, "超分处理中...", "正在进行 AI 超分", work, on_success, on_failure)
     
     def enhance_image(self):
         # 验证输入
@@ -759,33 +1074,207 @@ class PixelArtConverterGUI:
         except ValueError:
             messagebox.showerror("错误", "放大倍数必须是数字！")
             return
-        
-        # 禁用按钮，显示处理中
-        self.enhance_button.config(state=tk.DISABLED, text="处理中...")
-        self.status_label.config(text="正在增强画质，请稍候...")
-        self.root.update()
-        
-        try:
-            # 执行增强
-            enhance_image_quality(
-                input_path=self.enhance_input_path.get(),
-                output_path=self.enhance_output_path.get(),
-                sharpness=sharpness,
-                contrast=contrast,
-                saturation=saturation,
-                denoise=self.denoise.get(),
-                upscale_factor=upscale_factor,
-            )
-            
-            messagebox.showinfo("成功", f"画质增强完成！\n输出文件：{self.enhance_output_path.get()}")
+
+        input_path = self.enhance_input_path.get()
+        output_path = self.enhance_output_path.get()
+        denoise = self.denoise_map[self.denoise_display.get()]
+        denoise_luma = self.denoise_luma.get()
+        sharpen_mode = 'luma' if self.enhance_sharpen_luma.get() else 'rgb'
+        keep_metadata = self.enhance_keep_metadata.get()
+        params = dict(sharpness=sharpness, contrast=contrast, saturation=saturation,
+                      denoise=denoise, upscale_factor=upscale_factor, denoise_luma=denoise_luma,
+                      sharpen_mode=sharpen_mode)
+
+        def work(progress, cancel_event):
+            from pixel_art_converter import Image, apply_quality_enhance, save_image
+            from pixel_art_governor import run_governed
+            from pixel_art_ingest import output_metadata
+            with Image.open(input_path) as img:
+                metadata = output_metadata(img, keep_metadata)
+                result = run_governed('enhance', img, apply_quality_enhance, params,
+                                      progress=progress, cancel_event=cancel_event)
+            # 保存结果（使用高质量保存）
+            save_image(result, output_path, metadata)
+
+        def on_success(_):
             self.status_label.config(text="画质增强完成！")
-            
-        except Exception as e:
-            messagebox.showerror("错误", f"增强失败：\n{str(e)}")
+            messagebox.showinfo("成功", f"画质增强完成！\n输出文件：{output_path}")
+
+        def on_failure(e):
             self.status_label.config(text="增强失败")
-        finally:
-            # 恢复按钮
-            self.enhance_button.config(state=tk.NORMAL, text="开始增强")
+            messagebox.showerror("错误", f"增强失败：\n{str(e)}")
+
+        job = {"input": input_path, "steps": [dict(params, op="enhance", output=output_path)]}
+        work, on_success = self.profiled(work, on_success, job, output_path)
+        self.start_task(self.enhance_button, "处理中...", "正在增强画质", work, on_success, on_failure)
+
+    def select_job_input_file(self):
+        filename = filedialog.askopenfilename(
+            title="选择输入图片",
+            filetypes=[
+                ("图片文件", "*.jpg *.jpeg *.png *.bmp *.gif"),
+                ("所有文件", "*.*")
+            ]
+        )
+        if filename:
+            self.job_input_path.set(filename)
+            if not self.job_output_path.get():
+                input_path = Path(filename)
+                output_path = input_path.parent / f"{input_path.stem}_job.png"
+                self.job_output_path.set(str(output_path))
+
+    def select_job_output_file(self):
+        filename = filedialog.asksaveasfilename(
+            title="选择输出图片",
+            defaultextension=".png",
+            filetypes=[
+                ("PNG文件", "*.png"),
+                ("JPEG文件", "*.jpg"),
+                ("所有文件", "*.*")
+            ]
+        )
+        if filename:
+            self.job_output_path.set(filename)
+
+    def get_job_steps(self):
+        """解析步骤文本框中的 JSON 列表"""
+        import json
+        text = self.job_steps_text.get("1.0", tk.END).strip() or "[]"
+        steps = json.loads(text)
+        if not isinstance(steps, list):
+            raise ValueError("步骤必须是 JSON 列表")
+        return steps
+
+    def set_job_steps(self, steps):
+        import json
+        self.job_steps_text.delete("1.0", tk.END)
+        self.job_steps_text.insert("1.0", json.dumps(steps, ensure_ascii=False, indent=2))
+
+    def add_job_step(self, op):
+        """按其他标签页的当前参数追加一个步骤"""
+        try:
+            steps = self.get_job_steps()
+            if op == 'super_res':
+                step = {"op": op, "scale": float(self.sr_scale.get())}
+            elif op == 'enhance':
+                upscale_factor = None
+                if self.upscale_factor.get().strip():
+                    upscale_factor = float(self.upscale_factor.get())
+                step = {
+                    "op": op,
+                    "sharpness": round(self.sharpness.get(), 2),
+                    "contrast": round(self.contrast.get(), 2),
+                    "saturation": round(self.saturation.get(), 2),
+                    "denoise": self.denoise_map[self.denoise_display.get()],
+                    "denoise_luma": self.denoise_luma.get(),
+                    "sharpen_mode": 'luma' if self.enhance_sharpen_luma.get() else 'rgb',
+                    "upscale_factor": upscale_factor,
+                }
+            else:
+                scale_factor = None
+                if self.scale_factor.get().strip():
+                    scale_factor = float(self.scale_factor.get())
+                step = {
+                    "op": op,
+                    "pixel_size": self.pixel_size.get(),
+                    "scale_factor": scale_factor,
+                    "color_reduction": self.color_reduction.get(),
+                    "preserve_aspect": self.preserve_aspect.get(),
+                    "enhance_mode": self.enhance_mode.get(),
+                    "interpolation": self.interpolation_map.get(self.interpolation_display.get(), "bicubic"),
+                    "dither": self.dither_map.get(self.dither_display.get()),
+                    "quantize_space": self.quantize_space_map.get(self.quantize_space_display.get(), "rgb"),
+                    "sharpen_mode": 'luma' if self.sharpen_luma.get() else 'rgb',
+                }
+        except ValueError as e:
+            messagebox.showerror("错误", f"无法添加步骤：\n{e}")
+            return
+        step = {"id": f"{op}_{len(steps) + 1}", **step}
+        steps.append(step)
+        self.set_job_steps(steps)
+
+    def clear_job_steps(self):
+        self.set_job_steps([])
+
+    def load_job_file(self):
+        filename = filedialog.askopenfilename(
+            title="载入任务",
+            filetypes=[
+                ("任务文件", "*.json *.toml"),
+                ("所有文件", "*.*")
+            ]
+        )
+        if not filename:
+            return
+        from pixel_art_pipeline import JobError, load_job
+        try:
+            job = load_job(filename)
+        except (OSError, ValueError, JobError) as e:
+            messagebox.showerror("错误", f"载入任务失败：\n{e}")
+            return
+        if job.get('input'):
+            self.job_input_path.set(job['input'])
+        self.set_job_steps(job.get('steps', []))
+
+    def save_job_file(self):
+        filename = filedialog.asksaveasfilename(
+            title="保存任务",
+            defaultextension=".json",
+            filetypes=[("JSON文件", "*.json")]
+        )
+        if not filename:
+            return
+        from pixel_art_pipeline import save_job
+        try:
+            job = self.build_job()
+            save_job(job, filename)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("错误", f"保存任务失败：\n{e}")
+            return
+        self.status_label.config(text=f"任务已保存：{filename}")
+
+    def build_job(self):
+        """由界面内容组装任务描述；输出路径写入最后一个未指定输出的步骤"""
+        steps = self.get_job_steps()
+        if steps and self.job_output_path.get() and not steps[-1].get('output'):
+            steps[-1] = dict(steps[-1], output=self.job_output_path.get())
+        return {"input": self.job_input_path.get(), "steps": steps}
+
+    def run_job(self):
+        """执行任务流水线（在后台线程中执行，可取消）"""
+        if not self.job_input_path.get():
+            messagebox.showerror("错误", "请选择输入图片！")
+            return
+        if not os.path.exists(self.job_input_path.get()):
+            messagebox.showerror("错误", "输入文件不存在！")
+            return
+
+        from pixel_art_pipeline import JobError, plan_job, run_job
+        try:
+            job = self.build_job()
+            plan_job(job)
+        except (ValueError, JobError) as e:
+            messagebox.showerror("错误", f"任务无效：\n{e}")
+            return
+        if not any(step.get('output') for step in job['steps']):
+            messagebox.showerror("错误", "请选择输出路径！")
+            return
+
+        def work(progress, cancel_event):
+            run_job(job, progress=progress, cancel_event=cancel_event)
+
+        def on_success(_):
+            outputs = "\n".join(step['output'] for step in job['steps'] if step.get('output'))
+            self.status_label.config(text="流水线完成！")
+            messagebox.showinfo("成功", f"流水线完成！\n输出文件：\n{outputs}")
+
+        def on_failure(e):
+            self.status_label.config(text="流水线执行失败")
+            messagebox.showerror("错误", f"流水线执行失败：\n{e}")
+
+        output_path = next(step['output'] for step in job['steps'] if step.get('output'))
+        work, on_success = self.profiled(work, on_success, job, output_path)
+        self.start_task(self.job_button, "处理中...", "正在运行流水线", work, on_success, on_failure)
 
 
 def main():
@@ -0,0 +1,235 @@
+"""
+图片读入：EXIF 方向、ICC 色彩配置与元数据
+手机照片通常按传感器方向存储，再用 EXIF 方向标记说明如何旋转；
+广色域照片（Display P3、Adobe RGB 等）嵌入 ICC 配置文件。原先这两者都被忽略，
+输出会横躺或颜色发灰。
+
+这里只读文件头，不做整图旋转：处理函数按校正后的方向计算尺寸，在原始方向上缩小，
+等图像变小之后（像素画的网格、画质增强放大之前）再转置和转换色彩：
+
+- 方向：EXIF 方向 1-8 对应的转置（与 ImageOps.exif_transpose 相同）。
+        在原始方向上缩小时用 Ingest.resize / Ingest.mirror 按校正后的方向取样，
+        结果与先转置整图再处理逐位一致
+- 色彩：ICC 配置文件 -> sRGB 的转换按配置文件内容缓存（需要 Pillow 的 ImageCms / LittleCMS），
+        已是 sRGB 或无法解析时不转换
+- 元数据：可选地把 EXIF（方向重置为 1）、ICC 配置文件和 DPI 写入输出
+
+用法:
+    from pixel_art_ingest import Ingest
+    source = Ingest(img)
+    small = source.finish(small_rgb_image)
+    result.save(path, **source.save_params())   # 或 output_metadata(img, keep_metadata)
+"""
+
+import io
+from functools import lru_cache
+
+from PIL import Image
+
+
+# ==================== 配置 ====================
+# 缓存的 ICC -> sRGB 转换个数（按配置文件内容区分）
+ICC_CACHE_SIZE = 16
+
+# 色彩转换意图：0 感知（默认），1 相对色度，2 饱和度，3 绝对色度
+RENDERING_INTENT = 0
+# ================================================
+
+ORIENTATION_TAG = 0x0112
+
+# 不保留元数据时 save 的参数：处理中的图像沿用输入的 info，PNG / TIFF 保存时会自动写入其中的
+# ICC 配置文件（可能与已转换的像素不符），这里显式置空，输出按 sRGB 解释
+NO_METADATA = {'icc_profile': None}
+
+# 支持 ICC 色彩转换的输入模式（调色板等其他模式按 sRGB 处理）
+CMS_MODES = ('RGB', 'RGBA', 'CMYK', 'L')
+
+# EXIF 方向 -> 转置方式（与 ImageOps.exif_transpose 相同）
+TRANSPOSES = {
+    2: Image.Transpose.FLIP_LEFT_RIGHT,
+    3: Image.Transpose.ROTATE_180,
+    4: Image.Transpose.FLIP_TOP_BOTTOM,
+    5: Image.Transpose.TRANSPOSE,
+    6: Image.Transpose.ROTATE_270,
+    7: Image.Transpose.TRANSVERSE,
+    8: Image.Transpose.ROTATE_90,
+}
+
+# EXIF 方向 -> 原始方向上的 (宽, 高) 两个轴在校正后是否反向
+STORED_FLIPS = {
+    1: (False, False),
+    2: (True, False),
+    3: (True, True),
+    4: (False, True),
+    5: (False, False),
+    6: (False, True),
+    7: (True, True),
+    8: (True, False),
+}
+
+
+@lru_cache(maxsize=None)
+def _srgb_profile():
+    from PIL import ImageCms
+    return ImageCms.createProfile('sRGB')
+
+
+@lru_cache(maxsize=ICC_CACHE_SIZE)
+def srgb_transform(icc_profile, mode):
+    """
+    ICC 配置文件 -> sRGB 的转换（按配置文件内容和输入模式缓存）
+
+    返回:
+        ImageCms 转换对象；配置文件已是 sRGB、无法解析或 ImageCms 不可用时为 None
+    """
+    try:
+        from PIL import ImageCms
+    except ImportError:
+        print("提示: 当前 Pillow 不支持 ImageCms，跳过 ICC 色彩转换")
+        return None
+    try:
+        profile = ImageCms.ImageCmsProfile(io.BytesIO(icc_profile))
+        if 'srgb' in ImageCms.getProfileDescription(profile).lower():
+            return None
+        return ImageCms.buildTransform(profile, _srgb_profile(), mode, 'RGB', RENDERING_INTENT)
+    except (ImageCms.PyCMSError, OSError, ValueError) as e:
+        print(f"警告: 无法使用嵌入的 ICC 配置文件，按 sRGB 处理（{e}）")
+        return None
+
+
+class Ingest:
+    """
+    一张输入图片的方向与色彩信息（只读文件头，不解码）
+
+    属性:
+        orientation: 要应用的 EXIF 方向（1 表示不需要转置）
+        transform: ICC -> sRGB 转换，不需要时为 None
+        size: 校正方向后的 (宽, 高)
+    """
+
+    def __init__(self, img, enabled=True):
+        # 基类的 getexif 只读已解析的文件头信息；PNG 的实现会为了找图像数据之后的 eXIf 块先解码整张图
+        exif = Image.Image.getexif(img)
+        orientation = exif.get(ORIENTATION_TAG, 1) if enabled else 1
+        self.orientation = orientation if orientation in TRANSPOSES else 1
+        self.icc_profile = img.info.get('icc_profile')
+        self.mode = img.mode
+        managed = enabled and self.icc_profile and img.mode in CMS_MODES
+        self.transform = srgb_transform(self.icc_profile, img.mode) if managed else None
+        self.exif = img.info.get('exif')
+        self.dpi = img.info.get('dpi')
+        self.size = self.stored_size(img.size)
+
+    @property
+    def swapped(self):
+        """转置后宽高是否互换（方向 5-8）"""
+        return self.orientation >= 5
+
+    @property
+    def mirror(self):
+        """原始方向上的 (宽, 高) 两个轴在校正后是否反向（见 pixel_art_blocks.block_reduce）"""
+        return STORED_FLIPS[self.orientation]
+
+    def stored_size(self, size):
+        """校正方向后的尺寸 <-> 原始方向上的尺寸（两个方向的换算相同）"""
+        return (size[1], size[0]) if self.swapped else tuple(size)
+
+    def resize(self, img, size, resample):
+        """
+        在原始方向上缩放到 size（原始方向上的尺寸），结果与先校正方向、再缩放逐位一致
+
+        Pillow 先缩放宽度、再缩放高度，两趟之间取整：宽高互换时改为先缩放原始方向的高度。
+        最近邻的取样位置不对称，反向的轴按镜像位置取样；卷积滤波器（INTERPOLATION_MAP 中的）
+        左右对称，不受反向影响。
+        """
+        from pixel_art_engine import nearest_index, resize
+
+        size = tuple(size)
+        if self.orientation == 1 or img.size == size:
+            return resize(img, size, resample)
+        if resample == Image.NEAREST:
+            import numpy as np
+
+            def index(n_in, n_out, flip):
+                idx = nearest_index(n_in, n_out)
+                return (n_in - 1 - idx)[::-1] if flip else idx
+
+            flip_x, flip_y = self.mirror
+            a = np.asarray(img)
+            a = a[index(img.height, size[1], flip_y)][:, index(img.width, size[0], flip_x)]
+            return Image.fromarray(a)
+        if self.swapped and img.height != size[1]:
+            img = resize(img, (img.width, size[1]), resample)
+        return resize(img, size, resample)
+
+    def to_rgb(self, img):
+        """
+        转换为 RGB
+
+        非 RGB 图像（CMYK、灰度等）带有 ICC 配置文件时，在这里直接转换到 sRGB
+        （之后 finish 只做转置）；RGB 图像的色彩转换留给 finish 在缩小后进行。
+        """
+        if img.mode == 'RGB':
+            return img
+        if self.transform is not None and img.mode == self.mode:
+            from PIL import ImageCms
+            return ImageCms.applyTransform(img, self.transform)
+        return img.convert('RGB')
+
+    def finish(self, img, owned=False):
+        """
+        对（已缩小的）RGB 图像校正方向并转换到 sRGB
+
+        owned 为 True 表示 img 由调用方独占，色彩转换可以原地进行，不再复制一份。
+        """
+        if self.orientation != 1:
+            img = img.transpose(TRANSPOSES[self.orientation])
+            owned = True
+        if self.transform is not None and self.mode == 'RGB':
+            from PIL import ImageCms
+            if owned:
+                ImageCms.applyTransform(img, self.transform, inPlace=True)
+            else:
+                img = ImageCms.applyTransform(img, self.transform)
+        return img
+
+    def save_params(self):
+        """
+        把元数据写入输出时 save 的参数
+
+        EXIF 的方向已应用时重置为 1；像素已转换到 sRGB 时写入 sRGB 配置文件，否则写入原配置文件。
+        """
+        params = {}
+        if self.exif:
+            exif = Image.Exif()
+            exif.load(self.exif)
+            if self.orientation != 1:
+                exif[ORIENTATION_TAG] = 1
+            params['exif'] = exif.tobytes()
+        if self.transform is not None:
+            from PIL import ImageCms
+            params['icc_profile'] = ImageCms.ImageCmsProfile(_srgb_profile()).tobytes()
+        elif self.icc_profile:
+            params['icc_profile'] = self.icc_profile
+        if self.dpi:
+            params['dpi'] = self.dpi
+        return params
+
+
+def output_metadata(img, keep_metadata):
+    """写入输出时 save 的参数：keep_metadata 为 True 时见 Ingest.save_params，否则为 NO_METADATA"""
+    return Ingest(img).save_params() if keep_metadata else dict(NO_METADATA)
+
+
+def load_image(path):
+    """
+    完整读入一张图片并校正方向、转换到 sRGB，用于预览等需要全尺寸原图的场合
+
+    没有色彩转换时保持原模式（透明通道等不受影响）。
+    """
+    img = Image.open(path)
+    img.load()
+    source = Ingest(img)
+    if source.transform is not None:
+        img = source.to_rgb(img)
+    return source.finish(img, owned=True)
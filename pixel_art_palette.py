@@ -0,0 +1,347 @@
+"""
+固定调色板与颜色查找表
+同一套调色板（主机调色板、团队统一色板等）要应用到成千上万张素材时，
+逐像素搜索最近颜色的开销会重复支付。这里预先算好 “量化 RGB -> 调色板下标” 的查找表：
+
+- 查找表按每通道 bits 位量化（6 位即 64³ 格），每格记录格中心的最近颜色
+- 同时记录每格的候选颜色（格内某点可能的最近颜色）；只有一个候选的格直接查表，
+  其余像素只在少数候选中精确比较，结果与逐像素搜索最近颜色完全一致
+- 查找表按调色板内容哈希缓存到磁盘，之后的进程直接加载
+- 整张图的映射就是一次 NumPy 花式索引
+- 最近颜色可以在 RGB、OKLab 或 CIELAB 中计算（见 pixel_art_colorspace）；
+  Palette.fit 在感知色彩空间中用 k-means 从图像求调色板，代替 RGB 中值切割
+
+支持的调色板文件：GIMP .gpl、.hex（每行 RRGGBB）、Paint.NET .txt（每行 AARRGGBB）、
+以及任意图片（P 模式取调色板，其余取图中出现的颜色，最多 256 种）。
+"""
+
+import hashlib
+import os
+from functools import lru_cache
+
+import numpy as np
+
+from PIL import Image
+
+from pixel_art_colorspace import COLOR_SPACES, from_space, to_space
+
+
+# 默认查找表精度（每通道位数）：5 -> 32³ 格，6 -> 64³ 格
+# 6 位的表首次计算稍慢，但需要精确比较的像素少得多，映射整图更快
+LUT_BITS = 6
+
+# 计算查找表时每批处理的格数（控制临时内存）
+_CHUNK = 1 << 14
+
+# Palette.fit 拟合调色板时最多使用的像素数
+FIT_SAMPLE = 8192
+
+
+def _parse_hex(text):
+    value = text.strip().lstrip('#')
+    if len(value) == 8:  # AARRGGBB
+        value = value[2:]
+    if len(value) != 6:
+        raise ValueError(f"无法解析的颜色值 '{text.strip()}'")
+    return tuple(int(value[i:i + 2], 16) for i in (0, 2, 4))
+
+
+def _read_gpl(path):
+    colors = []
+    with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#') or line.startswith('GIMP Palette') \
+                    or line.split(':')[0] in ('Name', 'Columns'):
+                continue
+            parts = line.split()
+            colors.append(tuple(int(v) for v in parts[:3]))
+    return colors
+
+
+def _read_hex(path):
+    colors = []
+    with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+        for line in f:
+            line = line.split(';')[0].strip()
+            if line:
+                colors.append(_parse_hex(line))
+    return colors
+
+
+def _read_image(path):
+    with Image.open(path) as img:
+        if img.mode == 'P':
+            flat = img.getpalette()
+            used = sorted(index for _, index in img.getcolors(256))
+            return [tuple(flat[i * 3:i * 3 + 3]) for i in used]
+        counts = img.convert('RGB').getcolors(256)
+    if counts is None:
+        raise ValueError(f"调色板图片颜色超过 256 种: {path}")
+    return [color for _, color in sorted(counts, key=lambda c: -c[0])]
+
+
+def _kmeans_pp(points, count, seed=0):
+    """k-means++ 初始化：返回 (<=count, 3) 的初始中心（不同颜色少于 count 时相应减少）"""
+    rng = np.random.default_rng(seed)
+    n = len(points)
+    chosen = [int(rng.integers(n))]
+    diff = points - points[chosen[0]]
+    nearest = np.einsum('ij,ij->i', diff, diff)
+    draws = rng.random(count)
+    for i in range(1, count):
+        # 按到已选中心距离的平方为概率选下一个中心
+        cum = np.cumsum(nearest)
+        if cum[-1] <= 0:
+            break
+        pick = min(int(np.searchsorted(cum, draws[i] * cum[-1])), n - 1)
+        chosen.append(pick)
+        diff = points - points[pick]
+        np.minimum(nearest, np.einsum('ij,ij->i', diff, diff), out=nearest)
+    return points[chosen].copy()
+
+
+def _kmeans(points, count, iterations=8, seed=0, init=None):
+    """
+    k-means，分配不再变化或达到迭代次数即停止
+
+    points: (n, 3) float32；init 为初始中心（None 则用 k-means++ 选取）。
+    返回 (<=count, 3) 的聚类中心；给出 init 时中心的个数和顺序与 init 相同，
+    没有分到像素的中心保持不动
+    """
+    if init is None:
+        centers = _kmeans_pp(points, count, seed)
+    else:
+        centers = np.array(init, dtype=np.float32)
+
+    labels = None
+    for _ in range(iterations):
+        # |x - c|² 去掉与 c 无关的 |x|² 项：-2x·c + |c|²，一次矩阵乘法求出
+        d = points @ (-2 * centers.T)
+        d += np.einsum('ij,ij->i', centers, centers)
+        new_labels = np.argmin(d, axis=1)
+        if labels is not None and np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+        counts = np.bincount(labels, minlength=len(centers))
+        filled = counts > 0
+        sums = np.stack([np.bincount(labels, points[:, c], minlength=len(centers))
+                         for c in range(3)], axis=-1)
+        centers[filled] = sums[filled] / counts[filled, None]
+    return centers
+
+
+def fit_centers(img, count, space='oklab', init=None, sample=FIT_SAMPLE, iterations=8, seed=0):
+    """
+    对图像做 k-means 聚类，返回 space 中的聚类中心（float32，(<=count, 3)）
+
+    init 为上一次的中心时从它们出发迭代（热启动），中心的顺序保持不变，
+    便于在连续帧之间逐个平滑调色板颜色（见 pixel_art_sequence）。
+    """
+    a = np.asarray(img.convert('RGB')).reshape(-1, 3)
+    if len(a) > sample:
+        a = a[np.random.default_rng(seed).choice(len(a), sample, replace=False)]
+    return _kmeans(to_space(a, space), count, iterations, seed, init)
+
+
+class Palette:
+    """
+    固定调色板
+
+    参数:
+        colors: 颜色列表 [(r, g, b), ...]，最多 256 种，重复项会被去掉
+        name: 调色板名称（用于显示）
+        space: 求最近颜色时使用的色彩空间（'rgb' / 'oklab' / 'lab'）
+        cache: 是否把查找表缓存到磁盘（临时求出的调色板不缓存）
+    """
+
+    def __init__(self, colors, name=None, space='rgb', cache=True):
+        unique = list(dict.fromkeys(tuple(int(v) for v in c[:3]) for c in colors))
+        if not unique:
+            raise ValueError("调色板为空")
+        if len(unique) > 256:
+            raise ValueError(f"调色板最多 256 种颜色，当前 {len(unique)} 种")
+        if space not in COLOR_SPACES:
+            raise ValueError(f"未知的色彩空间 '{space}'，可选: {', '.join(COLOR_SPACES)}")
+        self.colors = np.array(unique, dtype=np.uint8)
+        self.name = name or f"{len(unique)} 色"
+        self.space = space
+        self.cache = cache
+        # 调色板颜色在 space 中的坐标
+        self.points = to_space(self.colors, space)
+        self.key = hashlib.sha1(self.colors.tobytes() + space.encode()).hexdigest()[:16]
+        self._luts = {}
+
+    def __len__(self):
+        return len(self.colors)
+
+    def __repr__(self):
+        return f"Palette({self.name!r}, {len(self)} colors, {self.space})"
+
+    @classmethod
+    def from_file(cls, path, space='rgb'):
+        """从 .gpl / .hex / .txt / 图片文件读取调色板"""
+        ext = os.path.splitext(path)[1].lower()
+        if ext == '.gpl':
+            colors = _read_gpl(path)
+        elif ext in ('.hex', '.txt'):
+            colors = _read_hex(path)
+        else:
+            colors = _read_image(path)
+        return cls(colors, name=os.path.basename(path), space=space)
+
+    @classmethod
+    def fit(cls, img, count, space='oklab', sample=FIT_SAMPLE, iterations=8, seed=0):
+        """
+        在 space 色彩空间中对图像做 k-means 聚类，求 count 色的调色板
+
+        像素多于 sample 时只用随机抽取的 sample 个像素拟合；固定 seed 保证结果可复现。
+        """
+        centers = fit_centers(img, count, space, sample=sample, iterations=iterations, seed=seed)
+        return cls(from_space(centers, space), name=f"{space} {count} 色", space=space,
+                   cache=False)
+
+    def to_image(self):
+        """Pillow 的 P 模式调色板图（用于 quantize(palette=...)）"""
+        from pixel_art_dither import palette_image
+        return palette_image(self.colors)
+
+    # ---------- 查找表 ----------
+
+    def _nearest(self, values, cand=None):
+        """
+        values (m, 3)（已在 space 中）-> 最近调色板下标
+
+        cand (m, K) 给出时只在每行的候选中比较；逐通道累加，避免 (m, K, 3) 的临时数组。
+        """
+        out = np.empty(len(values), dtype=np.uint8)
+        step = _CHUNK * 4
+        for start in range(0, len(values), step):
+            v = values[start:start + step]
+            c = np.arange(len(self))[None, :] if cand is None else cand[start:start + step]
+            d = 0
+            for ch in range(3):
+                diff = self.points[c, ch] - v[:, ch, None]
+                d = d + diff * diff
+            best = np.argmin(d, axis=1)
+            out[start:start + step] = best if cand is None else c[np.arange(len(c)), best]
+        return out
+
+    def _build_lut(self, bits):
+        """
+        计算查找表
+
+        每格记录格中心的最近颜色，以及格内任一点可能的最近颜色（候选）：
+        格内点到格中心的距离不超过半径 r，因此只有与中心距离不超过 “最近距离 + 2r”
+        的颜色才可能成为格内某点的最近颜色。RGB 中 r 为半对角线；
+        OKLab / CIELAB 中 r 取格的 8 个角到中心的最大距离并留出余量（格很小，映射近似线性）。
+        """
+        side = 1 << bits
+        step = 256 // side
+        half = (step - 1) / 2
+        centers_1d = np.arange(side, dtype=np.float32) * step + half
+        grid = np.stack(np.meshgrid(centers_1d, centers_1d, centers_1d, indexing='ij'), -1)
+        centers_rgb = grid.reshape(-1, 3)
+        corners = np.array([(i, j, k) for i in (-1, 1) for j in (-1, 1) for k in (-1, 1)],
+                           dtype=np.float32) * half
+
+        lut = np.empty(len(centers_rgb), dtype=np.uint8)
+        chunks = []
+        for start in range(0, len(centers_rgb), _CHUNK):
+            chunk_rgb = centers_rgb[start:start + _CHUNK]
+            chunk = to_space(chunk_rgb, self.space)
+            if self.space == 'rgb':
+                radius = half * np.sqrt(3)
+            else:
+                spread = to_space(chunk_rgb[:, None, :] + corners[None], self.space) - chunk[:, None, :]
+                radius = np.sqrt((spread ** 2).sum(-1)).max(axis=1, keepdims=True) * 1.25
+            d = np.sqrt(((chunk[:, None, :] - self.points[None, :, :]) ** 2).sum(-1))
+            lut[start:start + _CHUNK] = np.argmin(d, axis=1)
+            mask = d <= d.min(axis=1, keepdims=True) + 2 * radius + 1e-3
+            # 候选按下标升序排在前面（稳定排序），不足处用该行第一个候选补齐
+            order = np.argsort(~mask, axis=1, kind='stable')[:, :int(mask.sum(axis=1).max())]
+            valid = np.take_along_axis(mask, order, axis=1)
+            chunks.append(np.where(valid, order, order[:, :1]))
+        width = max(c.shape[1] for c in chunks)
+        candidates = np.concatenate(
+            [np.pad(c, ((0, 0), (0, width - c.shape[1])), mode='edge') for c in chunks]
+        ).astype(np.uint8)
+        return lut, candidates
+
+    def lut(self, bits=LUT_BITS):
+        """
+        取得（必要时计算）查找表
+
+        返回:
+            (lut, candidates, ambiguous)，均按 (r >> s) << 2b | (g >> s) << b | (b >> s) 编址；
+            candidates 每行为该格的候选颜色下标，ambiguous 标记候选不止一个的格
+        """
+        if bits in self._luts:
+            return self._luts[bits]
+        from pixel_art_converter import CACHE_DIR
+
+        path = os.path.join(CACHE_DIR, f"palette_{self.key}_{bits}.npz")
+        try:
+            if not self.cache:
+                raise FileNotFoundError(path)
+            with np.load(path) as data:
+                lut, candidates = data['lut'], data['candidates']
+        except (OSError, KeyError, ValueError):
+            lut, candidates = self._build_lut(bits)
+            if self.cache:
+                try:
+                    os.makedirs(CACHE_DIR, exist_ok=True)
+                    np.savez_compressed(path, lut=lut, candidates=candidates)
+                except OSError:
+                    pass  # 缓存写不进去不影响结果
+        ambiguous = (candidates != candidates[:, :1]).any(axis=1)
+        self._luts[bits] = (lut, candidates, ambiguous)
+        return self._luts[bits]
+
+    def map_array(self, a, bits=LUT_BITS):
+        """
+        把 (h, w, 3) uint8 数组映射为调色板下标 (h, w)
+
+        结果与逐像素搜索 space 中的最近颜色一致（距离相同时取下标较小者）。
+        """
+        if not self.cache and bits not in self._luts and a.shape[0] * a.shape[1] < 1 << (3 * bits):
+            # 临时调色板且像素比查找表的格还少：直接逐像素比较更快
+            return self._nearest(to_space(a.reshape(-1, 3), self.space)).reshape(a.shape[:2])
+        lut, candidates, ambiguous = self.lut(bits)
+        shift = 8 - bits
+        q = (a >> shift).astype(np.int32)
+        cells = (q[..., 0] << (2 * bits)) | (q[..., 1] << bits) | q[..., 2]
+        index = lut[cells]
+        need_exact = ambiguous[cells]
+        if need_exact.any():
+            # 只在各自格子的少数候选颜色中精确比较
+            index[need_exact] = self._nearest(to_space(a[need_exact], self.space),
+                                              candidates[cells[need_exact]])
+        return index
+
+    def map(self, img, bits=LUT_BITS):
+        """把 RGB 图像映射为使用本调色板的 P 模式图像"""
+        index = self.map_array(np.asarray(img.convert('RGB')), bits)
+        out = Image.frombytes('P', img.size, index.astype(np.uint8).tobytes())
+        out.putpalette(self.to_image().getpalette())
+        return out
+
+    def apply(self, img, dither=None):
+        """映射到本调色板（可选抖动），返回 RGB 图像"""
+        if dither is None or dither == 'none':
+            return Image.fromarray(self.colors[self.map_array(np.asarray(img.convert('RGB')))])
+        from pixel_art_dither import dither_to_palette
+        return dither_to_palette(img, self.colors, dither, palette=self).convert('RGB')
+
+
+@lru_cache(maxsize=32)
+def _load_palette_cached(path, mtime_ns, space):
+    return Palette.from_file(path, space)
+
+
+def load_palette(palette, space='rgb'):
+    """Palette 对象原样返回；文件路径则读取（按路径、修改时间和色彩空间缓存）"""
+    if isinstance(palette, Palette):
+        return palette
+    path = os.path.abspath(palette)
+    return _load_palette_cached(path, os.stat(path).st_mtime_ns, space)
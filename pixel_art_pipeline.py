@@ -0,0 +1,264 @@
+"""
+多步骤任务图（流水线）
+在内存中串联 AI 超分、画质增强和像素画转换，中间结果不落盘
+
+任务描述（JSON 或 TOML）示例:
+
+    {
+        "input": "photo.jpg",
+        "steps": [
+            {"id": "sr",  "op": "super_res", "scale": 2},
+            {"id": "enh", "op": "enhance", "sharpness": 1.3},
+            {"id": "px",  "op": "pixelate", "pixel_size": 96, "color_reduction": 64,
+             "output": "photo_pixel.png"},
+            {"id": "px2", "op": "pixelate", "from": "enh", "pixel_size": 48,
+             "output": "photo_pixel_48.png"}
+        ]
+    }
+
+- "input" 为单个输入；也可用 "inputs": {"名称": "路径"} 声明多个输入
+- 每个步骤默认接在上一步之后；用 "from" 指定上游步骤 id 或输入名称即可分叉
+- 步骤中除 id / op / from / output 之外的键都作为该操作的参数
+- 互不依赖的分支会并行执行；图像在步骤间按引用传递，不做复制
+- run_job 可回报整体进度并响应取消（见 pixel_art_progress）
+- 每个步骤执行前估算内存（见 pixel_art_governor）：并行分支共享内存预算，
+  超出时排队或改为分块执行，单步超出预算则抛出 ResourceLimitError
+"""
+
+import inspect
+import json
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+
+from pixel_art_converter import Image, apply_pixel_art, apply_quality_enhance, save_image
+from pixel_art_governor import check_input_size, run_governed
+from pixel_art_progress import as_progress
+
+
+# 步骤类型 -> 处理函数（第一个参数为输入图像，其余为关键字参数，
+# 另外都接受 progress / cancel_event，由 run_job 传入）
+def _super_res(img, scale=2, progress=None, cancel_event=None):
+    from pixel_art_superres import super_resolve_image
+    return super_resolve_image(img, target_scale=float(scale), progress=progress,
+                               cancel_event=cancel_event)
+
+
+STEP_OPS = {
+    'super_res': _super_res,
+    'enhance': apply_quality_enhance,
+    'pixelate': apply_pixel_art,
+}
+
+# 步骤中的保留键（其余键为操作参数）
+_RESERVED_KEYS = ('id', 'op', 'from', 'output')
+
+# 由 run_job 传入、不能写在任务描述里的参数
+_RUNTIME_PARAMS = ('progress', 'cancel_event')
+
+# 单个输入时使用的默认名称
+DEFAULT_INPUT = 'input'
+
+
+class JobError(ValueError):
+    """任务描述不合法"""
+
+
+class _InlineExecutor:
+    """在调用线程中依次执行的“线程池”（max_workers=0，性能分析时使用）"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def submit(self, fn, *args):
+        future = Future()
+        try:
+            future.set_result(fn(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+
+def load_job(path):
+    """读取 JSON 或 TOML 格式的任务描述文件"""
+    if path.lower().endswith('.toml'):
+        try:
+            import tomllib  # Python 3.11+
+        except ImportError:
+            try:
+                import tomli as tomllib  # type: ignore[import]
+            except ImportError:
+                raise JobError("读取 TOML 需要 Python 3.11+ 或安装 tomli：pip install tomli")
+        with open(path, 'rb') as f:
+            job = tomllib.load(f)
+    else:
+        with open(path, 'r', encoding='utf-8') as f:
+            job = json.load(f)
+
+    # 相对路径以任务文件所在目录为基准
+    base_dir = os.path.dirname(os.path.abspath(path))
+    return resolve_paths(job, base_dir)
+
+
+def resolve_paths(job, base_dir):
+    """把任务中的相对输入/输出路径解析为相对 base_dir 的路径"""
+    def fix(p):
+        return p if os.path.isabs(p) else os.path.join(base_dir, p)
+
+    job = dict(job)
+    if 'input' in job:
+        job['input'] = fix(job['input'])
+    if 'inputs' in job:
+        job['inputs'] = {name: fix(p) for name, p in job['inputs'].items()}
+    job['steps'] = [
+        dict(step, output=fix(step['output'])) if step.get('output') else dict(step)
+        for step in job.get('steps', [])
+    ]
+    return job
+
+
+def save_job(job, path):
+    """把任务描述保存为 JSON 文件"""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(job, f, ensure_ascii=False, indent=2)
+
+
+def plan_job(job):
+    """
+    校验任务描述并整理成执行计划
+
+    返回:
+        (inputs, steps)
+        inputs: {名称: 路径}
+        steps: [{'id', 'op', 'from', 'output', 'params'}, ...]，已按依赖顺序排列
+    """
+    inputs = dict(job.get('inputs') or {})
+    if job.get('input'):
+        inputs[DEFAULT_INPUT] = job['input']
+    if not inputs:
+        raise JobError("任务缺少输入：请设置 input 或 inputs")
+
+    raw_steps = job.get('steps') or []
+    if not raw_steps:
+        raise JobError("任务没有任何步骤")
+
+    steps = []
+    known = set(inputs)
+    previous = DEFAULT_INPUT if DEFAULT_INPUT in inputs else next(iter(inputs))
+    for index, raw in enumerate(raw_steps):
+        op = raw.get('op')
+        if op not in STEP_OPS:
+            raise JobError(f"第 {index + 1} 步的操作 '{op}' 无效，可选: {', '.join(STEP_OPS)}")
+        step_id = str(raw.get('id') or f"{op}_{index + 1}")
+        if step_id in known:
+            raise JobError(f"步骤 id '{step_id}' 重复")
+        source = raw.get('from', previous)
+        if source not in known:
+            raise JobError(f"步骤 '{step_id}' 的上游 '{source}' 不存在（只能引用前面的步骤或输入）")
+
+        params = {k: v for k, v in raw.items() if k not in _RESERVED_KEYS}
+        accepted = [name for name in list(inspect.signature(STEP_OPS[op]).parameters)[1:]
+                    if name not in _RUNTIME_PARAMS]
+        unknown = [k for k in params if k not in accepted]
+        if unknown:
+            raise JobError(
+                f"步骤 '{step_id}' 包含未知参数: {', '.join(unknown)}（可用: {', '.join(accepted)}）"
+            )
+
+        steps.append({
+            'id': step_id,
+            'op': op,
+            'from': source,
+            'output': raw.get('output'),
+            'params': params,
+        })
+        known.add(step_id)
+        previous = step_id
+    return inputs, steps
+
+
+def _load_input(path):
+    img = Image.open(path)
+    check_input_size(img.size)
+    # 立即解码：惰性加载的图像被多个线程同时读取并不安全
+    img.load()
+    return img
+
+
+def run_job(job, max_workers=None, progress=None, cancel_event=None):
+    """
+    执行任务图
+
+    参数:
+        job: 任务描述（dict），格式见模块说明
+        max_workers: 并行线程数（None 则由线程池决定；0 表示全部在调用线程中依次执行）
+        progress: 整体进度回调 progress(fraction, message)，各步骤等权，message 以步骤 id 开头
+        cancel_event: threading.Event，被 set 后正在执行的步骤尽快中止，
+                      尚未开始的步骤不再执行，抛出 ConversionCancelled
+
+    返回:
+        {步骤 id: 图像}，只包含末端步骤（没有下游的步骤）的结果
+    """
+    inputs, steps = plan_job(job)
+    task = as_progress(progress, cancel_event)
+    # 各步骤的完成比例；并行分支会同时更新，用锁保护
+    done_fraction = {step['id']: 0.0 for step in steps}
+    lock = threading.Lock()
+
+    def step_progress(step_id):
+        def report(fraction, message=None):
+            with lock:
+                done_fraction[step_id] = fraction
+                total = sum(done_fraction.values()) / len(done_fraction)
+            task(total, f"{step_id}: {message}" if message else None)
+        return report
+
+    children = {name: [] for name in inputs}
+    for step in steps:
+        children[step['id']] = []
+        children[step['from']].append(step)
+    leaves = {step['id'] for step in steps if not children[step['id']]}
+
+    def run_step(step, img):
+        task.check()
+        print(f"▶ 步骤 {step['id']} ({step['op']})")
+        report = step_progress(step['id']) if progress is not None else None
+        out = run_governed(step['op'], img, STEP_OPS[step['op']], step['params'],
+                           progress=report, cancel_event=cancel_event)
+        if step['output']:
+            if report is not None:
+                report(1.0, "保存")
+            save_image(out, step['output'])
+            print(f"✓ 步骤 {step['id']} 输出文件: {step['output']}")
+        return out
+
+    results = {}
+    executor = _InlineExecutor() if max_workers == 0 else ThreadPoolExecutor(max_workers=max_workers)
+    with executor:
+        running = {}
+        for name, path in inputs.items():
+            running[executor.submit(_load_input, path)] = name
+
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                node = running.pop(future)
+                # 出错时直接抛出，未开始的步骤不再提交
+                img = future.result()
+                # 同一图像对象直接交给所有下游（各操作都不会原地修改输入）；
+                # 中间结果不在这里保留，下游全部结束后即可被回收
+                for step in children[node]:
+                    running[executor.submit(run_step, step, img)] = step['id']
+                if node in leaves:
+                    results[node] = img
+
+    return {node: results[node] for node in leaves}
+
+
+def run_job_file(path, max_workers=None, progress=None, cancel_event=None):
+    """读取任务描述文件并执行"""
+    return run_job(load_job(path), max_workers=max_workers, progress=progress,
+                   cancel_event=cancel_event)
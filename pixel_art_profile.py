@@ -0,0 +1,259 @@
+"""
+性能分析：把一次转换（任务图）的耗时写成统计文件和火焰图
+某张图特别慢时（超大的调色板 PNG、CMYK TIFF 走 convert('RGB') 等），用这里看时间花在哪里。
+
+任务按 pixel_art_pipeline 的任务描述执行，所有步骤都在调用线程中依次运行，同时：
+
+- cProfile 统计每个函数的调用次数与耗时，写入 <名称>.prof
+  （python -m pstats / snakeviz 等工具可直接打开）
+- 采样线程每隔 SAMPLE_INTERVAL 秒记录一次调用栈，写入 <名称>.folded（折叠栈格式，
+  flamegraph.pl / speedscope / inferno 可直接生成火焰图）。每个栈的根为当时所处的处理阶段
+  （"[px: 缩小]" 等，取自进度回报的阶段说明），火焰图按阶段分开
+- 任务描述、引擎 / 内存预算设置与各阶段的起止时间写入 <名称>.json；
+  这个文件本身就是任务描述，可离线重放：python pixel_art_profile.py <名称>.json
+
+注意：采样只能看到 Python 调用栈，Pillow / NumPy 内部的耗时计在调用它的 Python 函数上；
+cProfile 对 Python 函数调用有额外开销，耗时以采样结果和阶段时间为准。
+
+用法:
+    python pixel_art_converter.py photo.jpg out.png --pixel-size 64 --profile profiles
+    python pixel_art_converter.py --job job.json --profile profiles
+    python pixel_art_profile.py profiles/photo-20260101-120000.json [--out DIR]
+"""
+
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+
+import pixel_art_engine
+import pixel_art_governor
+from pixel_art_pipeline import load_job, plan_job, run_job, save_job
+
+
+# ==================== 配置 ====================
+# 调用栈采样间隔（秒）
+SAMPLE_INTERVAL = 0.005
+
+# 控制台输出的耗时最多的函数个数（按自身耗时排序）
+TOP_FUNCTIONS = 15
+# ================================================
+
+# 任务描述中保存分析结果的键（重放时忽略）
+PROFILE_KEY = 'profile'
+
+# 第一个阶段说明出现之前（读入图片等）的阶段名
+START_STAGE = '读入'
+
+
+def _frame_name(code):
+    """折叠栈中的帧名：函数名 (文件名:行号)，不含分号"""
+    name = getattr(code, 'co_qualname', code.co_name)
+    return f"{name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(';', ':')
+
+
+class StackSampler:
+    """
+    在后台线程中定期采样指定线程的调用栈，按 "阶段;调用栈" 计数
+
+    stage 由被采样的线程随时更新；root 为调用栈的截止帧（分析器自身的帧不计入）。
+    """
+
+    def __init__(self, thread_id, root, interval=SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.root = root
+        self.interval = interval
+        self.stage = START_STAGE
+        self.counts = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None and frame is not self.root:
+                stack.append(_frame_name(frame.f_code))
+                frame = frame.f_back
+            stack.append(f"[{self.stage}]".replace(';', ':'))
+            self.counts[';'.join(reversed(stack))] += 1
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        return False
+
+    def stage_samples(self):
+        """每个阶段的采样数"""
+        totals = Counter()
+        for stack, count in self.counts.items():
+            totals[stack.split(';', 1)[0][1:-1]] += count
+        return totals
+
+    def write_folded(self, path):
+        """写出折叠栈文件（每行 "帧;帧;... 次数"）"""
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in sorted(self.counts.items()):
+                f.write(f"{stack} {count}\n")
+
+
+def _environment():
+    """影响耗时的运行环境（只记录，重放时不检查）"""
+    import PIL
+    env = {'python': sys.version.split()[0], 'pillow': PIL.__version__, 'cpus': os.cpu_count()}
+    numpy = sys.modules.get('numpy')
+    if numpy is not None:
+        env['numpy'] = numpy.__version__
+    return env
+
+
+def _job_name(job):
+    """输出文件名：第一个输入的文件名 + 时间"""
+    inputs, _ = plan_job(job)
+    stem = os.path.splitext(os.path.basename(next(iter(inputs.values()))))[0]
+    return f"{stem}-{time.strftime('%Y%m%d-%H%M%S')}"
+
+
+def profile_job(job, out_dir, name=None, interval=SAMPLE_INTERVAL, progress=None, cancel_event=None):
+    """
+    在分析器下执行任务图（全部步骤在调用线程中依次执行），写出统计文件、折叠栈和任务描述
+
+    参数:
+        job: 任务描述（dict，格式见 pixel_art_pipeline）；其中的 "profile" 键会被替换
+        out_dir: 输出目录（不存在时创建）
+        name: 输出文件名（不含扩展名），默认为 输入文件名-时间
+        interval: 采样间隔（秒）
+        progress, cancel_event: 同 run_job
+
+    返回:
+        {'stats': .prof 路径, 'folded': .folded 路径, 'spec': .json 路径, 'stages': [...]}
+        任务出错或被取消时，已采集的结果照常写出，然后重新抛出异常
+    """
+    job = {k: v for k, v in job.items() if k != PROFILE_KEY}
+    os.makedirs(out_dir, exist_ok=True)
+    base = os.path.join(out_dir, name or _job_name(job))
+    # 与重放相关的设置：引擎与内存预算会改变执行路径（加速后端、是否分块）
+    settings = {
+        'engine': pixel_art_engine.ENGINE,
+        'memory_budget': pixel_art_governor.MEMORY_BUDGET,
+        'job_memory_budget': pixel_art_governor.JOB_MEMORY_BUDGET,
+        'interval': interval,
+    }
+
+    stages = []
+    start = time.perf_counter()
+    sampler = StackSampler(threading.get_ident(), sys._getframe(), interval)
+
+    def track(fraction, message=None):
+        # 阶段说明变化时记下边界（在执行任务的线程中调用）
+        if message and message != sampler.stage:
+            now = time.perf_counter() - start
+            if stages:
+                stages[-1]['seconds'] = now - stages[-1]['start']
+            stages.append({'stage': message, 'start': now})
+            sampler.stage = message
+        if progress is not None:
+            progress(fraction, message)
+
+    print(f"性能分析: 采样间隔 {interval * 1000:.0f} ms，结果写入 {base}.*")
+    profiler = cProfile.Profile()
+    error = None
+    try:
+        with sampler:
+            profiler.enable()
+            try:
+                run_job(job, max_workers=0, progress=track, cancel_event=cancel_event)
+            finally:
+                profiler.disable()
+    except BaseException as e:
+        error = e
+    elapsed = time.perf_counter() - start
+
+    # 第一个阶段之前的读入时间作为单独的阶段
+    first = stages[0]['start'] if stages else elapsed
+    stages.insert(0, {'stage': START_STAGE, 'start': 0.0, 'seconds': first})
+    stages[-1]['seconds'] = elapsed - stages[-1]['start']
+    samples = sampler.stage_samples()
+    for stage in stages:
+        stage['samples'] = samples.get(stage['stage'], 0)
+
+    profiler.dump_stats(base + '.prof')
+    sampler.write_folded(base + '.folded')
+    settings.update({
+        'elapsed': elapsed,
+        'status': 'ok' if error is None else f"{type(error).__name__}: {error}",
+        'stages': stages,
+        'environment': _environment(),
+    })
+    save_job(dict(job, **{PROFILE_KEY: settings}), base + '.json')
+
+    print_report(stages, elapsed, profiler)
+    print(f"✓ 统计文件: {base}.prof")
+    print(f"✓ 折叠栈（火焰图）: {base}.folded")
+    print(f"✓ 任务描述（可重放）: {base}.json")
+    if error is not None:
+        raise error
+    return {'stats': base + '.prof', 'folded': base + '.folded', 'spec': base + '.json', 'stages': stages}
+
+
+def print_report(stages, elapsed, profiler):
+    """打印各阶段耗时和自身耗时最多的函数"""
+    print(f"\n总耗时 {elapsed:.2f} s")
+    print(f"{'耗时(s)':>9}  {'占比':>5}  {'采样':>5}  阶段")
+    for stage in stages:
+        share = stage['seconds'] / elapsed if elapsed else 0.0
+        print(f"{stage['seconds']:>9.3f}  {share:>6.0%}  {stage['samples']:>6}  {stage['stage']}")
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).sort_stats('tottime').print_stats(TOP_FUNCTIONS)
+    print(out.getvalue())
+
+
+def replay(path, out_dir=None, interval=None, progress=None, cancel_event=None):
+    """
+    按保存的任务描述重新执行性能分析
+
+    参数:
+        path: profile_job 写出的 .json（或任意任务描述文件）
+        out_dir: 输出目录，默认与 path 相同
+        interval: 采样间隔（秒），默认沿用保存的设置
+    """
+    job = load_job(path)
+    settings = job.get(PROFILE_KEY) or {}
+    pixel_art_engine.use_engine(settings.get('engine', pixel_art_engine.ENGINE))
+    pixel_art_governor.set_budget(settings.get('memory_budget'), settings.get('job_memory_budget'))
+    return profile_job(job, out_dir or os.path.dirname(os.path.abspath(path)),
+                       interval=interval or settings.get('interval', SAMPLE_INTERVAL),
+                       progress=progress, cancel_event=cancel_event)
+
+
+def main(argv=None):
+    import argparse
+
+    from pixel_art_pipeline import JobError
+
+    parser = argparse.ArgumentParser(description="按保存的任务描述重放性能分析")
+    parser.add_argument('spec', help="任务描述（profile 输出的 .json 或任务图 JSON/TOML）")
+    parser.add_argument('--out', metavar='DIR', help="输出目录（默认与任务描述相同）")
+    parser.add_argument('--interval', type=float, metavar='MS', help="采样间隔（毫秒）")
+    args = parser.parse_args(argv)
+    try:
+        replay(args.spec, args.out, args.interval / 1000 if args.interval else None)
+    except JobError as e:
+        print(f"错误: 任务描述无效 - {e}")
+        sys.exit(1)
+    except (pixel_art_governor.ResourceLimitError, OSError) as e:
+        # 任务文件、输入或输出路径不可用，或超出内存预算
+        print(f"错误: {e}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
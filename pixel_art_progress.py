@@ -0,0 +1,54 @@
+"""
+进度回报与取消
+长时间的处理函数（像素画转换、画质增强、AI 超分、任务流水线）都接受两个可选参数：
+
+- progress: 回调 progress(fraction, message)，fraction 为 0-1 的整体进度，message 为当前阶段说明（可为 None）
+- cancel_event: threading.Event，被 set 后处理在下一个阶段 / 条带 / 进度输出处抛出 ConversionCancelled
+
+回调在执行处理的线程中被调用；GUI 需自行转交到主线程（root.after）。
+本模块不依赖任何图像库，GUI 可在启动时导入。
+"""
+
+
+class ConversionCancelled(Exception):
+    """处理被用户取消"""
+
+
+class Progress:
+    """
+    把 (progress, cancel_event) 包成一个可调用对象
+
+    task(fraction, message=None) 先检查取消再回报进度；
+    task.span(start, end) 返回映射到 [start, end] 区间的子任务，便于嵌套阶段。
+    """
+
+    def __init__(self, callback=None, cancel_event=None):
+        self.callback = callback
+        self.cancel_event = cancel_event
+
+    def check(self):
+        """已请求取消时抛出 ConversionCancelled"""
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            raise ConversionCancelled("处理已取消")
+
+    def __call__(self, fraction, message=None):
+        self.check()
+        if self.callback is not None:
+            self.callback(min(max(fraction, 0.0), 1.0), message)
+
+    def span(self, start, end):
+        """子任务：子任务的 0-1 对应本任务的 start-end"""
+        if self.callback is None:
+            return Progress(None, self.cancel_event)
+        callback = self.callback
+        return Progress(lambda fraction, message=None: callback(start + (end - start) * fraction, message),
+                        self.cancel_event)
+
+
+def as_progress(progress=None, cancel_event=None):
+    """progress 可以是回调、Progress 或 None"""
+    if isinstance(progress, Progress):
+        if cancel_event is None or cancel_event is progress.cancel_event:
+            return progress
+        return Progress(progress.callback, cancel_event)
+    return Progress(progress, cancel_event)
@@ -0,0 +1,365 @@
+"""
+图像序列 / 视频的像素画转换
+逐帧调用 convert_to_pixel_art 既慢又会闪烁（每帧各自求调色板）。这里按序列整体处理：
+
+- 帧来源：编号图片目录（按文件名中的数字排序），或从标准输入读取原始 RGB 帧
+  （例如本机 ffmpeg 的 -f rawvideo -pix_fmt rgb24 输出）
+- 调色板在帧之间平滑：每帧从上一帧的调色板出发做 k-means（热启动），
+  再按 smoothing 比例向新结果靠拢；画面变化很大（切镜头）时重新求调色板
+- 与最近几帧完全相同的输入帧（按内容哈希）直接复用已算好的像素网格，跳过预处理和缩小；
+  网格与上一个实际渲染的帧相同（或差异不超过阈值）时，直接复用那一帧的输出
+- 有界的并行流水线：解码 + 缩小、放大 + 编码在线程池中并行，调色板与复用判断按顺序执行，
+  在途帧数有上限，输出严格保持原始顺序
+
+示例（ffmpeg 解码 / 编码，中间经管道传递原始帧）:
+    ffmpeg -i clip.mp4 -f rawvideo -pix_fmt rgb24 - |
+      python pixel_art_converter.py - - --sequence --frame-size 1280x720 --pixel-size 160 --colors 32 |
+      ffmpeg -f rawvideo -pix_fmt rgb24 -s 1280x720 -r 30 -i - out.mp4
+"""
+
+import contextlib
+import hashlib
+import io
+import os
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from pixel_art_blocks import block_reduce
+from pixel_art_colorspace import from_space
+from pixel_art_converter import (
+    Image,
+    ImageEnhance,
+    boost_tone,
+    check_sharpen_mode,
+    compute_final_size,
+    compute_target_size,
+    downsample_to_grid,
+    pre_enhance,
+    upscale_pixels,
+)
+from pixel_art_palette import Palette, fit_centers, load_palette
+from pixel_art_progress import as_progress
+
+
+# 调色板平滑系数：每帧向新聚类结果靠拢的比例（1 为不平滑，越小颜色越稳定）
+PALETTE_SMOOTHING = 0.3
+
+# 调色板颜色的变化（任一通道，0-255）不超过该值时沿用上一帧的颜色，
+# 避免平滑过程中的细微漂移让整片同色区域每帧都变一点
+PALETTE_DEADBAND = 4
+
+# 网格平均差异（0-255）超过该值视为切镜头，重新求调色板
+SCENE_CUT = 30.0
+
+# 网格平均差异不超过该值时复用上一渲染帧的输出（0 为只复用完全相同的帧）
+REUSE_THRESHOLD = 0.0
+
+# 每处理多少帧输出一次进度
+REPORT_EVERY = 100
+
+# 目录输入中参与处理的图片扩展名
+FRAME_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.tif', '.tiff', '.webp')
+
+
+def _natural_key(name):
+    """文件名排序键：数字按数值比较（frame_2 排在 frame_10 之前）"""
+    return [int(part) if part.isdigit() else part.lower() for part in re.split(r'(\d+)', name)]
+
+
+def directory_frames(input_dir):
+    """
+    目录中的帧：[(文件名, 加载函数), ...]，按文件名中的数字排序
+
+    加载函数在线程池中调用，解码与其他帧的处理并行。
+    """
+    names = sorted((n for n in os.listdir(input_dir) if n.lower().endswith(FRAME_EXTENSIONS)),
+                   key=_natural_key)
+
+    def loader(path):
+        def load():
+            with Image.open(path) as img:
+                return img.convert('RGB')
+        return load
+
+    return [(name, loader(os.path.join(input_dir, name))) for name in names]
+
+
+def raw_frames(stream, frame_size):
+    """
+    从二进制流逐帧读取原始 RGB24 数据，产出 (帧名, 加载函数)
+
+    流必须按顺序读取，所以读字节在调用线程中完成，只有转成图像的步骤交给线程池。
+    """
+    width, height = frame_size
+    frame_bytes = width * height * 3
+    index = 0
+    while True:
+        data = stream.read(frame_bytes)
+        if not data:
+            return
+        if len(data) < frame_bytes:
+            raise ValueError(f"第 {index + 1} 帧数据不完整（{len(data)}/{frame_bytes} 字节），"
+                             "请检查 --frame-size 是否与输入一致")
+        index += 1
+        yield f"frame_{index:06d}", (lambda data=data: Image.frombytes('RGB', frame_size, data))
+
+
+def grid_change(a, b):
+    """两个网格（uint8 数组）的平均绝对差；尺寸不同时返回无穷大"""
+    if b is None or a.shape != b.shape:
+        return float('inf')
+    return float(np.abs(a.astype(np.int16) - b).mean())
+
+
+class TemporalPalette:
+    """
+    跨帧平滑的调色板
+
+    每次 update 从上一次的聚类中心出发做 k-means（中心的顺序保持不变），
+    然后把每个中心按 smoothing 比例移向新位置；change 超过 scene_cut 时重新聚类。
+    输出的颜色只在变化超过 deadband 时才更新。
+    """
+
+    def __init__(self, count, space='rgb', smoothing=PALETTE_SMOOTHING, scene_cut=SCENE_CUT,
+                 deadband=PALETTE_DEADBAND):
+        self.count = count
+        self.space = space
+        self.smoothing = smoothing
+        self.scene_cut = scene_cut
+        self.deadband = deadband
+        self.centers = None
+        self.colors = None
+        self.palette = None
+
+    def update(self, grid, change=float('inf')):
+        """用新一帧的网格更新调色板并返回它（Palette）"""
+        if self.centers is None or change > self.scene_cut:
+            centers = fit_centers(grid, self.count, self.space)
+            colors = from_space(centers, self.space)
+        else:
+            fitted = fit_centers(grid, self.count, self.space, init=self.centers)
+            centers = self.centers + self.smoothing * (fitted - self.centers)
+            colors = from_space(centers, self.space)
+            drift = np.abs(colors.astype(np.int16) - self.colors).max(axis=1)
+            colors[drift <= self.deadband] = self.colors[drift <= self.deadband]
+        self.centers = centers
+        if self.palette is None or not np.array_equal(colors, self.colors):
+            self.palette = Palette(colors, name=f"序列 {self.count} 色", space=self.space,
+                                   cache=False)
+        self.colors = colors
+        return self.palette
+
+
+def process_sequence(frames, write, pixel_size=32, scale_factor=None, color_reduction=None,
+                     preserve_aspect=True, enhance_mode=True, interpolation='bicubic',
+                     downsample='resize', dither=None, palette=None, quantize_space='rgb',
+                     sharpen_mode='rgb', smoothing=PALETTE_SMOOTHING, reuse_threshold=REUSE_THRESHOLD,
+                     raw_output=False, max_workers=None, window=None, total=None, tiled=False,
+                     progress=None, cancel_event=None):
+    """
+    按顺序处理一组帧
+
+    参数:
+        frames: 可迭代的 (帧名, 加载函数)，见 directory_frames / raw_frames
+        write: write(帧名, 编码后的字节)，在调用线程中按原始顺序调用
+        pixel_size ... sharpen_mode: 与 apply_pixel_art 相同（不走少色图快速路径）；
+            color_reduction 给出时使用跨帧平滑的调色板，palette 给出时所有帧共用该调色板
+        smoothing: 调色板平滑系数（见 PALETTE_SMOOTHING）
+        reuse_threshold: 复用输出的网格差异阈值（见 REUSE_THRESHOLD）
+        raw_output: True 时输出原始 RGB24 字节，否则为 PNG 文件内容
+        max_workers: 并行线程数（默认 CPU 核数）
+        window: 每个并行阶段同时在途的最大帧数（默认线程数的 2 倍），决定内存上限
+        total: 帧总数（已知时用于进度）
+        tiled: 放大后的滤波按条带执行（见 apply_pixel_art）
+        progress / cancel_event: 见 pixel_art_progress
+
+    返回:
+        {'frames', 'reused', 'seconds', 'fps'}
+    """
+    check_sharpen_mode(sharpen_mode)
+    task = as_progress(progress, cancel_event)
+    max_workers = max_workers or os.cpu_count() or 1
+    window = window or max_workers * 2
+    if palette is not None:
+        palette = load_palette(palette, quantize_space)
+        temporal = None
+    else:
+        temporal = TemporalPalette(color_reduction, quantize_space, smoothing) if color_reduction else None
+    # 与 apply_pixel_art 一致：固定调色板时不做中值滤波（避免产生调色板以外的颜色），
+    # 块归约直接最近邻放大
+    median = enhance_mode and palette is None and downsample == 'resize'
+
+    # 最近几帧的 内容哈希 -> 像素网格（并行的线程共用，用锁保护）
+    recent_grids = OrderedDict()
+    lock = threading.Lock()
+
+    def make_grid(frame):
+        name, load = frame
+        task.check()
+        img = load()
+        final_size = compute_final_size(img.size, scale_factor)
+        key = (img.size, hashlib.blake2b(img.tobytes(), digest_size=16).digest())
+        with lock:
+            grid = recent_grids.get(key)
+        if grid is not None:
+            return name, final_size, grid
+        target_size = compute_target_size(img.size, pixel_size, preserve_aspect)
+        if downsample != 'resize':
+            grid = block_reduce(img, target_size, downsample)
+            if enhance_mode:
+                grid = boost_tone(grid)
+        else:
+            if enhance_mode:
+                img = pre_enhance(img, interpolation)
+            grid = downsample_to_grid(img, target_size, enhance_mode, interpolation, sharpen_mode)
+        with lock:
+            recent_grids[key] = grid
+            if len(recent_grids) > window:
+                recent_grids.popitem(last=False)
+        return name, final_size, grid
+
+    def render(item):
+        pixelated, final_size = item
+        task.check()
+        out = upscale_pixels(pixelated, final_size, median, tiled)
+        if raw_output:
+            return out.tobytes()
+        buffer = io.BytesIO()
+        out.save(buffer, format='PNG')
+        return buffer.getvalue()
+
+    def ordered(func, items):
+        """并行执行 func，按提交顺序产出结果；在途任务不超过 window 个"""
+        pending = deque()
+        for item in items:
+            pending.append(executor.submit(func, item))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+    stats = {'frames': 0, 'reused': 0}
+
+    def quantized(grids):
+        """按顺序：判断能否复用上一渲染帧，否则更新调色板并量化"""
+        reference = None
+        for name, final_size, grid in grids:
+            a = np.asarray(grid)
+            change = grid_change(a, reference)
+            if change <= reuse_threshold:
+                yield name, None
+                continue
+            reference = a
+            if temporal is not None:
+                grid = temporal.update(grid, change).apply(grid, dither)
+                if enhance_mode:
+                    # 与 quantize_colors 相同的量化后处理
+                    grid = ImageEnhance.Contrast(grid).enhance(1.05)
+            elif palette is not None:
+                grid = palette.apply(grid, dither)
+            yield name, (grid, final_size)
+
+    def rendered(items):
+        """提交渲染；复用的帧共享参考帧的 Future，不再重复计算"""
+        pending = deque()
+        current = None
+        for name, item in items:
+            if item is not None:
+                current = executor.submit(render, item)
+            else:
+                stats['reused'] += 1
+            pending.append((name, current))
+            if len(pending) >= window:
+                yield pending.popleft()
+        yield from pending
+
+    start = time.perf_counter()
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        for name, future in rendered(quantized(ordered(make_grid, frames))):
+            write(name, future.result())
+            stats['frames'] += 1
+            done = stats['frames']
+            if total:
+                task(done / total, f"第 {done}/{total} 帧")
+            else:
+                task.check()
+            if done % REPORT_EVERY == 0:
+                elapsed = time.perf_counter() - start
+                print(f"已处理 {done} 帧（复用 {stats['reused']} 帧），{done / elapsed:.1f} 帧/秒")
+    finally:
+        # 取消或出错时丢弃尚未开始的帧
+        executor.shutdown(wait=True, cancel_futures=True)
+    stats['seconds'] = time.perf_counter() - start
+    stats['fps'] = stats['frames'] / stats['seconds'] if stats['seconds'] > 0 else 0.0
+    return stats
+
+
+def run_sequence(input_path, output_path, frame_size=None, max_workers=None, window=None,
+                 progress=None, cancel_event=None, **params):
+    """
+    处理帧目录或原始帧流，并报告吞吐量
+
+    参数:
+        input_path: 帧目录；'-' 表示从标准输入读取原始 RGB24 帧（需要 frame_size）
+        output_path: 输出目录（每帧一个 PNG，文件名与输入相同）；
+                     '-' 表示把原始 RGB24 帧写到标准输出（此时提示信息改写到标准错误）
+        frame_size: 原始帧的 (宽, 高)
+        其余参数见 process_sequence
+
+    返回:
+        process_sequence 的统计结果
+    """
+    if output_path == '-':
+        out = sys.stdout.buffer
+        with contextlib.redirect_stdout(sys.stderr):
+            return _run_sequence(input_path, lambda name, data: out.write(data), True,
+                                 frame_size, max_workers, window, progress, cancel_event, params)
+    os.makedirs(output_path, exist_ok=True)
+
+    def write(name, data):
+        with open(os.path.join(output_path, os.path.splitext(name)[0] + '.png'), 'wb') as f:
+            f.write(data)
+
+    return _run_sequence(input_path, write, False, frame_size, max_workers, window, progress,
+                         cancel_event, params)
+
+
+def _run_sequence(input_path, write, raw_output, frame_size, max_workers, window, progress,
+                  cancel_event, params):
+    """run_sequence 的主体：准备帧来源、按内存预算确定在途帧数并报告吞吐量"""
+    from pixel_art_governor import GOVERNOR, job_budget, plan
+
+    if input_path == '-':
+        if not frame_size:
+            raise ValueError("从标准输入读取原始帧时必须指定帧尺寸（--frame-size 宽x高）")
+        frames = raw_frames(sys.stdin.buffer, frame_size)
+        total = None
+        size = frame_size
+    else:
+        frames = directory_frames(input_path)
+        if not frames:
+            raise ValueError(f"目录中没有可处理的帧: {input_path}")
+        total = len(frames)
+        with Image.open(os.path.join(input_path, frames[0][0])) as first:
+            size = first.size
+
+    # 按单帧估算内存：在途帧数受单任务预算限制，整个序列按在途帧数占用全局预算
+    one = plan('pixelate', size, 'RGB', params)
+    max_workers = max_workers or os.cpu_count() or 1
+    window = max(1, min(window or max_workers * 2, job_budget() // max(one.peak_bytes, 1)))
+    print(f"图像序列: {'标准输入' if total is None else f'{total} 帧'}，帧尺寸 {size[0]}x{size[1]}，"
+          f"{max_workers} 线程，在途最多 {window} 帧")
+    with GOVERNOR.admit(one._replace(peak_bytes=one.peak_bytes * window)):
+        stats = process_sequence(frames, write, raw_output=raw_output,
+                                 max_workers=max_workers, window=window, total=total,
+                                 tiled=one.tiled, progress=progress, cancel_event=cancel_event, **params)
+    print(f"✓ 序列完成：{stats['frames']} 帧（复用 {stats['reused']} 帧），"
+          f"耗时 {stats['seconds']:.1f} 秒，{stats['fps']:.1f} 帧/秒")
+    return stats
@@ -0,0 +1,221 @@
+"""
+AI 超分辨率（Real-ESRGAN）调用封装
+负责模型选择、命令组装和结果后处理，供 GUI 与任务流水线共用
+
+PIL 只在真正读写图片时才导入，GUI 显示超分标签页时不必加载图像库
+
+Real-ESRGAN 以流式方式运行：逐行读取它输出的百分比作为进度，
+取消时直接结束子进程（见 run_realesrgan）
+"""
+
+import os
+import queue
+import re
+import subprocess
+import tempfile
+import threading
+from collections import deque
+from pathlib import Path
+
+from pixel_art_progress import as_progress
+
+
+# 项目根目录
+BASE_DIR = Path(__file__).resolve().parent
+
+# Real-ESRGAN 可执行文件相对路径（你已解压到项目目录下）
+# 这里使用包含 models 文件夹的版本目录
+REALESRGAN_EXE = BASE_DIR / "realesrgan-ncnn-vulkan-20220424-windows" / "realesrgan-ncnn-vulkan.exe"
+
+# 候选模型（按优先级排列）：(模型名, 模型自身放大倍数)
+MODEL_DEFS = [
+    ("realesr-animevideov3", 2),
+    ("realesrgan-x4plus-anime", 4),
+    ("realesrgan-x4plus", 4),
+]
+
+
+# Real-ESRGAN 每处理完一个分块输出一行进度，例如 "37.50%"
+_PERCENT_RE = re.compile(r'(\d+(?:\.\d+)?)%')
+
+# 检查取消的间隔（秒）：子进程长时间没有输出时也能及时结束
+_POLL_SECONDS = 0.2
+
+
+class SuperResError(RuntimeError):
+    """Real-ESRGAN 不可用或执行失败"""
+
+
+def find_model(exe_path=None):
+    """
+    自动选择可用模型，并匹配模型尺度
+
+    返回:
+        (模型名, 模型倍数)，找不到时返回 (None, None)
+    """
+    models_dir = Path(exe_path or REALESRGAN_EXE).parent / "models"
+    for name, mscale in MODEL_DEFS:
+        if (models_dir / f"{name}.param").exists():
+            return name, mscale
+    return None, None
+
+
+def build_command(input_path, output_path, model_name, model_scale, exe_path=None):
+    """组装命令（GPU 0 / 输出 png / tile 自动）"""
+    return [
+        str(exe_path or REALESRGAN_EXE),
+        "-i", str(input_path),
+        "-o", str(output_path),
+        "-s", str(model_scale),
+        "-n", model_name,
+        "-g", "0",
+        "-f", "png",
+        "-t", "0",
+    ]
+
+
+def _read_lines(stream, lines):
+    """读取线程：把子进程输出逐行放入队列，结束时放入 None"""
+    try:
+        for line in stream:
+            lines.put(line)
+    finally:
+        lines.put(None)
+
+
+def run_realesrgan(cmd, exe_path=None, progress=None, cancel_event=None):
+    """
+    执行 Real-ESRGAN 命令
+
+    在可执行文件所在目录下运行，保证能正确找到 models 文件夹。
+    标准输出和错误合并后逐行读取，解析其中的百分比回报给 progress；
+    cancel_event 被 set 后立即结束子进程并抛出 ConversionCancelled。
+    失败时抛出 SuperResError，信息中包含命令和输出的最后若干行。
+    """
+    task = as_progress(progress, cancel_event)
+    task.check()
+    proc = subprocess.Popen(
+        cmd,
+        cwd=str(Path(exe_path or REALESRGAN_EXE).parent),
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+        encoding="utf-8",
+        errors="ignore",
+        bufsize=1,
+    )
+    lines = queue.Queue()
+    reader = threading.Thread(target=_read_lines, args=(proc.stdout, lines), daemon=True)
+    reader.start()
+    tail = deque(maxlen=40)
+    try:
+        while True:
+            try:
+                line = lines.get(timeout=_POLL_SECONDS)
+            except queue.Empty:
+                task.check()
+                continue
+            if line is None:
+                break
+            match = _PERCENT_RE.search(line)
+            if match:
+                task(float(match.group(1)) / 100, "AI 超分")
+            elif line.strip():
+                tail.append(line.rstrip())
+        returncode = proc.wait()
+    except BaseException:
+        # 取消 / 出错：结束子进程，释放它占用的显存和内存
+        proc.kill()
+        proc.wait()
+        raise
+    finally:
+        reader.join(timeout=1)
+        proc.stdout.close()
+    output = "\n".join(tail)
+    if returncode != 0:
+        raise SuperResError(
+            f"AI 超分执行失败。\n\n命令：\n{' '.join(cmd)}\n\n错误信息：\n{output or '未知错误'}"
+        )
+    return subprocess.CompletedProcess(cmd, returncode, stdout=output, stderr="")
+
+
+def post_resize(img, ratio):
+    """模型尺度与目标尺度不同时，事后按比例缩放到目标尺寸"""
+    if ratio == 1.0:
+        return img
+    new_w = int(img.width * ratio)
+    new_h = int(img.height * ratio)
+    if new_w > 0 and new_h > 0:
+        from PIL import Image
+        from pixel_art_engine import resize
+        img = resize(img, (new_w, new_h), Image.LANCZOS)
+    return img
+
+
+def _prepare(target_scale, exe_path):
+    exe_path = Path(exe_path or REALESRGAN_EXE)
+    if not exe_path.exists():
+        raise SuperResError(
+            f"未找到 Real-ESRGAN 可执行文件：\n{exe_path}\n\n"
+            "请确认已解压到项目目录，或修改 pixel_art_superres.py 中的 REALESRGAN_EXE 路径。"
+        )
+    if target_scale < 1:
+        raise SuperResError("放大倍数必须是大于等于 1 的数字！")
+    name, mscale = find_model(exe_path)
+    if name is None:
+        raise SuperResError(f"未在 models 目录找到可用模型，请检查 {exe_path.parent / 'models'}")
+    # 运行尺度为模型本身的倍数；若与目标不同，事后再缩放
+    post_ratio = target_scale / mscale if mscale != target_scale else 1.0
+    return exe_path, name, mscale, post_ratio
+
+
+def super_resolve_file(input_path, output_path, target_scale=2, exe_path=None, progress=None,
+                       cancel_event=None):
+    """
+    对图片文件执行 AI 超分并写出到 output_path
+
+    progress / cancel_event 见 pixel_art_progress；超分占进度的 90%，其余为事后缩放。
+
+    返回:
+        超分后的图像
+    """
+    task = as_progress(progress, cancel_event)
+    exe_path, name, mscale, post_ratio = _prepare(target_scale, exe_path)
+    cmd = build_command(input_path, output_path, name, mscale, exe_path)
+    run_realesrgan(cmd, exe_path, task.span(0.0, 0.9))
+    from PIL import Image
+    img = Image.open(output_path)
+    if post_ratio != 1.0:
+        task(0.9, "缩放到目标倍数")
+        img = post_resize(img, post_ratio)
+        img.save(output_path)
+    task(1.0, "完成")
+    return img
+
+
+def super_resolve_image(img, target_scale=2, exe_path=None, progress=None, cancel_event=None):
+    """
+    对内存中的图像执行 AI 超分
+
+    Real-ESRGAN 只接受文件，因此输入/输出会经过一个临时目录，
+    结果读回内存后（或取消、出错时）临时文件即被删除。
+
+    返回:
+        超分后的 RGB 图像
+    """
+    task = as_progress(progress, cancel_event)
+    exe_path, name, mscale, post_ratio = _prepare(target_scale, exe_path)
+    print(f"AI 超分（模型: {name}，倍数: {target_scale}）...")
+    with tempfile.TemporaryDirectory(prefix="pixel_art_sr_") as tmp_dir:
+        src = os.path.join(tmp_dir, "input.png")
+        dst = os.path.join(tmp_dir, "output.png")
+        img.save(src)
+        run_realesrgan(build_command(src, dst, name, mscale, exe_path), exe_path,
+                       task.span(0.0, 0.9))
+        from PIL import Image
+        with Image.open(dst) as out:
+            result = out.convert('RGB')
+    task(0.9, "缩放到目标倍数")
+    result = post_resize(result, post_ratio)
+    task(1.0, "完成")
+    return result
@@ -0,0 +1,261 @@
+"""
+参数扫描 / 对比图（contact sheet）
+一次性尝试多组 pixel_size / color_reduction / 插值方法，并输出带标注的对比图
+
+共同的前缀阶段只计算一次：
+    解码 -> 增强预处理（每种插值一次）-> 缩小到网格（每种插值 x 像素大小一次）
+只有不同的尾部阶段（颜色量化 + 放大）按组合展开，并行执行。
+其余参数（EXIF/ICC 读入、快速路径、块归约、抖动、固定调色板、量化色彩空间、锐化方式）
+与 apply_pixel_art 相同，每个组合的结果与用同样参数单次转换的结果一致；
+缩略图按完整尺寸结果的取样位置直接从像素网格取值（见 take_thumbnail），放大后的中值滤波
+也与单次转换相同；只有需要写出完整尺寸结果时才生成完整尺寸的图像。
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from itertools import product
+
+from pixel_art_converter import (
+    Image,
+    Ingest,
+    analyze_content,
+    boost_tone,
+    check_sharpen_mode,
+    compute_final_size,
+    compute_target_size,
+    describe_ingest,
+    downsample_to_grid,
+    fast_pixel_grid,
+    pre_enhance,
+    reduce_colors,
+    resize,
+    upscale_pixels,
+    upscale_smoothing,
+)
+from pixel_art_engine import nearest_index
+
+
+# 对比图中每个缩略图下方的标注高度（像素）
+LABEL_HEIGHT = 16
+
+
+def variant_label(params):
+    """组合参数的简短标注，例如 'px64 c32 bicubic'（不减色时为 'full'，固定调色板时为调色板名称）"""
+    colors = params['color_reduction']
+    label = f"px{params['pixel_size']} "
+    if params.get('palette'):
+        label += params['palette']
+    else:
+        label += f"c{colors}" if colors else "full"
+    if params['interpolation']:
+        label += f" {params['interpolation']}"
+    return label
+
+
+def thumbnail_positions(length, count):
+    """把 length 个像素均分为 count 份，取每份中心的像素位置"""
+    import numpy as np
+    positions = ((np.arange(count) + 0.5) * length / count).astype(np.intp)
+    return np.minimum(positions, length - 1)
+
+
+def take_thumbnail(pixelated, full_size, tile_size, smooth=False):
+    """
+    缩略图：从 pixelated 最近邻放大到 full_size 的结果中取样（每个缩略图像素取对应区域中心的像素）
+
+    不生成完整尺寸的图像：取样位置按最近邻放大的下标（与 Pillow 逐位一致）直接换算到网格。
+    smooth 为 True 时取的是放大后再做 3x3 中值滤波（见 upscale_pixels）的结果：
+    对每个取样点的 3x3 邻域逐通道求中值，图像边缘按复制边缘像素处理（与 MedianFilter 相同）。
+    """
+    import numpy as np
+    width, height = full_size
+    # 完整尺寸的每一列 / 每一行对应的网格下标
+    grid_x = nearest_index(pixelated.size[0], width)
+    grid_y = nearest_index(pixelated.size[1], height)
+    xs = thumbnail_positions(width, tile_size[0])
+    ys = thumbnail_positions(height, tile_size[1])
+    grid = np.asarray(pixelated)
+    if not smooth:
+        return Image.fromarray(grid[np.ix_(grid_y[ys], grid_x[xs])])
+    offsets = range(-1, 2)
+    neighbours = np.stack([
+        grid[np.ix_(grid_y[np.clip(ys + dy, 0, height - 1)], grid_x[np.clip(xs + dx, 0, width - 1)])]
+        for dy in offsets for dx in offsets
+    ])
+    return Image.fromarray(np.sort(neighbours, axis=0)[4])
+
+
+def sweep_pixel_art(img, pixel_sizes, color_reductions=(None,), interpolations=('bicubic',),
+                    preserve_aspect=True, enhance_mode=True, tile_width=256,
+                    scale_factor=None, output_dir=None, max_workers=None, fast_path=True,
+                    downsample='resize', dither=None, palette=None, quantize_space='rgb',
+                    sharpen_mode='rgb', ingest=True):
+    """
+    对同一张图按参数网格批量生成像素画
+
+    参数:
+        img: 输入图像（已打开的 PIL 图像）
+        pixel_sizes / color_reductions / interpolations: 各参数的候选值
+        preserve_aspect / enhance_mode: 与 apply_pixel_art 相同，对所有组合生效
+        tile_width: 对比图中每个缩略图的宽度
+        scale_factor: 完整尺寸结果的缩放倍数（缩略图按完整尺寸结果的取样位置取值）
+        output_dir: 若指定，则同时把每个组合的完整尺寸结果写入该目录
+        max_workers: 并行线程数
+        fast_path / downsample / dither / palette / quantize_space / sharpen_mode / ingest:
+            与 apply_pixel_art 相同，对所有组合生效（给出 palette 时颜色数不参与扫描）
+
+    返回:
+        [(参数 dict, 缩略图), ...]，按 插值 x 像素大小 x 颜色数 的顺序排列
+    """
+    check_sharpen_mode(sharpen_mode)
+    if palette is not None:
+        from pixel_art_palette import load_palette
+        palette = load_palette(palette, quantize_space)
+        color_reductions = (None,)
+    source = Ingest(img, ingest)
+    original_size = source.size
+    print(f"原始图片尺寸: {original_size[0]}x{original_size[1]}")
+    describe_ingest(source)
+
+    interpolations = list(dict.fromkeys(interpolations))
+    pixel_sizes = list(dict.fromkeys(pixel_sizes))
+    color_reductions = list(dict.fromkeys(color_reductions))
+
+    # 快速路径的判断与颜色数有关，每个颜色数分析一次
+    infos = {colors: analyze_content(img, colors) if fast_path else None
+             for colors in color_reductions}
+    fast = {colors: info is not None and info['fast_path'] for colors, info in infos.items()}
+    if any(fast.values()):
+        print(f"检测到像素画/少色图像，{sum(fast.values())} 种颜色数使用快速路径")
+    img = source.to_rgb(img)
+
+    blocks = downsample != 'resize'
+    # 非增强模式、块归约或全部走快速路径时插值方法不参与计算，合并为同一个前缀
+    if not enhance_mode or blocks or all(fast.values()):
+        interpolations = [None]
+
+    tile_height = max(1, int(tile_width * original_size[1] / original_size[0]))
+    full_size = compute_final_size(original_size, scale_factor)
+
+    def stored_target(pixel_size):
+        return source.stored_size(compute_target_size(original_size, pixel_size, preserve_aspect))
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        grids = {}
+        if not all(fast.values()):
+            # 前缀 1：增强预处理，每种插值一次（块归约直接在原图上取代表色）
+            if enhance_mode and not blocks:
+                prepared = dict(zip(
+                    interpolations,
+                    executor.map(lambda interp: pre_enhance(img, interp, source), interpolations),
+                ))
+            else:
+                prepared = {interp: img for interp in interpolations}
+            print(f"预处理完成：{len(prepared)} 种")
+
+            # 前缀 2：缩小到网格（在原始方向上缩小，再校正方向和色彩），每个（插值, 像素大小）一次
+            grid_keys = list(product(interpolations, pixel_sizes))
+
+            def grid(key):
+                interp, pixel_size = key
+                if blocks:
+                    from pixel_art_blocks import block_reduce
+                    pixelated = source.finish(block_reduce(img, stored_target(pixel_size), downsample,
+                                                           mirror=source.mirror), owned=True)
+                    return boost_tone(pixelated) if enhance_mode else pixelated
+                return downsample_to_grid(prepared[interp], stored_target(pixel_size), enhance_mode,
+                                          interp or 'nearest', sharpen_mode, source)
+
+            grids = dict(zip(grid_keys, executor.map(grid, grid_keys)))
+            prepared.clear()
+            print(f"缩小完成：{len(grids)} 种")
+
+        # 尾部：颜色量化 + 放大，按全部组合展开
+        def tail(key):
+            interp, pixel_size, colors = key
+            if fast[colors]:
+                pixelated = fast_pixel_grid(img, infos[colors], stored_target(pixel_size), colors,
+                                            enhance_mode, dither, palette, quantize_space, source)
+                smooth = False
+            else:
+                pixelated = reduce_colors(grids[(interp, pixel_size)], colors, enhance_mode, dither,
+                                          palette, quantize_space)
+                # 块归约和固定调色板时不做中值滤波（后者避免产生调色板以外的颜色）
+                smooth = (not blocks and palette is None
+                          and upscale_smoothing(pixelated.size, full_size, enhance_mode))
+            params = {
+                'pixel_size': pixel_size,
+                'color_reduction': colors,
+                'interpolation': interp,
+                'palette': palette.name if palette is not None else None,
+            }
+            if output_dir:
+                name = variant_label(params).replace(' ', '_') + '.png'
+                if smooth:
+                    full = upscale_pixels(pixelated, full_size, True)
+                else:
+                    full = resize(pixelated, full_size, Image.NEAREST)
+                full.save(os.path.join(output_dir, name))
+            return params, take_thumbnail(pixelated, full_size, (tile_width, tile_height), smooth)
+
+        variant_keys = list(product(interpolations, pixel_sizes, color_reductions))
+        variants = list(executor.map(tail, variant_keys))
+    print(f"共生成 {len(variants)} 种组合")
+    return variants
+
+
+def make_contact_sheet(variants, columns, padding=4, background=(32, 32, 32)):
+    """把各组合的缩略图排成带标注的网格"""
+    from PIL import ImageDraw
+
+    tile_w, tile_h = variants[0][1].size
+    rows = (len(variants) + columns - 1) // columns
+    cell_w = tile_w + padding
+    cell_h = tile_h + LABEL_HEIGHT + padding
+    sheet = Image.new('RGB', (columns * cell_w + padding, rows * cell_h + padding), background)
+    draw = ImageDraw.Draw(sheet)
+
+    for index, (params, tile) in enumerate(variants):
+        x = padding + (index % columns) * cell_w
+        y = padding + (index // columns) * cell_h
+        sheet.paste(tile, (x, y))
+        draw.text((x + 2, y + tile_h + 2), variant_label(params), fill=(230, 230, 230))
+    return sheet
+
+
+def run_sweep(input_path, sheet_path, pixel_sizes, color_reductions=(None,),
+              interpolations=('bicubic',), preserve_aspect=True, enhance_mode=True,
+              tile_width=256, scale_factor=None, output_dir=None, max_workers=None,
+              fast_path=True, downsample='resize', dither=None, palette=None,
+              quantize_space='rgb', sharpen_mode='rgb', ingest=True):
+    """读取图片、执行参数扫描并保存对比图（每行一组像素大小，每列一种颜色数）"""
+    img = Image.open(input_path)
+    img.load()
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+
+    variants = sweep_pixel_art(
+        img,
+        pixel_sizes=pixel_sizes,
+        color_reductions=color_reductions,
+        interpolations=interpolations,
+        preserve_aspect=preserve_aspect,
+        enhance_mode=enhance_mode,
+        tile_width=tile_width,
+        scale_factor=scale_factor,
+        output_dir=output_dir,
+        max_workers=max_workers,
+        fast_path=fast_path,
+        downsample=downsample,
+        dither=dither,
+        palette=palette,
+        quantize_space=quantize_space,
+        sharpen_mode=sharpen_mode,
+        ingest=ingest,
+    )
+    # 固定调色板时颜色数不参与扫描，只有一列
+    columns = 1 if palette is not None else len(dict.fromkeys(color_reductions))
+    sheet = make_contact_sheet(variants, columns=columns)
+    sheet.save(sheet_path)
+    print(f"✓ 对比图已保存: {sheet_path}")
+    return sheet
@@ -0,0 +1,524 @@
+"""
+图像查看器：大图预览与前后对比（Tk）
+超分后的 8K 输出也能流畅缩放、平移：
+
+- 图像金字塔：逐级缩小一半的副本按需生成并缓存，缩小显示时从最接近的层取样，
+  不必每次从原图缩放
+- 只渲染可见区域：显示坐标按 TILE_SIZE 切成瓦片，平移 / 缩放时只生成窗口内缺少的瓦片，
+  PhotoImage 瓦片放在 LRU 缓存中（最多 TILE_CACHE_SIZE 块），平移回来不用重新生成
+- 生成瓦片分批在空闲时进行，期间先用粗糙层的整幅预览垫底，界面不会卡住
+- 像素画放大使用最近邻（可切换），保持像素块边缘清晰
+- 对比模式：左侧显示原图、右侧显示结果，拖动分割线对比同一区域
+
+操作: 滚轮缩放（以鼠标位置为中心），左键拖动平移，对比模式下拖动分割线；
+      F / 0 适应窗口，1 原始大小，+ / - 缩放，C 切换对比，N 切换最近邻，Esc 关闭
+
+用法:
+    from pixel_art_viewer import ImageViewer
+    ImageViewer(root, Image.open('output.png'), before=Image.open('input.png'))
+"""
+
+import math
+import tkinter as tk
+from collections import OrderedDict
+
+from PIL import Image, ImageTk
+
+
+# ==================== 配置 ====================
+# 瓦片边长（屏幕像素）
+TILE_SIZE = 256
+
+# 最多缓存的 PhotoImage 瓦片数（每块约 TILE_SIZE² x 4 字节，默认上限约 40 MB）
+TILE_CACHE_SIZE = 160
+
+# 每次空闲回调最多生成的瓦片数，其余留到下一轮（保持界面响应）
+TILES_PER_BATCH = 6
+
+# 缩放范围（屏幕像素 / 图像像素）和每格滚轮的缩放倍数
+MAX_ZOOM = 32.0
+ZOOM_STEP = 1.25
+
+# 金字塔最小层的短边（像素）
+MIN_LEVEL_SIZE = 64
+
+# 窗口默认最大尺寸
+MAX_WINDOW_SIZE = (1280, 860)
+# ================================================
+
+# 拖动分割线的命中范围（屏幕像素）
+_SPLIT_GRAB = 6
+
+
+def displayable(img):
+    """转换为 Tk 可以显示、Image.reduce 可以处理的模式（RGB / RGBA / L）"""
+    if img.mode in ('RGB', 'RGBA', 'L'):
+        return img
+    # Image.has_transparency_data 需要 Pillow 10.1，这里直接检查
+    if 'transparency' in img.info or img.mode in ('RGBA', 'LA', 'PA'):
+        return img.convert('RGBA')
+    return img.convert('RGB')
+
+
+class ImagePyramid:
+    """
+    图像金字塔：第 0 层为原图，第 k 层为逐级缩小一半（BOX）的结果
+
+    各层在第一次用到时生成并缓存；可以在后台线程中先调用 build() 生成全部层。
+    """
+
+    def __init__(self, img):
+        img = displayable(img)
+        img.load()
+        self.size = img.size
+        self.mode = img.mode
+        self.levels = [img]
+
+    @property
+    def image(self):
+        return self.levels[0]
+
+    def depth(self):
+        """可用的层数（最小层短边不小于 MIN_LEVEL_SIZE）"""
+        short = min(self.size)
+        depth = 1
+        while short >> depth >= MIN_LEVEL_SIZE:
+            depth += 1
+        return depth
+
+    def level(self, k):
+        """第 k 层图像（不存在时从上一层逐级生成）"""
+        while len(self.levels) <= k:
+            self.levels.append(self.levels[-1].reduce(2))
+        return self.levels[k]
+
+    def build(self):
+        """生成全部层，返回 self"""
+        self.level(self.depth() - 1)
+        return self
+
+    def level_for(self, scale):
+        """以 scale（显示像素 / 原图像素）显示时取样的层：分辨率不低于显示分辨率的最小层"""
+        k = 0
+        while k + 1 < self.depth() and scale * (2 << k) <= 1:
+            k += 1
+        return k
+
+
+def render_tile(pyramid, display_size, col, row, nearest=False, tile_size=TILE_SIZE):
+    """
+    把图像缩放到 display_size 显示时，渲染第 (col, row) 个瓦片
+
+    只从金字塔中合适的一层裁取并缩放瓦片覆盖的区域；
+    放大（显示分辨率高于取样层）时 nearest 为 True 使用最近邻，否则双线性。
+    瓦片在图像范围之外时返回 None。
+    """
+    display_w, display_h = display_size
+    x0, y0 = col * tile_size, row * tile_size
+    width, height = min(tile_size, display_w - x0), min(tile_size, display_h - y0)
+    if width <= 0 or height <= 0 or x0 < 0 or y0 < 0:
+        return None
+    level = pyramid.level(pyramid.level_for(display_w / pyramid.size[0]))
+    sx, sy = display_w / level.width, display_h / level.height
+    if sx == 1 and sy == 1:
+        return level.crop((x0, y0, x0 + width, y0 + height))
+    box = (x0 / sx, y0 / sy, (x0 + width) / sx, (y0 + height) / sy)
+    resample = Image.NEAREST if nearest and sx >= 1 and sy >= 1 else Image.BILINEAR
+    return level.resize((width, height), resample, box=box)
+
+
+def render_region(pyramid, display_size, region, nearest=False, coarse=0):
+    """
+    渲染显示坐标中的矩形 region = (x0, y0, x1, y1)（不按瓦片切分）
+
+    coarse > 0 时从更粗糙的层取样（用作瓦片生成前的快速预览）。
+    """
+    display_w, display_h = display_size
+    x0, y0 = max(region[0], 0), max(region[1], 0)
+    x1, y1 = min(region[2], display_w), min(region[3], display_h)
+    if x1 <= x0 or y1 <= y0:
+        return None
+    k = min(pyramid.level_for(display_w / pyramid.size[0]) + coarse, pyramid.depth() - 1)
+    level = pyramid.level(k)
+    sx, sy = display_w / level.width, display_h / level.height
+    resample = Image.NEAREST if nearest and sx >= 1 and sy >= 1 else Image.BILINEAR
+    return level.resize((x1 - x0, y1 - y0), resample, box=(x0 / sx, y0 / sy, x1 / sx, y1 / sy))
+
+
+class TileCache:
+    """按最近使用淘汰的瓦片缓存（键 -> PhotoImage）"""
+
+    def __init__(self, max_tiles=TILE_CACHE_SIZE):
+        self.max_tiles = max_tiles
+        self._tiles = OrderedDict()
+
+    def __len__(self):
+        return len(self._tiles)
+
+    def get(self, key):
+        tile = self._tiles.get(key)
+        if tile is not None:
+            self._tiles.move_to_end(key)
+        return tile
+
+    def put(self, key, tile):
+        self._tiles[key] = tile
+        self._tiles.move_to_end(key)
+        while len(self._tiles) > self.max_tiles:
+            self._tiles.popitem(last=False)
+
+    def clear(self):
+        self._tiles.clear()
+
+
+class ImageViewer:
+    """
+    查看器窗口（tk.Toplevel）
+
+    参数:
+        master: 父窗口
+        image: 要查看的图像（PIL.Image 或 ImagePyramid）
+        before: 对比用的原图（可选，尺寸可以不同，会对齐到 image 的范围显示）
+        title: 窗口标题
+        nearest: 放大时使用最近邻（像素画）
+    """
+
+    def __init__(self, master, image, before=None, title="预览", nearest=False):
+        self.after_layer = image if isinstance(image, ImagePyramid) else ImagePyramid(image)
+        self.before_layer = None
+        if before is not None:
+            self.before_layer = before if isinstance(before, ImagePyramid) else ImagePyramid(before)
+        self.cache = TileCache()
+        self.zoom = 1.0
+        self.origin = (0, 0)        # 图像左上角在画布中的位置
+        self.fit_mode = True        # 适应窗口：窗口大小改变时重新适应
+        self.split = 0.5            # 分割线位置（画布宽度的比例）
+        self._drag = None
+        self._redraw_job = None
+        self._fill_job = None
+        self._pending = []
+        self._items = []            # 当前画在画布上的 PhotoImage（防止被回收）
+
+        self.window = tk.Toplevel(master)
+        self.window.title(title)
+        width, height = self.after_layer.size
+        win_w = min(MAX_WINDOW_SIZE[0], self.window.winfo_screenwidth() - 80)
+        win_h = min(MAX_WINDOW_SIZE[1], self.window.winfo_screenheight() - 120)
+        self.window.geometry(f"{win_w}x{win_h}")
+
+        self.nearest = tk.BooleanVar(value=nearest)
+        self.compare = tk.BooleanVar(value=self.before_layer is not None)
+        self.create_widgets()
+        self.status.config(text=f"{width}x{height}")
+
+    def create_widgets(self):
+        toolbar = tk.Frame(self.window)
+        toolbar.pack(side=tk.TOP, fill=tk.X, padx=5, pady=3)
+        tk.Button(toolbar, text="适应窗口", command=self.fit).pack(side=tk.LEFT, padx=2)
+        tk.Button(toolbar, text="1:1", command=lambda: self.set_zoom(1.0)).pack(side=tk.LEFT, padx=2)
+        tk.Button(toolbar, text="放大", command=lambda: self.step_zoom(1)).pack(side=tk.LEFT, padx=2)
+        tk.Button(toolbar, text="缩小", command=lambda: self.step_zoom(-1)).pack(side=tk.LEFT, padx=2)
+        tk.Checkbutton(toolbar, text="最近邻（像素画）", variable=self.nearest,
+                       command=self.invalidate).pack(side=tk.LEFT, padx=8)
+        if self.before_layer is not None:
+            tk.Checkbutton(toolbar, text="对比原图", variable=self.compare,
+                           command=self.schedule_redraw).pack(side=tk.LEFT, padx=2)
+        self.zoom_label = tk.Label(toolbar, text="", width=8, anchor=tk.E)
+        self.zoom_label.pack(side=tk.RIGHT)
+
+        self.status = tk.Label(self.window, text="", anchor=tk.W, relief=tk.SUNKEN,
+                               font=("Microsoft YaHei", 9))
+        self.status.pack(side=tk.BOTTOM, fill=tk.X)
+
+        self.canvas = tk.Canvas(self.window, bg="#2b2b2b", highlightthickness=0, cursor="fleur")
+        self.canvas.pack(fill=tk.BOTH, expand=True)
+        self.canvas.bind("<Configure>", self.on_configure)
+        self.canvas.bind("<ButtonPress-1>", self.on_press)
+        self.canvas.bind("<B1-Motion>", self.on_drag)
+        self.canvas.bind("<ButtonRelease-1>", lambda e: setattr(self, '_drag', None))
+        self.canvas.bind("<Double-Button-1>", lambda e: self.toggle_fit(e.x, e.y))
+        self.canvas.bind("<Motion>", self.on_motion)
+        self.canvas.bind("<MouseWheel>", lambda e: self.step_zoom(1 if e.delta > 0 else -1, e.x, e.y))
+        self.canvas.bind("<Button-4>", lambda e: self.step_zoom(1, e.x, e.y))
+        self.canvas.bind("<Button-5>", lambda e: self.step_zoom(-1, e.x, e.y))
+
+        for keys, command in ((("f", "0"), self.fit), (("1",), lambda: self.set_zoom(1.0)),
+                              (("plus", "equal", "KP_Add"), lambda: self.step_zoom(1)),
+                              (("minus", "KP_Subtract"), lambda: self.step_zoom(-1)),
+                              (("c",), self.toggle_compare), (("n",), self.toggle_nearest),
+                              (("Escape",), self.close)):
+            for key in keys:
+                self.window.bind(f"<KeyPress-{key}>", lambda e, command=command: command())
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+        self.window.focus_set()
+
+    # ---------- 视图状态 ----------
+
+    def canvas_size(self):
+        return max(self.canvas.winfo_width(), 1), max(self.canvas.winfo_height(), 1)
+
+    def display_size(self):
+        width, height = self.after_layer.size
+        return max(round(width * self.zoom), 1), max(round(height * self.zoom), 1)
+
+    def fit_zoom(self):
+        width, height = self.after_layer.size
+        canvas_w, canvas_h = self.canvas_size()
+        return min(canvas_w / width, canvas_h / height)
+
+    def clamp_origin(self, x, y):
+        """图像比画布小时居中，否则不允许拖出画布边缘"""
+        canvas_w, canvas_h = self.canvas_size()
+        display_w, display_h = self.display_size()
+
+        def clamp(pos, display, canvas):
+            if display <= canvas:
+                return (canvas - display) // 2
+            return min(0, max(canvas - display, round(pos)))
+
+        return clamp(x, display_w, canvas_w), clamp(y, display_h, canvas_h)
+
+    def set_zoom(self, zoom, x=None, y=None):
+        """缩放到 zoom，保持画布坐标 (x, y)（默认画布中心）下的图像位置不动"""
+        canvas_w, canvas_h = self.canvas_size()
+        x = canvas_w / 2 if x is None else x
+        y = canvas_h / 2 if y is None else y
+        zoom = min(max(zoom, min(self.fit_zoom(), 1.0) / 2), MAX_ZOOM)
+        self.fit_mode = False
+        u = (x - self.origin[0]) / self.zoom
+        v = (y - self.origin[1]) / self.zoom
+        self.zoom = zoom
+        self.origin = self.clamp_origin(x - u * zoom, y - v * zoom)
+        self.schedule_redraw()
+
+    def step_zoom(self, steps, x=None, y=None):
+        self.set_zoom(self.zoom * ZOOM_STEP ** steps, x, y)
+
+    def fit(self):
+        self.fit_mode = True
+        self.zoom = self.fit_zoom()
+        self.origin = self.clamp_origin(0, 0)
+        self.schedule_redraw()
+
+    def toggle_fit(self, x, y):
+        if abs(self.zoom - self.fit_zoom()) < 1e-6:
+            self.set_zoom(1.0, x, y)
+        else:
+            self.fit()
+
+    def toggle_compare(self):
+        if self.before_layer is not None:
+            self.compare.set(not self.compare.get())
+            self.schedule_redraw()
+
+    def toggle_nearest(self):
+        self.nearest.set(not self.nearest.get())
+        self.invalidate()
+
+    def invalidate(self):
+        """显示方式改变：丢弃缓存的瓦片并重绘"""
+        self.cache.clear()
+        self.schedule_redraw()
+
+    def on_configure(self, event):
+        """窗口大小改变（包括第一次显示）"""
+        if self.fit_mode:
+            self.fit()
+        else:
+            self.origin = self.clamp_origin(*self.origin)
+            self.schedule_redraw()
+
+    def split_x(self):
+        return round(self.canvas_size()[0] * self.split)
+
+    def comparing(self):
+        return self.before_layer is not None and self.compare.get()
+
+    # ---------- 鼠标 ----------
+
+    def on_press(self, event):
+        if self.comparing() and abs(event.x - self.split_x()) <= _SPLIT_GRAB:
+            self._drag = ('split',)
+        else:
+            self._drag = ('pan', event.x, event.y, self.origin)
+
+    def on_drag(self, event):
+        if self._drag is None:
+            return
+        if self._drag[0] == 'split':
+            self.split = min(max(event.x / self.canvas_size()[0], 0.0), 1.0)
+        else:
+            _, x, y, (ox, oy) = self._drag
+            self.origin = self.clamp_origin(ox + event.x - x, oy + event.y - y)
+            self.fit_mode = False
+        self.schedule_redraw()
+
+    def on_motion(self, event):
+        """状态栏显示鼠标下的像素坐标和颜色"""
+        near_split = self.comparing() and abs(event.x - self.split_x()) <= _SPLIT_GRAB
+        self.canvas.config(cursor="sb_h_double_arrow" if near_split else "fleur")
+        width, height = self.after_layer.size
+        u = int((event.x - self.origin[0]) / self.zoom)
+        v = int((event.y - self.origin[1]) / self.zoom)
+        text = f"{width}x{height}"
+        if 0 <= u < width and 0 <= v < height:
+            layer = self.after_layer
+            if self.comparing() and event.x < self.split_x():
+                layer = self.before_layer
+                u = u * layer.size[0] // width
+                v = v * layer.size[1] // height
+            text += f"  ({u}, {v})  {layer.image.getpixel((u, v))}"
+        self.status.config(text=text)
+
+    # ---------- 绘制 ----------
+
+    def schedule_redraw(self):
+        """合并短时间内的多次视图变化，只重绘一次"""
+        if self._redraw_job is None:
+            self._redraw_job = self.window.after(10, self.redraw)
+
+    def visible_tiles(self):
+        """可见的瓦片 (col, row)，从画布中心向外排序（先生成视线中心的瓦片）"""
+        canvas_w, canvas_h = self.canvas_size()
+        display_w, display_h = self.display_size()
+        ox, oy = self.origin
+        cols = range(max(0, -ox // TILE_SIZE), min(math.ceil(display_w / TILE_SIZE),
+                                                   (canvas_w - ox - 1) // TILE_SIZE + 1))
+        rows = range(max(0, -oy // TILE_SIZE), min(math.ceil(display_h / TILE_SIZE),
+                                                   (canvas_h - oy - 1) // TILE_SIZE + 1))
+        cx, cy = (canvas_w / 2 - ox) / TILE_SIZE - 0.5, (canvas_h / 2 - oy) / TILE_SIZE - 0.5
+        return sorted(((col, row) for row in rows for col in cols),
+                      key=lambda t: (t[0] - cx) ** 2 + (t[1] - cy) ** 2)
+
+    def tile_layers(self, col):
+        """第 col 列瓦片的内容：'after' / 'before' / 'split'（跨分割线）"""
+        if not self.comparing():
+            return 'after'
+        x0 = self.origin[0] + col * TILE_SIZE
+        split = self.split_x()
+        if x0 >= split:
+            return 'after'
+        if x0 + TILE_SIZE <= split:
+            return 'before'
+        return 'split'
+
+    def make_tile(self, col, row, layers):
+        display = self.display_size()
+        nearest = self.nearest.get()
+        if layers != 'split':
+            pyramid = self.after_layer if layers == 'after' else self.before_layer
+            return ImageTk.PhotoImage(render_tile(pyramid, display, col, row, nearest))
+        # 跨分割线的瓦片：左侧取原图、右侧取结果合成（不缓存，分割线移动后就失效）
+        tile = render_tile(self.after_layer, display, col, row, nearest)
+        before = render_tile(self.before_layer, display, col, row, nearest)
+        if before.mode != tile.mode:
+            before = before.convert(tile.mode)
+        cut = min(self.split_x() - (self.origin[0] + col * TILE_SIZE), tile.width)
+        tile = tile.copy()
+        tile.paste(before.crop((0, 0, cut, tile.height)), (0, 0))
+        return ImageTk.PhotoImage(tile)
+
+    def redraw(self):
+        """重绘可见区域：缓存中的瓦片立即画出，缺少的瓦片分批生成"""
+        self._redraw_job = None
+        if self._fill_job is not None:
+            self.window.after_cancel(self._fill_job)
+            self._fill_job = None
+        self.canvas.delete("all")
+        self._items = []
+        display = self.display_size()
+        nearest = self.nearest.get()
+
+        tiles = []
+        missing = []
+        for col, row in self.visible_tiles():
+            layers = self.tile_layers(col)
+            key = (layers, display, nearest, col, row)
+            photo = self.cache.get(key) if layers != 'split' else None
+            (tiles if photo is not None else missing).append((col, row, layers, key, photo))
+        if missing:
+            self.draw_preview()
+        for col, row, _, _, photo in tiles:
+            self.place(col, row, photo)
+        self._pending = missing
+        self.draw_overlay()
+        self.zoom_label.config(text=f"{self.zoom:.0%}")
+        if missing:
+            self._fill_job = self.window.after(1, self.fill)
+
+    def fill(self):
+        """生成一批缺少的瓦片，剩余的留到下一次空闲"""
+        self._fill_job = None
+        batch, self._pending = self._pending[:TILES_PER_BATCH], self._pending[TILES_PER_BATCH:]
+        for col, row, layers, key, _ in batch:
+            photo = self.make_tile(col, row, layers)
+            if layers != 'split':
+                self.cache.put(key, photo)
+            self.place(col, row, photo)
+        self.canvas.tag_raise("overlay")
+        if self._pending:
+            self._fill_job = self.window.after(1, self.fill)
+        else:
+            # 瓦片全部就位，去掉垫底的预览
+            self.canvas.delete("preview")
+
+    def place(self, col, row, photo):
+        ox, oy = self.origin
+        self.canvas.create_image(ox + col * TILE_SIZE, oy + row * TILE_SIZE, image=photo,
+                                 anchor=tk.NW, tags="tile")
+        self._items.append(photo)
+
+    def draw_preview(self):
+        """用粗糙两级的金字塔层快速画出整个可见区域，瓦片生成前垫底"""
+        canvas_w, canvas_h = self.canvas_size()
+        display = self.display_size()
+        ox, oy = self.origin
+        region = (-ox, -oy, canvas_w - ox, canvas_h - oy)
+        nearest = self.nearest.get()
+        preview = render_region(self.after_layer, display, region, nearest, coarse=2)
+        if preview is None:
+            return
+        if self.comparing():
+            cut = min(self.split_x() - max(ox, 0), preview.width)
+            if cut > 0:
+                before = render_region(self.before_layer, display, region, nearest, coarse=2)
+                if before.mode != preview.mode:
+                    before = before.convert(preview.mode)
+                preview.paste(before.crop((0, 0, cut, before.height)), (0, 0))
+        photo = ImageTk.PhotoImage(preview)
+        self.canvas.create_image(max(ox, 0), max(oy, 0), image=photo, anchor=tk.NW, tags="preview")
+        self._items.append(photo)
+
+    def draw_overlay(self):
+        if not self.comparing():
+            return
+        split = self.split_x()
+        canvas_h = self.canvas_size()[1]
+        self.canvas.create_line(split, 0, split, canvas_h, fill="white", width=2, tags="overlay")
+        for x, text, anchor in ((split - 8, "原图", tk.NE), (split + 8, "结果", tk.NW)):
+            self.canvas.create_text(x, 8, text=text, fill="white", anchor=anchor,
+                                    font=("Microsoft YaHei", 10, "bold"), tags="overlay")
+
+    def close(self):
+        for job in (self._redraw_job, self._fill_job):
+            if job is not None:
+                self.window.after_cancel(job)
+        self._redraw_job = self._fill_job = None
+        self.cache.clear()
+        self._items = []
+        self.window.destroy()
+
+
+def load_pyramids(path, before_path=None):
+    """
+    读入要查看的图像（和对比用的原图）并生成金字塔（耗时，可在后台线程中调用）
+
+    返回:
+        (结果金字塔, 原图金字塔或 None)
+    """
+    from pixel_art_ingest import load_image
+
+    # 按 EXIF 方向校正、转换到 sRGB，与处理结果的方向和颜色一致
+    after = ImagePyramid(load_image(path)).build()
+    before = ImagePyramid(load_image(before_path)).build() if before_path else None
+    return after, before
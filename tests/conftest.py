@@ -0,0 +1,6 @@
+"""测试配置：各模块是仓库根目录下的平铺文件，把根目录加入导入路径"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
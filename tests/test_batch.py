@@ -0,0 +1,133 @@
+"""增量批量处理：清单日志的合并与崩溃恢复"""
+
+import json
+import os
+
+import pytest
+
+pytest.importorskip('numpy')
+from PIL import Image
+
+import pixel_art_batch
+from pixel_art_batch import JOURNAL_SUFFIX, load_manifest, run_batch
+
+PARAMS = {'pixel_size': 4, 'scale_factor': 1}
+
+
+def _make_inputs(folder, names):
+    os.makedirs(folder, exist_ok=True)
+    for i, name in enumerate(names):
+        Image.new('RGB', (16, 16), (i * 40, 80, 160)).save(os.path.join(folder, name))
+
+
+def test_journal_compacted_after_run(tmp_path):
+    """运行结束后日志合并进清单并删除"""
+    src, dst = str(tmp_path / 'in'), str(tmp_path / 'out')
+    _make_inputs(src, ['a.png', 'b.png', 'c.png'])
+    plan = run_batch(src, dst, params=PARAMS, max_workers=2)
+    manifest_path = os.path.join(dst, pixel_art_batch.MANIFEST_NAME)
+    assert plan['failed'] == []
+    assert not os.path.exists(manifest_path + JOURNAL_SUFFIX)
+    with open(manifest_path, encoding='utf-8') as f:
+        assert sorted(json.load(f)['entries']) == ['a.png', 'b.png', 'c.png']
+
+    again = run_batch(src, dst, params=PARAMS)
+    assert again['todo'] == [] and len(again['unchanged']) == 3
+
+
+def test_journal_replayed_after_crash(tmp_path, monkeypatch):
+    """中途崩溃：已完成的文件从日志恢复，最后半行被忽略，重跑只处理剩下的"""
+    src, dst = str(tmp_path / 'in'), str(tmp_path / 'out')
+    _make_inputs(src, ['a.png', 'b.png', 'c.png'])
+    manifest_path = os.path.join(dst, pixel_art_batch.MANIFEST_NAME)
+
+    # 模拟进程被杀：结束时不写回清单，日志末尾留下半行
+    monkeypatch.setattr(pixel_art_batch, 'save_manifest', lambda manifest, path: None)
+    run_batch(src, dst, params=PARAMS, max_workers=1)
+    monkeypatch.undo()
+    journal_path = manifest_path + JOURNAL_SUFFIX
+    with open(journal_path, encoding='utf-8') as f:
+        lines = f.readlines()
+    with open(journal_path, 'w', encoding='utf-8') as f:
+        f.writelines(lines[:2])
+        f.write(lines[2][:10])
+    assert sorted(load_manifest(manifest_path)['entries']) == ['a.png', 'b.png']
+
+    plan = run_batch(src, dst, params=PARAMS)
+    assert [rel for rel, _ in plan['todo']] == ['c.png']
+    assert len(plan['unchanged']) == 2
+    assert not os.path.exists(journal_path)
+
+
+def test_output_clash_reported_by_cli(tmp_path, capsys):
+    """输出文件名冲突：命令行打印错误而不是抛出异常"""
+    from pixel_art_converter import main
+
+    src, dst = str(tmp_path / 'in'), str(tmp_path / 'out')
+    _make_inputs(src, ['x.png', 'x.jpg'])
+    with pytest.raises(SystemExit) as excinfo:
+        main(['--batch', src, dst])
+    assert excinfo.value.code == 1
+    assert '错误: 以下输入会写到同一个输出文件' in capsys.readouterr().out
+
+
+def test_palette_edit_reprocesses(tmp_path):
+    """调色板文件内容变化时重新生成全部输出"""
+    src, dst = str(tmp_path / 'in'), str(tmp_path / 'out')
+    _make_inputs(src, ['a.png', 'b.png'])
+    palette = tmp_path / 'pal.hex'
+    palette.write_text("000000\nFFFFFF\n", encoding='utf-8')
+    params = dict(PARAMS, palette=str(palette))
+    run_batch(src, dst, params=params)
+    assert run_batch(src, dst, params=params)['todo'] == []
+
+    palette.write_text("000000\nFF0000\n", encoding='utf-8')
+    plan = run_batch(src, dst, params=params)
+    assert sorted(rel for rel, _ in plan['changed']) == ['a.png', 'b.png']
+
+
+def test_output_inside_input_is_skipped(tmp_path):
+    """输出目录位于输入目录之内时，输出不会被当成新的输入"""
+    src = str(tmp_path / 'in')
+    dst = os.path.join(src, 'out')
+    _make_inputs(src, ['a.png'])
+    run_batch(src, dst, params=PARAMS)
+    again = run_batch(src, dst, params=PARAMS)
+    assert again['new'] == [] and len(again['unchanged']) == 1
+
+
+def test_partial_removed_on_failure(tmp_path, monkeypatch):
+    """写出失败时不留下 .partial 临时文件"""
+    src, dst = str(tmp_path / 'in'), str(tmp_path / 'out')
+    _make_inputs(src, ['a.png'])
+
+    def broken_save(img, path):
+        with open(path, 'wb') as f:
+            f.write(b'half')
+        raise OSError("磁盘已满")
+
+    monkeypatch.setattr(pixel_art_batch, 'save_image', broken_save)
+    plan = run_batch(src, dst, params=PARAMS)
+    assert plan['failed'] == ['a.png']
+    assert os.listdir(dst) == [pixel_art_batch.MANIFEST_NAME]
+
+
+def test_interrupt_saves_manifest(tmp_path, monkeypatch):
+    """中断：已完成的文件写回清单，日志被合并"""
+    src, dst = str(tmp_path / 'in'), str(tmp_path / 'out')
+    _make_inputs(src, ['a.png', 'b.png', 'c.png', 'd.png'])
+    process = pixel_art_batch._process_one
+
+    def interrupted(src_path, dst_path, op, params):
+        if src_path.endswith('b.png'):
+            raise KeyboardInterrupt
+        process(src_path, dst_path, op, params)
+
+    monkeypatch.setattr(pixel_art_batch, '_process_one', interrupted)
+    with pytest.raises(KeyboardInterrupt):
+        run_batch(src, dst, params=PARAMS, max_workers=1)
+    manifest_path = os.path.join(dst, pixel_art_batch.MANIFEST_NAME)
+    assert not os.path.exists(manifest_path + JOURNAL_SUFFIX)
+    with open(manifest_path, encoding='utf-8') as f:
+        entries = json.load(f)['entries']
+    assert 'a.png' in entries and 'b.png' not in entries
@@ -0,0 +1,31 @@
+"""命令行：文件不存在等错误打印为一行提示并以退出码 1 结束，而不是抛出异常"""
+
+import pytest
+
+from pixel_art_converter import main
+
+
+def _fails_cleanly(argv, capsys):
+    with pytest.raises(SystemExit) as excinfo:
+        main(argv)
+    assert excinfo.value.code == 1
+    out = capsys.readouterr().out
+    assert '错误: ' in out
+    return out
+
+
+def test_job_file_missing(tmp_path, capsys):
+    _fails_cleanly(['--job', str(tmp_path / 'missing.json')], capsys)
+
+
+def test_job_input_missing(tmp_path, capsys):
+    job = tmp_path / 'job.json'
+    job.write_text('{"input": "%s", "steps": [{"op": "pixelate", "output": "%s"}]}'
+                   % ((tmp_path / 'missing.png').as_posix(), (tmp_path / 'out.png').as_posix()),
+                   encoding='utf-8')
+    _fails_cleanly(['--job', str(job)], capsys)
+
+
+def test_sweep_input_missing(tmp_path, capsys):
+    _fails_cleanly([str(tmp_path / 'missing.png'), str(tmp_path / 'out.png'),
+                    '--sweep', str(tmp_path / 'sheet.png')], capsys)
@@ -0,0 +1,77 @@
+"""保边去噪：条带处理与整图处理逐位一致、边缘延伸、常数图原样通过"""
+
+import pytest
+
+np = pytest.importorskip('numpy')
+from PIL import Image
+
+import pixel_art_denoise
+from pixel_art_denoise import GUIDED_EPS, GUIDED_RADIUS, NLM_H, NLM_PATCH, NLM_SEARCH, NLM_SIGMA, denoise
+
+CASES = [(method, luma_only) for method in ('guided', 'nlm') for luma_only in (False, True)]
+
+
+def _noisy(size, seed=0):
+    """渐变加噪声：既有平坦区域也有边缘"""
+    rng = np.random.default_rng(seed)
+    w, h = size
+    base = np.zeros((h, w, 3))
+    base[:, w // 2:] = 160
+    base += np.linspace(0, 80, h)[:, None, None]
+    return Image.fromarray(np.clip(base + rng.normal(0, 12, (h, w, 3)), 0, 255).astype(np.uint8))
+
+
+def _whole_frame(img, method, luma_only):
+    """参考实现：整图按边缘延伸填充后一次滤波（不分条带）"""
+    a = np.asarray(img.convert('RGB'))
+    if method == 'guided':
+        halo = 2 * GUIDED_RADIUS
+
+        def func(plane):
+            return pixel_art_denoise._guided(plane, GUIDED_RADIUS, GUIDED_EPS)
+    else:
+        halo = NLM_SEARCH + NLM_PATCH
+        weights = pixel_art_denoise._nlm_weights(NLM_SEARCH, NLM_PATCH, NLM_H, NLM_SIGMA)
+
+        def func(plane):
+            return pixel_art_denoise._nlm(plane, NLM_SEARCH, NLM_PATCH, weights)
+
+    padded = np.pad(a, ((halo, halo), (halo, halo), (0, 0)), mode='edge')
+    if luma_only:
+        y = pixel_art_denoise.luma(padded)
+        delta = func(y).astype(np.int16) - y[halo:-halo, halo:-halo]
+        return np.clip(a + delta[..., None], 0, 255).astype(np.uint8)
+    return np.stack([func(padded[..., band].astype(np.int32)) for band in range(3)], axis=-1)
+
+
+@pytest.mark.parametrize('method,luma_only', CASES)
+@pytest.mark.parametrize('strip_height', [1, 7, 64])
+def test_strips_match_single_strip(monkeypatch, method, luma_only, strip_height):
+    """分成多条处理的结果与整幅作为一条（STRIP_HEIGHT 不小于高度）完全相同"""
+    img = _noisy((53, 150), seed=1)
+    monkeypatch.setattr(pixel_art_denoise, 'STRIP_HEIGHT', img.height)
+    single = np.asarray(denoise(img, method, luma_only))
+    monkeypatch.setattr(pixel_art_denoise, 'STRIP_HEIGHT', strip_height)
+    strips = np.asarray(denoise(img, method, luma_only))
+    assert np.array_equal(strips, single)
+    assert np.array_equal(single, _whole_frame(img, method, luma_only))
+    # 确实去掉了一部分噪声
+    assert not np.array_equal(single, np.asarray(img))
+
+
+@pytest.mark.parametrize('method,luma_only', CASES)
+@pytest.mark.parametrize('size', [(1, 1), (2, 1), (1, 2), (2, 2), (5, 2), (2, 5)])
+def test_tiny_images_edge_padding(method, luma_only, size):
+    """1-2 像素的图：条带四周的延伸与整图按 np.pad(mode='edge') 延伸相同"""
+    img = _noisy(size, seed=2)
+    out = denoise(img, method, luma_only)
+    assert out.size == img.size and out.mode == 'RGB'
+    assert np.array_equal(np.asarray(out), _whole_frame(img, method, luma_only))
+
+
+@pytest.mark.parametrize('method,luma_only', CASES)
+@pytest.mark.parametrize('color', [(0, 0, 0), (255, 255, 255), (37, 128, 201)])
+def test_constant_image_unchanged(method, luma_only, color):
+    """常数图没有可去的噪声，原样输出"""
+    img = Image.new('RGB', (40, 90), color)
+    assert np.array_equal(np.asarray(denoise(img, method, luma_only)), np.asarray(img))
@@ -0,0 +1,75 @@
+"""抖动：OKLab / CIELAB 调色板的映射和误差扩散在该色彩空间中进行"""
+
+import pytest
+
+np = pytest.importorskip('numpy')
+from PIL import Image
+
+from pixel_art_colorspace import rgb_to_oklab, to_space
+from pixel_art_converter import quantize_colors
+from pixel_art_dither import FLOYD_STEINBERG_KERNEL, DIFFUSION_KERNELS, dither_to_palette
+from pixel_art_palette import Palette
+
+COLORS = [(0, 0, 0), (255, 255, 255), (220, 40, 40), (40, 160, 60), (40, 60, 200),
+          (240, 200, 60), (120, 120, 120), (200, 120, 180)]
+
+
+def _photo(size=(48, 32), seed=0):
+    rng = np.random.default_rng(seed)
+    return Image.fromarray(rng.integers(0, 256, (size[1], size[0], 3), dtype=np.uint8))
+
+
+def _brute_force(pixels, points):
+    """逐像素在全部调色板颜色中找欧氏距离最近者（float64）"""
+    d = ((pixels.astype(np.float64)[..., None, :] - points.astype(np.float64)) ** 2).sum(-1)
+    return np.argmin(d, axis=-1)
+
+
+def _sequential_diffusion(values, points, kernel):
+    """逐像素按光栅顺序扩散误差的参考实现（只用于一行或一列的图，此时与波前顺序相同）"""
+    buf = values.astype(np.float32).copy()
+    height, width = buf.shape[:2]
+    index = np.zeros((height, width), dtype=np.int64)
+    for y in range(height):
+        for x in range(width):
+            idx = int(_brute_force(buf[y, x][None], points)[0])
+            index[y, x] = idx
+            err = buf[y, x] - points[idx]
+            for dy, dx, weight in kernel:
+                if 0 <= y + dy < height and 0 <= x + dx < width:
+                    buf[y + dy, x + dx] += err * weight
+    return index
+
+
+@pytest.mark.parametrize('space', ['oklab', 'lab'])
+def test_non_enhance_quantize_maps_in_space(space):
+    """不抖动时每个像素取该空间中最近的调色板颜色"""
+    img = _photo()
+    out = np.asarray(quantize_colors(img, 8, enhance_mode=False, dither='none', space=space))
+    palette = Palette.fit(img, 8, space)
+    nearest = palette.colors[_brute_force(to_space(np.asarray(img), space), palette.points)]
+    assert np.array_equal(out, nearest)
+
+
+@pytest.mark.parametrize('method', ['floyd-steinberg', 'atkinson', 'sierra-lite', 'jarvis'])
+@pytest.mark.parametrize('shape', [(40, 1), (1, 40)])
+def test_error_diffusion_in_oklab(method, shape):
+    """误差在 OKLab 中累积，最近颜色在 OKLab 中求（与逐像素的暴力搜索一致）"""
+    img = _photo(shape, seed=1)
+    palette = Palette(COLORS, space='oklab', cache=False)
+    out = dither_to_palette(img, palette.colors, method, palette=palette)
+    kernel = DIFFUSION_KERNELS.get(method, FLOYD_STEINBERG_KERNEL)
+    expected = _sequential_diffusion(rgb_to_oklab(np.asarray(img)), palette.points, kernel)
+    assert np.array_equal(np.asarray(out), expected)
+
+
+def test_default_non_enhance_dither_uses_space():
+    """非增强模式的默认抖动（Floyd–Steinberg）不再退回 RGB 距离"""
+    img = _photo((64, 48), seed=2)
+    palette = Palette(COLORS, space='oklab', cache=False)
+    oklab = np.asarray(dither_to_palette(img, palette.colors, 'floyd-steinberg', palette=palette))
+    rgb = np.asarray(img.quantize(palette=palette.to_image(), dither=Image.Dither.FLOYDSTEINBERG))
+    assert not np.array_equal(oklab, rgb)
+    # 首个像素没有累积误差，即 OKLab 中的最近颜色
+    first = _brute_force(rgb_to_oklab(np.asarray(img)[:1, :1]), palette.points)
+    assert oklab[0, 0] == first[0, 0]
@@ -0,0 +1,83 @@
+"""缩放 / 滤波引擎（pixel_art_engine）的各后端与 Pillow 逐位一致"""
+
+import pytest
+from PIL import Image, ImageFilter
+
+import pixel_art_engine
+
+np = pytest.importorskip('numpy')
+
+ALTERNATIVES = [name for name in pixel_art_engine.BACKENDS if name != 'pillow']
+
+# (输入尺寸, 输出尺寸)：整数与非整数比例、缩小与放大、宽 / 高 / 极端长宽比、1 像素
+RESIZE_SHAPES = [
+    ((320, 240), (118, 88)),
+    ((320, 240), (80, 60)),
+    ((97, 61), (223, 140)),
+    ((64, 64), (192, 192)),
+    ((1000, 7), (333, 3)),
+    ((7, 1000), (2, 401)),
+    ((1537, 33), (64, 1)),
+    ((3, 2), (17, 29)),
+    ((1, 1), (5, 3)),
+]
+
+MEDIAN_SIZES = [(320, 240), (61, 97), (1000, 3), (3, 1000), (2, 2), (1, 1)]
+
+MODES = ('RGB', 'L')
+
+
+def _image(size, mode, seed=0):
+    rng = np.random.default_rng(seed)
+    shape = (size[1], size[0], 3) if mode == 'RGB' else (size[1], size[0])
+    return Image.fromarray(rng.integers(0, 256, shape, dtype=np.uint8), mode)
+
+
+def _backend(name):
+    impl = pixel_art_engine.backend(name)
+    if impl is None:
+        pytest.skip(f"后端 {name} 不可用（未安装对应的库）")
+    return impl
+
+
+def _op(src, dst):
+    direction = 'up' if dst[0] * dst[1] > src[0] * src[1] else 'down'
+    return f"resize:nearest:{direction}"
+
+
+@pytest.mark.parametrize('mode', MODES)
+@pytest.mark.parametrize('src, dst', RESIZE_SHAPES)
+@pytest.mark.parametrize('name', ALTERNATIVES)
+def test_resize_nearest_matches_pillow(name, src, dst, mode):
+    impl = _backend(name)
+    if not impl['supports'](_op(src, dst)):
+        pytest.skip(f"后端 {name} 不提供最近邻缩放")
+    img = _image(src, mode)
+    expected = np.asarray(img.resize(dst, Image.NEAREST))
+    assert np.array_equal(np.asarray(impl['resize'](img, dst, Image.NEAREST)), expected)
+
+
+@pytest.mark.parametrize('mode', MODES)
+@pytest.mark.parametrize('size', MEDIAN_SIZES)
+@pytest.mark.parametrize('name', ALTERNATIVES)
+def test_median_matches_pillow(name, size, mode):
+    impl = _backend(name)
+    if not impl['supports']('median:3'):
+        pytest.skip(f"后端 {name} 不提供中值滤波")
+    img = _image(size, mode)
+    expected = np.asarray(img.filter(ImageFilter.MedianFilter(3)))
+    assert np.array_equal(np.asarray(impl['median'](img, 3)), expected)
+
+
+@pytest.mark.parametrize('seed', range(20))
+@pytest.mark.parametrize('name', ALTERNATIVES)
+def test_resize_nearest_random_shapes(name, seed):
+    rng = np.random.default_rng(seed)
+    src = (int(rng.integers(1, 700)), int(rng.integers(1, 700)))
+    dst = (int(rng.integers(1, 1400)), int(rng.integers(1, 1400)))
+    impl = _backend(name)
+    if not impl['supports'](_op(src, dst)):
+        pytest.skip(f"后端 {name} 不提供最近邻缩放")
+    img = _image(src, 'RGB', seed)
+    expected = np.asarray(img.resize(dst, Image.NEAREST))
+    assert np.array_equal(np.asarray(impl['resize'](img, dst, Image.NEAREST)), expected), (src, dst)
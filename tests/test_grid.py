@@ -0,0 +1,38 @@
+"""像素网格检测（pixel_art_converter.detect_block_grid / analyze_content）"""
+
+import pytest
+from PIL import Image
+
+np = pytest.importorskip('numpy')
+
+from pixel_art_converter import analyze_content, detect_block_grid  # noqa: E402
+
+
+def _grid(native, block, seed=0):
+    rng = np.random.default_rng(seed)
+    small = Image.fromarray(rng.integers(0, 256, (native[1], native[0], 3), dtype=np.uint8))
+    return small.resize((native[0] * block[0], native[1] * block[1]), Image.NEAREST)
+
+
+@pytest.mark.parametrize('native, block', [((40, 30), (10, 10)), ((7, 300), (3, 2)), ((500, 3), (2, 5))])
+def test_many_color_grid_is_detected(native, block):
+    img = _grid(native, block)
+    assert img.getcolors(256) is None
+    assert detect_block_grid(img) == block
+    info = analyze_content(img, color_reduction=64)
+    assert info['grid'] == block and info['fast_path']
+
+
+def test_noise_is_not_a_grid():
+    rng = np.random.default_rng(1)
+    img = Image.fromarray(rng.integers(0, 256, (240, 320, 3), dtype=np.uint8))
+    assert detect_block_grid(img) is None
+    assert not analyze_content(img, color_reduction=64)['fast_path']
+
+
+def test_probe_agrees_with_full_scan():
+    """抽查只用于提前排除：网格只在少数行列之外被打破时，结果仍按整图计算"""
+    img = _grid((32, 24), (4, 4))
+    a = np.asarray(img).copy()
+    a[13, 51] = 255 - a[13, 51]  # 不在抽查的行列上的单个像素
+    assert detect_block_grid(Image.fromarray(a)) is None
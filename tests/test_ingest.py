@@ -0,0 +1,207 @@
+"""图片读入：EXIF 方向与先转置整图逐位一致、ICC 色彩转换、元数据写入输出"""
+
+import io
+import struct
+
+import pytest
+
+np = pytest.importorskip('numpy')
+ImageCms = pytest.importorskip('PIL.ImageCms')
+from PIL import Image, ImageOps
+
+from pixel_art_converter import (
+    apply_pixel_art,
+    apply_quality_enhance,
+    convert_to_pixel_art,
+    enhance_image_quality,
+)
+from pixel_art_ingest import ORIENTATION_TAG, STORED_FLIPS, TRANSPOSES, Ingest
+
+# EXIF 中随方向一起写入的其他标签（Make、ImageDescription）
+MAKE_TAG = 0x010F
+DESCRIPTION_TAG = 0x010E
+
+
+def _photo(size=(101, 67), seed=0):
+    """渐变、色块加噪声：尺寸除不尽网格，缩小时各方向的取样位置都不对称"""
+    rng = np.random.default_rng(seed)
+    w, h = size
+    base = np.zeros((h, w, 3))
+    base[:, w // 3:] = (150, 60, 20)
+    base[h // 2:, :w // 2] += (0, 90, 140)
+    base += np.linspace(0, 90, w)[None, :, None]
+    return Image.fromarray(np.clip(base + rng.normal(0, 15, (h, w, 3)), 0, 255).astype(np.uint8))
+
+
+def _icc_profile(description='Wide Gamut Test'):
+    """
+    最小的 ICC v2 显示器配置文件：Display P3 原色（D50 适配）+ gamma 2.2
+
+    ImageCms 只能生成 sRGB / LAB / XYZ 配置文件，这里手工拼出一个非 sRGB 的 RGB 配置文件。
+    """
+    def s15(v):
+        return struct.pack('>i', round(v * 65536))
+
+    def xyz(x, y, z):
+        return b'XYZ ' + b'\0' * 4 + s15(x) + s15(y) + s15(z)
+
+    ascii_ = description.encode('ascii') + b'\0'
+    desc = (b'desc' + b'\0' * 4 + struct.pack('>I', len(ascii_)) + ascii_
+            + b'\0' * 8 + b'\0' * 3 + b'\0' * 67)
+    curve = b'curv' + b'\0' * 4 + struct.pack('>IH', 1, round(2.2 * 256)) + b'\0' * 2
+    tags = [
+        (b'desc', desc),
+        (b'wtpt', xyz(0.9642, 1.0, 0.8249)),
+        (b'rXYZ', xyz(0.5151, 0.2412, -0.0011)),
+        (b'gXYZ', xyz(0.2920, 0.6922, 0.0419)),
+        (b'bXYZ', xyz(0.1571, 0.0666, 0.7841)),
+        (b'rTRC', curve),
+        (b'gTRC', curve),
+        (b'bTRC', curve),
+        (b'cprt', b'text' + b'\0' * 4 + b'none\0' + b'\0' * 3),
+    ]
+    offset = 128 + 4 + 12 * len(tags)
+    table, data = b'', b''
+    for sig, body in tags:
+        body += b'\0' * (-len(body) % 4)
+        table += sig + struct.pack('>II', offset + len(data), len(body))
+        data += body
+    size = offset + len(data)
+    header = (struct.pack('>I', size) + b'\0' * 4 + struct.pack('>I', 0x02100000) + b'mntrRGB XYZ '
+              + b'\0' * 12 + b'acsp' + b'\0' * 24 + b'\0' * 4 + s15(0.9642) + s15(1.0) + s15(0.8249)
+              + b'\0' * 48)
+    return header + struct.pack('>I', len(tags)) + table + data
+
+
+def _colors(img):
+    """图像中出现的全部颜色"""
+    return {tuple(c) for c in np.asarray(img).reshape(-1, 3)}
+
+
+def _srgb_profile():
+    return ImageCms.ImageCmsProfile(ImageCms.createProfile('sRGB')).tobytes()
+
+
+def _exif(orientation):
+    exif = Image.Exif()
+    exif[ORIENTATION_TAG] = orientation
+    exif[MAKE_TAG] = 'TestCam'
+    exif[DESCRIPTION_TAG] = 'ingest test'
+    return exif.tobytes()
+
+
+def _jpeg(img, orientation):
+    """写成带 EXIF 方向的 JPEG 并重新打开"""
+    buffer = io.BytesIO()
+    img.save(buffer, 'JPEG', exif=_exif(orientation), quality=95)
+    buffer.seek(0)
+    return Image.open(buffer)
+
+
+def test_stored_flips_match_transposes():
+    """STORED_FLIPS 与各方向的转置一致：原始方向上反向的轴在校正后仍是反向的"""
+    w, h = 5, 3
+    coords = np.arange(w * h, dtype=np.uint8).reshape(h, w)
+    for orientation, method in TRANSPOSES.items():
+        out = np.asarray(Image.fromarray(coords).transpose(method))
+        flip_x, flip_y = STORED_FLIPS[orientation]
+        xs, ys = out.astype(np.int64) % w, out.astype(np.int64) // w
+        swapped = orientation >= 5
+        # 沿校正后对应的轴前进时，原始坐标递增（不反向）还是递减（反向）
+        x_step = np.sign(np.diff(xs, axis=0 if swapped else 1)).ravel()
+        y_step = np.sign(np.diff(ys, axis=1 if swapped else 0)).ravel()
+        assert set(x_step) == {-1 if flip_x else 1}
+        assert set(y_step) == {-1 if flip_y else 1}
+
+
+PIXEL_ART_CASES = [
+    {},
+    {'enhance_mode': False},
+    {'color_reduction': 8},
+    {'downsample': 'mean'},
+    {'downsample': 'mode', 'enhance_mode': False},
+    {'interpolation': 'lanczos', 'pixel_size': 24},
+]
+
+
+@pytest.mark.parametrize('orientation', range(2, 9))
+@pytest.mark.parametrize('params', PIXEL_ART_CASES)
+def test_pixel_art_orientation_matches_exif_transpose(orientation, params):
+    """在原始方向上缩小再转置网格，与先 exif_transpose 整图再转换逐位一致"""
+    params = dict({'pixel_size': 16, 'scale_factor': 1, 'fast_path': False}, **params)
+    out = apply_pixel_art(_jpeg(_photo(), orientation), **params)
+    reference = apply_pixel_art(ImageOps.exif_transpose(_jpeg(_photo(), orientation)),
+                                ingest=False, **params)
+    assert out.size == reference.size
+    assert np.array_equal(np.asarray(out), np.asarray(reference))
+
+
+@pytest.mark.parametrize('orientation', range(2, 9))
+@pytest.mark.parametrize('params', [{}, {'denoise': 'nlm'}, {'denoise': 'median', 'upscale_factor': 2.0},
+                                    {'sharpen_mode': 'luma'}])
+def test_enhance_orientation_matches_exif_transpose(orientation, params):
+    """画质增强在去噪之后转置，与先 exif_transpose 整图再增强逐位一致"""
+    img = _photo((61, 37), seed=1)
+    out = apply_quality_enhance(_jpeg(img, orientation), **params)
+    reference = apply_quality_enhance(ImageOps.exif_transpose(_jpeg(img, orientation)),
+                                      ingest=False, **params)
+    assert np.array_equal(np.asarray(out), np.asarray(reference))
+
+
+def test_non_srgb_icc_converted():
+    """非 sRGB 的 ICC 配置文件转换到 sRGB；sRGB 配置文件不转换"""
+    profile = _icc_profile()
+    img = Image.new('RGB', (40, 30), (0, 200, 0))
+    expected = ImageCms.profileToProfile(
+        img, ImageCms.ImageCmsProfile(io.BytesIO(profile)), ImageCms.createProfile('sRGB')
+    ).getpixel((0, 0))
+    assert expected != (0, 200, 0)
+
+    tagged = img.copy()
+    tagged.info['icc_profile'] = profile
+    assert Ingest(tagged).transform is not None
+    pixel_art = apply_pixel_art(tagged, pixel_size=8, scale_factor=1, enhance_mode=False)
+    assert _colors(pixel_art) == {expected}
+    enhanced = apply_quality_enhance(tagged, sharpness=1.0, contrast=1.0, saturation=1.0,
+                                     denoise=False)
+    assert _colors(enhanced) == {expected}
+    untouched = apply_pixel_art(tagged, pixel_size=8, scale_factor=1, enhance_mode=False,
+                                ingest=False)
+    assert _colors(untouched) == {(0, 200, 0)}
+
+    srgb = img.copy()
+    srgb.info['icc_profile'] = _srgb_profile()
+    assert Ingest(srgb).transform is None
+
+
+@pytest.mark.parametrize('suffix', ['.png', '.jpg'])
+def test_keep_metadata_round_trip(tmp_path, suffix):
+    """keep_metadata：EXIF（方向重置为 1）、ICC（已转换时为 sRGB）和 DPI 写入输出"""
+    src = tmp_path / 'in.jpg'
+    _photo().save(src, 'JPEG', exif=_exif(6), icc_profile=_icc_profile(), dpi=(300, 300))
+    out = tmp_path / f"out{suffix}"
+    convert_to_pixel_art(str(src), str(out), pixel_size=16, keep_metadata=True)
+    with Image.open(out) as result:
+        assert result.size == (67, 101)
+        exif = result.getexif()
+        assert exif[ORIENTATION_TAG] == 1
+        assert exif[MAKE_TAG] == 'TestCam' and exif[DESCRIPTION_TAG] == 'ingest test'
+        assert result.info['icc_profile'] == _srgb_profile()
+        assert tuple(round(v) for v in result.info['dpi']) == (300, 300)
+
+    plain = tmp_path / f"plain{suffix}"
+    convert_to_pixel_art(str(src), str(plain), pixel_size=16, keep_metadata=False)
+    with Image.open(plain) as result:
+        assert ORIENTATION_TAG not in result.getexif()
+        assert 'icc_profile' not in result.info
+
+
+def test_keep_metadata_passes_unconverted_profile(tmp_path):
+    """不需要转换的配置文件原样写入；画质增强同样保留元数据"""
+    src = tmp_path / 'in.jpg'
+    _photo().save(src, 'JPEG', exif=_exif(1), icc_profile=_srgb_profile())
+    out = tmp_path / 'out.png'
+    enhance_image_quality(str(src), str(out), denoise=False, keep_metadata=True)
+    with Image.open(out) as result:
+        assert result.info['icc_profile'] == _srgb_profile()
+        assert result.getexif()[MAKE_TAG] == 'TestCam'
@@ -0,0 +1,67 @@
+"""性能分析：统计文件、折叠栈、可重放的任务描述都写出；命令行错误以退出码 1 结束"""
+
+import json
+import os
+
+import pytest
+from PIL import Image
+
+from pixel_art_profile import START_STAGE, main, profile_job, replay
+
+
+def _job(tmp_path):
+    """增强 + 像素化的小任务（噪声图不走快速路径，耗时足够采到调用栈）"""
+    src = tmp_path / 'photo.png'
+    Image.merge('RGB', [Image.effect_noise((320, 240), 40 + 10 * band) for band in range(3)]).save(src)
+    return {
+        'input': src.as_posix(),
+        'steps': [
+            {'id': 'enh', 'op': 'enhance'},
+            {'id': 'px', 'op': 'pixelate', 'pixel_size': 16,
+             'output': (tmp_path / 'photo_pixel.png').as_posix()},
+        ],
+    }
+
+
+def _roots(folded):
+    """折叠栈每行的根帧（去掉方括号）"""
+    with open(folded, encoding='utf-8') as f:
+        return {line.rsplit(' ', 1)[0].split(';', 1)[0][1:-1] for line in f if line.strip()}
+
+
+def test_profile_and_replay(tmp_path):
+    """写出 .prof / .folded / .json，折叠栈的根为阶段名，写出的 .json 可以重放"""
+    out_dir = tmp_path / 'profiles'
+    result = profile_job(_job(tmp_path), str(out_dir), name='photo', interval=0.001)
+    for key, ext in (('stats', '.prof'), ('folded', '.folded'), ('spec', '.json')):
+        assert result[key] == os.path.join(str(out_dir), 'photo' + ext)
+        assert os.path.getsize(result[key]) > 0
+    assert os.path.exists(tmp_path / 'photo_pixel.png')
+
+    stages = [stage['stage'] for stage in result['stages']]
+    assert stages[0] == START_STAGE and len(stages) > 1
+    roots = _roots(result['folded'])
+    assert roots and roots <= set(stages)
+
+    with open(result['spec'], encoding='utf-8') as f:
+        saved = json.load(f)
+    assert saved['profile']['status'] == 'ok'
+    assert [s['stage'] for s in saved['profile']['stages']] == stages
+
+    os.remove(tmp_path / 'photo_pixel.png')
+    replayed = replay(result['spec'], out_dir=str(tmp_path / 'replay'))
+    assert os.path.exists(replayed['spec']) and os.path.exists(replayed['folded'])
+    assert os.path.exists(tmp_path / 'photo_pixel.png')
+
+
+@pytest.mark.parametrize('spec', ['missing.json', 'photo_missing.json'])
+def test_main_errors_exit_cleanly(tmp_path, capsys, spec):
+    """任务描述或其中的输入不存在：打印一行错误并以退出码 1 结束"""
+    job = _job(tmp_path)
+    job['input'] = (tmp_path / 'missing.png').as_posix()
+    with open(tmp_path / 'photo_missing.json', 'w', encoding='utf-8') as f:
+        json.dump(job, f)
+    with pytest.raises(SystemExit) as excinfo:
+        main([str(tmp_path / spec), '--out', str(tmp_path / 'profiles')])
+    assert excinfo.value.code == 1
+    assert '错误: ' in capsys.readouterr().out
@@ -0,0 +1,89 @@
+"""图像序列：帧顺序、重复帧复用，以及静止序列与单张转换的结果一致"""
+
+import io
+import os
+
+import pytest
+
+np = pytest.importorskip('numpy')
+from PIL import Image
+
+from pixel_art_converter import apply_pixel_art
+from pixel_art_sequence import directory_frames, process_sequence, raw_frames, run_sequence
+
+
+def _photo(size=(64, 48), seed=0):
+    """带渐变和噪声的小图，保证缩小、量化都有实际内容"""
+    rng = np.random.default_rng(seed)
+    w, h = size
+    ramp = np.linspace(0, 255, w)[None, :, None] * np.array([1.0, 0.6, 0.3])
+    noise = rng.normal(0, 24, (h, w, 3))
+    return Image.fromarray(np.clip(ramp + noise, 0, 255).astype(np.uint8))
+
+
+def _collect(frames, **params):
+    out = []
+    stats = process_sequence(frames, lambda name, data: out.append((name, data)),
+                             max_workers=2, window=2, **params)
+    return out, stats
+
+
+def _decode(data):
+    with Image.open(io.BytesIO(data)) as img:
+        return np.asarray(img.convert('RGB'))
+
+
+def test_directory_frames_natural_order(tmp_path):
+    """文件名中的数字按数值排序，非图片文件被忽略"""
+    for name in ['frame_10.png', 'frame_2.png', 'frame_1.png', 'notes.txt']:
+        (tmp_path / name).write_bytes(b'')
+    names = [name for name, _ in directory_frames(str(tmp_path))]
+    assert names == ['frame_1.png', 'frame_2.png', 'frame_10.png']
+
+
+def test_output_order_and_reuse(tmp_path):
+    """输出严格按输入顺序；与上一帧相同的帧复用已渲染的结果"""
+    a, b = _photo(seed=1), _photo(seed=2)
+    for i, img in enumerate([a, a, b, b, a], 1):
+        img.save(tmp_path / f"f_{i}.png")
+    out_dir = tmp_path / 'out'
+    stats = run_sequence(str(tmp_path), str(out_dir), pixel_size=16, scale_factor=1,
+                         max_workers=3, window=2)
+    assert stats['frames'] == 5 and stats['reused'] == 2
+    assert sorted(os.listdir(out_dir)) == [f"f_{i}.png" for i in range(1, 6)]
+    results = [np.asarray(Image.open(out_dir / f"f_{i}.png")) for i in range(1, 6)]
+    assert np.array_equal(results[0], results[1])
+    assert np.array_equal(results[2], results[3])
+    assert np.array_equal(results[0], results[4])
+    assert not np.array_equal(results[0], results[2])
+
+
+def test_raw_frames_in_order():
+    """原始帧流按顺序切分，不完整的末帧报错"""
+    frames = [_photo((8, 4), seed=i) for i in range(3)]
+    stream = io.BytesIO(b''.join(img.tobytes() for img in frames))
+    out, stats = _collect(raw_frames(stream, (8, 4)), pixel_size=8, scale_factor=1,
+                          raw_output=True)
+    assert [name for name, _ in out] == ['frame_000001', 'frame_000002', 'frame_000003']
+    assert stats['frames'] == 3
+
+    with pytest.raises(ValueError):
+        list(raw_frames(io.BytesIO(b'\0' * 10), (8, 4)))
+
+
+@pytest.mark.parametrize('params', [
+    {'enhance_mode': True},
+    {'enhance_mode': False},
+    {'enhance_mode': True, 'downsample': 'median'},
+    {'enhance_mode': True, 'color_reduction': 8, 'quantize_space': 'oklab'},
+    {'enhance_mode': False, 'color_reduction': 8, 'quantize_space': 'oklab', 'dither': 'none'},
+])
+def test_static_sequence_matches_apply_pixel_art(params):
+    """静止序列的每一帧都与 apply_pixel_art 对同一张图的结果完全相同"""
+    img = _photo((96, 64), seed=3)
+    params = dict(params, pixel_size=24, scale_factor=3)
+    expected = np.asarray(apply_pixel_art(img, fast_path=False, **params))
+    out, stats = _collect([(f"f{i}", lambda: img.copy()) for i in range(3)], **params)
+    assert stats['reused'] == 2
+    for _, data in out:
+        assert np.array_equal(_decode(data), expected)
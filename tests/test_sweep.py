@@ -0,0 +1,115 @@
+"""参数扫描：每个组合的结果与用同样参数单次转换的结果一致"""
+
+import io
+import os
+
+import pytest
+
+np = pytest.importorskip('numpy')
+from PIL import Image
+
+from pixel_art_converter import apply_pixel_art
+from pixel_art_palette import Palette
+from pixel_art_sweep import sweep_pixel_art, take_thumbnail, variant_label
+
+SIZES = [8, 12]
+
+
+def _photo(size=(96, 64), seed=0):
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:size[1], 0:size[0]]
+    base = np.stack([x * 255 // size[0], y * 255 // size[1], (x + y) % 256], axis=-1)
+    noise = rng.integers(0, 40, base.shape)
+    return Image.fromarray(np.clip(base + noise, 0, 255).astype(np.uint8), 'RGB')
+
+
+def _blocky():
+    rng = np.random.default_rng(1)
+    small = rng.integers(0, 255, (8, 12, 3), dtype=np.uint8)
+    return Image.fromarray(small, 'RGB').resize((96, 64), Image.NEAREST)
+
+
+def _rotated():
+    """EXIF 方向 6（需顺时针旋转 90°）的 JPEG"""
+    img = _photo((96, 64))
+    exif = img.getexif()
+    exif[0x0112] = 6
+    buf = io.BytesIO()
+    img.save(buf, 'JPEG', exif=exif.tobytes(), quality=95)
+    buf.seek(0)
+    out = Image.open(buf)
+    out.load()
+    return out
+
+
+CASES = [
+    ('default', _photo, {}),
+    ('no-enhance', _photo, {'enhance_mode': False}),
+    ('dither-oklab', _photo, {'dither': 'floyd-steinberg', 'quantize_space': 'oklab'}),
+    ('blocks', _photo, {'downsample': 'mean'}),
+    ('luma', _photo, {'sharpen_mode': 'luma'}),
+    ('scaled', _photo, {'scale_factor': 2}),
+    ('fast-path', _blocky, {}),
+    ('no-fast-path', _blocky, {'fast_path': False}),
+    ('exif', _rotated, {}),
+]
+
+
+@pytest.mark.parametrize('name,make,options', CASES, ids=[c[0] for c in CASES])
+def test_variants_match_single_conversion(tmp_path, name, make, options):
+    img = make()
+    interpolations = ['bicubic', 'lanczos']
+    colors = [None, 8]
+    variants = sweep_pixel_art(img, SIZES, colors, interpolations, tile_width=40,
+                               output_dir=str(tmp_path), max_workers=2, **options)
+    for params, tile in variants:
+        expected = apply_pixel_art(
+            img, pixel_size=params['pixel_size'], color_reduction=params['color_reduction'],
+            interpolation=params['interpolation'] or 'bicubic', **options)
+        with Image.open(os.path.join(str(tmp_path), variant_label(params).replace(' ', '_') + '.png')) as saved:
+            assert np.array_equal(np.asarray(saved.convert('RGB')), np.asarray(expected)), params
+        # 缩略图按完整尺寸结果的取样位置取值
+        thumb = take_thumbnail(expected, expected.size, tile.size)
+        assert np.array_equal(np.asarray(tile), np.asarray(thumb)), params
+
+
+def test_palette_variants(tmp_path):
+    img = _photo()
+    palette = Palette([(0, 0, 0), (255, 255, 255), (200, 40, 40), (40, 40, 200)], name='four')
+    variants = sweep_pixel_art(img, SIZES, [None, 8], tile_width=40, palette=palette,
+                               output_dir=str(tmp_path))
+    # 固定调色板时颜色数不参与扫描
+    assert len(variants) == len(SIZES)
+    for params, _ in variants:
+        assert params['palette'] == 'four'
+        expected = apply_pixel_art(img, pixel_size=params['pixel_size'], palette=palette,
+                                   interpolation=params['interpolation'])
+        with Image.open(os.path.join(str(tmp_path), variant_label(params).replace(' ', '_') + '.png')) as saved:
+            assert np.array_equal(np.asarray(saved.convert('RGB')), np.asarray(expected)), params
+
+
+@pytest.mark.parametrize('tile_width', [9, 16, 40, 200])
+def test_thumbnails_match_filtered_output(tile_width):
+    """不写出完整尺寸结果时，缩略图直接从网格取值，结果与放大、滤波后再取样相同"""
+    img = _photo((160, 120), seed=3)
+    variants = sweep_pixel_art(img, [10, 20], [None, 6], tile_width=tile_width)
+    for params, tile in variants:
+        expected = apply_pixel_art(img, pixel_size=params['pixel_size'],
+                                   color_reduction=params['color_reduction'])
+        thumb = take_thumbnail(expected, expected.size, tile.size)
+        assert np.array_equal(np.asarray(tile), np.asarray(thumb)), params
+
+
+def test_no_full_size_frames_without_output_dir(monkeypatch):
+    """不写出完整尺寸结果时不生成完整尺寸的图像"""
+    import pixel_art_sweep
+
+    def fail(*args, **kwargs):
+        raise AssertionError("不应生成完整尺寸的图像")
+
+    monkeypatch.setattr(pixel_art_sweep, 'resize', fail)
+    monkeypatch.setattr(pixel_art_sweep, 'upscale_pixels', fail)
+    variants = sweep_pixel_art(_photo((160, 120)), [10, 20], [None, 6], tile_width=32, scale_factor=3)
+    assert len(variants) == 4
+    variants = sweep_pixel_art(_blocky(), [8], tile_width=32, scale_factor=3)
+    assert len(variants) == 1
@@ -0,0 +1,98 @@
+"""查看器的纯函数部分：金字塔取层、瓦片 / 区域渲染、瓦片缓存（不需要显示器）"""
+
+import pytest
+
+np = pytest.importorskip('numpy')
+pytest.importorskip('tkinter')
+from PIL import Image
+
+from pixel_art_viewer import ImagePyramid, TileCache, displayable, render_region, render_tile
+
+
+def _image(size=(1024, 512), seed=0):
+    rng = np.random.default_rng(seed)
+    return Image.fromarray(rng.integers(0, 256, (size[1], size[0], 3), dtype=np.uint8))
+
+
+def _stitch(pyramid, display, tile):
+    """按瓦片渲染整个显示区域并拼起来"""
+    out = Image.new('RGB', display)
+    for row in range(-(-display[1] // tile)):
+        for col in range(-(-display[0] // tile)):
+            out.paste(render_tile(pyramid, display, col, row, tile_size=tile), (col * tile, row * tile))
+    return np.asarray(out)
+
+
+def test_displayable_modes():
+    """带透明度的图转为 RGBA，其余非 RGB / RGBA / L 的模式转为 RGB"""
+    assert displayable(Image.new('L', (4, 4))).mode == 'L'
+    assert displayable(Image.new('LA', (4, 4))).mode == 'RGBA'
+    assert displayable(Image.new('P', (4, 4))).mode == 'RGB'
+    transparent = Image.new('P', (4, 4))
+    transparent.info['transparency'] = 0
+    assert displayable(transparent).mode == 'RGBA'
+    assert displayable(Image.new('CMYK', (4, 4))).mode == 'RGB'
+
+
+def test_level_for():
+    """取分辨率不低于显示分辨率的最小层，且不超出最小层"""
+    pyramid = ImagePyramid(_image())
+    assert pyramid.depth() == 4          # 短边 512 -> 256 -> 128 -> 64
+    assert pyramid.level_for(4.0) == 0
+    assert pyramid.level_for(1.0) == 0
+    assert pyramid.level_for(0.6) == 0
+    assert pyramid.level_for(0.5) == 1
+    assert pyramid.level_for(0.3) == 1
+    assert pyramid.level_for(0.25) == 2
+    assert pyramid.level_for(0.01) == 3
+    assert pyramid.level(2).size == (256, 128)
+
+
+def test_render_tile_at_level_resolution():
+    """显示尺寸正好是某一层时，瓦片拼起来就是那一层；图像之外的瓦片为 None"""
+    img = _image()
+    pyramid = ImagePyramid(img)
+    assert np.array_equal(_stitch(pyramid, (1024, 512), 200), np.asarray(img))
+    assert np.array_equal(_stitch(pyramid, (512, 256), 200), np.asarray(pyramid.level(1)))
+    edge = render_tile(pyramid, (1024, 512), 5, 2, tile_size=200)
+    assert edge.size == (24, 112)
+    assert render_tile(pyramid, (1024, 512), 6, 0, tile_size=200) is None
+    assert render_tile(pyramid, (1024, 512), -1, 0, tile_size=200) is None
+
+
+def test_render_tile_nearest_magnification():
+    """最近邻放大 4 倍时每个原图像素变成 4x4 的块"""
+    img = _image((64, 64), seed=1)
+    tile = render_tile(ImagePyramid(img), (256, 256), 1, 0, nearest=True, tile_size=128)
+    expected = np.asarray(img)[:32, 32:].repeat(4, axis=0).repeat(4, axis=1)
+    assert np.array_equal(np.asarray(tile), expected)
+
+
+def test_render_region():
+    """区域渲染裁剪到显示范围；coarse 从更粗糙的层取样但尺寸不变"""
+    img = _image()
+    pyramid = ImagePyramid(img)
+    full = render_region(pyramid, (1024, 512), (-10, -10, 2000, 2000))
+    assert np.array_equal(np.asarray(full), np.asarray(img))
+    part = render_region(pyramid, (1024, 512), (100, 50, 300, 150))
+    assert np.array_equal(np.asarray(part), np.asarray(img)[50:150, 100:300])
+    coarse = render_region(pyramid, (512, 256), (0, 0, 512, 256), nearest=True, coarse=1)
+    expected = np.asarray(pyramid.level(2)).repeat(2, axis=0).repeat(2, axis=1)
+    assert np.array_equal(np.asarray(coarse), expected)
+    assert render_region(pyramid, (1024, 512), (1100, 0, 1200, 10)) is None
+
+
+def test_tile_cache_eviction():
+    """超出容量时淘汰最久未使用的瓦片，get 会刷新使用顺序"""
+    cache = TileCache(max_tiles=3)
+    for key in 'abc':
+        cache.put(key, key.upper())
+    assert cache.get('a') == 'A'
+    cache.put('d', 'D')
+    assert len(cache) == 3
+    assert cache.get('b') is None
+    assert [cache.get(k) for k in 'acd'] == ['A', 'C', 'D']
+    cache.put('e', 'E')
+    assert cache.get('a') is None
+    cache.clear()
+    assert len(cache) == 0